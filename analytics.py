@@ -0,0 +1,133 @@
+from datetime import date
+
+from exercises import NAME_TO_ID
+from history_index import entry_ordinal
+from programs import reps_estimate, user_program
+
+# --- CONFIGURATION ---
+ADHERENCE_WEEKS = 4  # پایبندی در چند هفته اخیر حساب می‌شود
+# key آخرین جلسه‌های شمرده شده در خلاصه؛ ارسال دوباره یک جلسه (بعد از قطعی) دو بار شمرده نمی‌شود
+ROLLUP_KEYS = 200
+# هفته‌های نگه داشته شده در خلاصه (کل خلاصه در یک سلول شیت است و سقف 50 هزار کاراکتر دارد)؛
+# پایبندی فقط ADHERENCE_WEEKS هفته اخیر و نمودار حجم همین بازه را می‌خواند
+ROLLUP_WEEKS = 52
+
+
+def week_key(ordinal):
+    """هفته تقویمی ISO مثل 2024-W05 (مشترک بین همه اعضا)"""
+    year, week, _ = date.fromordinal(ordinal).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def program_targets(program):
+    targets = {}
+    for exs in program.values():
+        for ex in exs:
+            targets.setdefault(ex["id"], (ex.get("sets", 0), reps_estimate(ex.get("reps"))))
+    return targets
+
+
+def empty_rollup(record):
+    return {
+        "weeks": {},
+        "planned_days": len(user_program(record)),
+        "weights": dict(record.get("weights", {})),
+        "first_weights": {},
+        "sessions": 0,
+        "last_date": None,
+        "keys": [],
+    }
+
+
+def update_rollup(rollup, entry, record):
+    """افزودن یک جلسه به خلاصه کاربر (به‌روزرسانی تدریجی)؛ جلسه‌ای که key آن قبلا شمرده شده اثری ندارد"""
+    ordinal = entry_ordinal(entry)
+    if ordinal is None:
+        return rollup
+    key = entry.get("key")
+    if key:
+        keys = rollup.setdefault("keys", [])
+        if key in keys:
+            return rollup
+        keys.append(key)
+        del keys[:-ROLLUP_KEYS]
+    weeks = rollup["weeks"]
+    week = weeks.setdefault(week_key(ordinal), {"sessions": 0, "days": [], "volume": {}})
+    # کلید YYYY-Www به ترتیب زمانی مرتب می‌شود؛ قدیمی‌ترین هفته‌ها حذف می‌شوند
+    for old in sorted(weeks)[:-ROLLUP_WEEKS]:
+        del weeks[old]
+    week["sessions"] += 1
+    day = entry.get("day")
+    if day and day not in week["days"]:
+        week["days"].append(day)
+
+    if entry.get("sets"):
+        # جلسه‌های ست به ست: حجم واقعی (وزنه × تکرار هر ست)
+        for s in entry["sets"]:
+            ex_id = s["exercise_id"]
+            week["volume"][ex_id] = week["volume"].get(ex_id, 0) + (s["weight"] or 0) * (s["reps"] or 0)
+    else:
+        targets = program_targets(user_program(record))
+        for name, kg in (entry.get("details") or {}).items():
+            ex_id = NAME_TO_ID.get(name, name)
+            sets, reps = targets.get(ex_id, (0, 0))
+            week["volume"][ex_id] = week["volume"].get(ex_id, 0) + (kg or 0) * sets * reps
+    for name, kg in (entry.get("details") or {}).items():
+        rollup["first_weights"].setdefault(NAME_TO_ID.get(name, name), kg)
+
+    rollup["sessions"] += 1
+    rollup["weights"] = dict(record.get("weights", {}))
+    rollup["planned_days"] = len(user_program(record))
+    if rollup["last_date"] is None or entry.get("date", "") > rollup["last_date"]:
+        rollup["last_date"] = entry.get("date")
+    return rollup
+
+
+def build_rollup(record):
+    """ساخت کامل خلاصه از تاریخچه (برای اعضای قدیمی یا بازسازی)"""
+    rollup = empty_rollup(record)
+    for entry in record.get("history", []):
+        update_rollup(rollup, entry, record)
+    return rollup
+
+
+# --- AGGREGATES ACROSS MEMBERS ---
+# pandas فقط برای این جدول‌ها (داشبورد مربی) لازم است؛ خلاصه هر عضو بدون آن ساخته می‌شود
+def volume_by_week(rollups):
+    """حجم تمرین (وزنه × ست × تکرار) هر حرکت در هر هفته، جمع همه اعضا (ROLLUP_WEEKS هفته آخر)"""
+    import pandas as pd
+
+    rows = [(week, ex_id, vol)
+            for r in rollups.values()
+            for week, w in r["weeks"].items()
+            for ex_id, vol in w["volume"].items()]
+    df = pd.DataFrame(rows, columns=["week", "exercise_id", "volume"])
+    return df.groupby(["week", "exercise_id"], as_index=False)["volume"].sum()
+
+
+def adherence(rollups, today=None, weeks=ADHERENCE_WEEKS):
+    """درصد روزهای انجام شده از برنامه سه‌روزه در چند هفته اخیر برای هر عضو"""
+    import pandas as pd
+
+    today = today or date.today()
+    recent = [week_key(today.toordinal() - 7 * i) for i in range(weeks)]
+    rows = []
+    for member, r in rollups.items():
+        planned = r.get("planned_days") or 0
+        done = sum(len(r["weeks"].get(w, {}).get("days", [])) for w in recent)
+        rows.append((member, planned * weeks, done, r.get("last_date")))
+    df = pd.DataFrame(rows, columns=["member", "planned", "done", "last_date"])
+    df["adherence"] = (df["done"] / df["planned"].where(df["planned"] > 0)).fillna(0).clip(upper=1) * 100
+    return df.sort_values("adherence")
+
+
+def progression(rollups):
+    """وزنه اول و فعلی هر حرکت برای هر عضو"""
+    import pandas as pd
+
+    rows = [(member, ex_id, r["first_weights"].get(ex_id, w), w)
+            for member, r in rollups.items()
+            for ex_id, w in r["weights"].items()]
+    df = pd.DataFrame(rows, columns=["member", "exercise_id", "first", "current"])
+    df["change"] = df["current"] - df["first"]
+    return df
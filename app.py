@@ -1,370 +1,340 @@
 import streamlit as st
-import json
 import os
-import pandas as pd
 import time
-from datetime import datetime, timedelta
-from gtts import gTTS
+from datetime import datetime
 import base64
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import importlib
+import secrets
+import threading
+from functools import lru_cache
+import metrics
+from storage import ConflictError, get_storage
+from session_cache import UserCache
+from sync_queue import OfflineUserCache, SyncWorker, open_write_queue, update_member_rollup
+from shared_store import SESSION_TTL, WORKOUT_TTL, open_shared_store, store_key
+from exercises import EXERCISE_LIB, NAME_TO_ID
+from programs import GOALS, LEVELS, new_program_fields, reps_estimate, user_program
+from set_log import RPE_SCALE, session_entry
+from credentials import authenticate, hash_in_pool
+from analytics import adherence, progression, volume_by_week
+from voice_cache import VoiceCache
+from assets import APP_CSS, ASSET_MODE, ASSET_PORT, asset_url, build_assets, fragment_height, serve_assets
+from metrics import RerunTimer, span
+
+# ماژول‌های سنگین (pandas از طریق overload/export و نمودارهای مربی، تایمر استراحت، gspread، gTTS) فقط
+# در بخشی که لازمشان دارد import می‌شوند تا صفحه ورود در شروع سرد سریع بیاید
 
 # --- CONFIGURATION ---
-# نام دقیق شیتی که در گوگل شیت ساختی
-SHEET_NAME = "gym_database" 
 THEME_IMG_URL = "https://images.unsplash.com/photo-1534438327276-14e5300c3a48?q=80&w=1470&auto=format&fit=crop"
+# تب‌ها و بازشوهای بسته رندر نمی‌شوند؛ GYM_LAZY_RENDER=0 رفتار قدیمی (رندر همه چیز در هر rerun)
+LAZY_RENDER = os.environ.get("GYM_LAZY_RENDER", "1") != "0"
+# نوشتن‌ها در صف نوشتن (انبار مشترک) و ارسال در پس‌زمینه؛ GYM_OFFLINE_SYNC=0 نوشتن مستقیم (همزمان با کلیک)
+OFFLINE_SYNC = os.environ.get("GYM_OFFLINE_SYNC", "1") != "0"
+WORKOUT_KEYS = ('active', 'day', 'idx', 'start_time', 'session_sets')
+
+# --- CLOUD DATABASE FUNCTIONS ---
+def get_user_cache(username):
+    """کش سشن: رکورد کاربر یک بار خوانده و تغییرات دسته‌ای ذخیره می‌شود"""
+    cache = st.session_state.get('user_cache')
+    if cache is None or cache.username != username:
+        if OFFLINE_SYNC:
+            cache = OfflineUserCache(get_storage(), username, get_write_queue())
+        else:
+            cache = UserCache(get_storage(), username)
+        st.session_state['user_cache'] = cache
+    return cache
+
+@st.cache_resource
+def get_shared_store():
+    """انبار مشترک بین نسخه‌های برنامه (GYM_SHARED_STORE)؛ سشن‌ها، جلسه تمرین و کش‌ها"""
+    return open_shared_store()
+
+@st.cache_resource
+def get_write_queue():
+    """صف نوشتن (در انبار مشترک) و ترد ارسال آن، یکی برای کل پروسه"""
+    queue = open_write_queue(get_shared_store())
+    SyncWorker(queue, get_storage()).start()
+    return queue
 
-# --- CLOUD DATABASE FUNCTIONS (GOOGLE SHEETS) ---
-def get_google_sheet_client():
-    # اتصال با استفاده از سکرت‌های استریم‌لیت
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    creds_dict = st.secrets["service_account"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(creds)
-    return client
-
-def load_db():
-    """دانلود دیتابیس از گوگل شیت"""
+def save_workout(username):
+    """وضعیت جلسه تمرین در انبار مشترک تا با reload، قطعی یا رفتن به نسخه دیگر از بین نرود"""
+    state = {k: st.session_state.get(k) for k in WORKOUT_KEYS}
+    get_shared_store().set_json(store_key("workout", username), state, ttl=WORKOUT_TTL)
+
+def restore_workout(username):
+    if 'active' not in st.session_state:
+        saved = get_shared_store().get_json(store_key("workout", username))
+        if saved and saved.get('active'):
+            st.session_state.update(saved)
+
+# --- SESSIONS ---
+# سشن ورود در انبار مشترک و توکن آن در آدرس صفحه (?s=...)؛ اگر load balancer اتصال دوباره را به
+# نسخه دیگری بفرستد عضو بدون ورود دوباره ادامه می‌دهد. توکن یک بار مصرف است: هر اتصال دوباره
+# آن را با توکن تازه عوض می‌کند تا آدرس کپی یا ذخیره شده بعدا کار نکند
+def start_session(username):
+    token = secrets.token_urlsafe(24)
+    get_shared_store().set_json(store_key("session", token), username, ttl=SESSION_TTL)
+    st.query_params["s"] = token
+
+def resume_session():
+    """نام کاربری سشن آدرس صفحه یا None"""
+    token = st.query_params.get("s")
+    if not token: return None
+    username = get_shared_store().take_json(store_key("session", token))
+    if username is None:
+        # منقضی، نامعتبر یا قبلا مصرف شده
+        del st.query_params["s"]
+    else:
+        start_session(username)
+    return username
+
+def end_session():
+    token = st.query_params.get("s")
+    if token:
+        get_shared_store().delete(store_key("session", token))
+        del st.query_params["s"]
+
+def flush_user(cache):
+    """ارسال تغییرات ذخیره نشده به دیتابیس"""
     try:
-        client = get_google_sheet_client()
-        sheet = client.open(SHEET_NAME).sheet1
-        # تمام دیتا در سلول A1 ذخیره می‌شود
-        data = sheet.acell('A1').value
-        if not data:
-            return {}
-        return json.loads(data)
+        cache.flush()
     except Exception as e:
-        # اگر خطا داد (مثلا شیت خالی بود) دیکشنری خالی برگردان
-        return {}
+        # تغییرات در ژورنال محلی می‌مانند و دفعه بعد ارسال می‌شوند
+        metrics.error("flush", e)
+        st.error(f"خطا در ذخیره سازی ابری: {e}")
 
-def save_db(data):
-    """آپلود دیتابیس به گوگل شیت"""
+def save_session_log(cache, log_entry):
+    """افزودن یک جلسه به تاریخچه کاربر"""
     try:
-        client = get_google_sheet_client()
-        sheet = client.open(SHEET_NAME).sheet1
-        # تبدیل دیتا به متن و ذخیره در A1
-        json_str = json.dumps(data)
-        sheet.update_acell('A1', json_str)
+        cache.append_history(log_entry)
     except Exception as e:
+        metrics.error("history", e)
         st.error(f"خطا در ذخیره سازی ابری: {e}")
+        return
+    # وزنه‌های جلسه بعد از روی تاریخچه تازه (اجرای شبانه همین را برای همه اعضا حساب می‌کند)
+    from overload import recommended_weights
 
-# --- DETAILED EXERCISE LIBRARY ---
-EXERCISE_LIB = {
-    # --- WARM UP ---
-    "WarmUp_Upper": {
-        "name": "گرم‌کردن تخصصی بالاتنه", 
-        "desc": """
-        <div style='background-color: #2c3e50; padding: 15px; border-radius: 10px; border-left: 5px solid #3498db;'>
-        <h4>🔥 مراحل گرم کردن:</h4>
-        <ul>
-            <li><b>چرخش بازوها:</b> ۱۰ تکرار به جلو، ۱۰ تکرار به عقب (دایره‌های بزرگ).</li>
-            <li><b>چرخش مچ دست:</b> ۳۰ ثانیه در هم قفل کنید و بچرخانید.</li>
-            <li><b>پروانه (Jumping Jacks):</b> ۳۰ ثانیه برای افزایش ضربان قلب.</li>
-        </ul>
-        <p style='color: #f39c12;'>⚠️ نکته: بدون گرم کردن شانه، ریسک آسیب در پرس‌ها بالاست.</p>
-        </div>
-        """,
-        "voice": "پنج دقیقه گرم کردن حیاتی. بازوها رو کامل بچرخون. مچ دستت رو گرم کن."
-    },
-    "WarmUp_Lower": {
-        "name": "گرم‌کردن تخصصی پایین‌تنه", 
-        "desc": """
-        <div style='background-color: #2c3e50; padding: 15px; border-radius: 10px; border-left: 5px solid #e67e22;'>
-        <h4>🔥 مراحل گرم کردن:</h4>
-        <ul>
-            <li><b>اسکوات وزن بدن:</b> ۱۵ تکرار سریع و نیمه.</li>
-            <li><b>کشش کشاله ران:</b> مدل پروانه‌ای بنشینید.</li>
-            <li><b>زانو بلند درجا:</b> ۳۰ ثانیه.</li>
-        </ul>
-        </div>
-        """,
-        "voice": "گرم کردن پایین تنه. اسکوات سریع بزن بدون وزنه."
-    },
-    
-    # --- UPPER BODY ---
-    "Floor Press": {
-        "name": "پرس سینه روی زمین (Floor Press)", 
-        "desc": """
-        <div style='background-color: #1e272e; padding: 15px; border-radius: 10px; border: 1px solid #4ecdc4;'>
-        <p>✅ <b>نحوه اجرا:</b> به پشت دراز بکشید، زانوها خم. دمبل‌ها را بالای سینه پرس کنید.</p>
-        <p style='color: #ff6b6b;'>⛔ <b>هشدار ایمنی:</b> آرنج‌ها را ۹۰ درجه باز نکنید (فشار روی شانه). زاویه ۴۵ درجه با بدن صحیح است.</p>
-        <p>💡 <b>تکنیک:</b> وقتی آرنج به زمین خورد، ۱ ثانیه مکث کنید تا فشار از روی عضله برداشته شود، سپس انفجاری پرس کنید.</p>
-        </div>
-        """,
-        "voice": "پرس سینه روی زمین. آرنجت رو به بدنت نزدیک کن. زاویه چهل و پنج درجه."
-    },
-    "One Arm Row": {
-        "name": "زیربغل دمبل تک‌خم", 
-        "desc": """
-        <div style='background-color: #1e272e; padding: 15px; border-radius: 10px; border: 1px solid #4ecdc4;'>
-        <p>✅ <b>نحوه اجرا:</b> یک دست و زانو روی نیمکت. کمر کاملاً صاف (مثل میز).</p>
-        <p style='color: #ff6b6b;'>⛔ <b>هشدار ایمنی:</b> قوز کردن ممنوع! اگر کمر گرد شود، به دیسک فشار می‌آید.</p>
-        <p>💡 <b>تکنیک:</b> دمبل را به سمت جیب شلوار بکشید (عقب)، نه به سمت سینه (بالا).</p>
-        </div>
-        """,
-        "voice": "زیربغل تک خم. کمرت رو اصلا قوز نکن. دمبل رو بکش سمت لگنت."
-    },
-    "Overhead Press": {
-        "name": "پرس سرشانه ایستاده", 
-        "desc": """
-        <div style='background-color: #1e272e; padding: 15px; border-radius: 10px; border: 1px solid #4ecdc4;'>
-        <p>✅ <b>نحوه اجرا:</b> دمبل‌ها کنار گوش. پرس به سمت سقف.</p>
-        <p style='color: #ff6b6b;'>⛔ <b>هشدار ایمنی:</b> موقع بالا بردن، کمر را قوس ندهید. شکم را سفت نگه دارید.</p>
-        </div>
-        """,
-        "voice": "پرس سرشانه. شکمت رو سفت کن."
-    },
-    "Bicep Curl": {
-        "name": "جلوبازو ایستاده", 
-        "desc": """
-        <div style='background-color: #1e272e; padding: 15px; border-radius: 10px; border: 1px solid #4ecdc4;'>
-        <p>✅ <b>نحوه اجرا:</b> آرنج‌ها چسبیده به پهلو. فقط ساعد بالا بیاید.</p>
-        <p style='color: #ff6b6b;'>⛔ <b>اشتباه رایج:</b> تاب دادن کمر برای بالا آوردن وزنه تقلب است.</p>
-        </div>
-        """,
-        "voice": "جلوبازو. آرنجت رو تکون نده."
-    },
-    "Tricep Ext": {
-        "name": "پشت بازو جفت دست", 
-        "desc": """
-        <div style='background-color: #1e272e; padding: 15px; border-radius: 10px; border: 1px solid #4ecdc4;'>
-        <p>✅ <b>نحوه اجرا:</b> دمبل پشت سر. آرنج‌ها رو به سقف و ثابت.</p>
-        </div>
-        """,
-        "voice": "پشت بازو. آرنجت رو به سقف باشه."
-    },
-
-    # --- LOWER BODY ---
-    "Goblet Squat": {
-        "name": "گابلت اسکوات", 
-        "desc": """
-        <div style='background-color: #1e272e; padding: 15px; border-radius: 10px; border: 1px solid #ffeaa7;'>
-        <p>✅ <b>نحوه اجرا:</b> دمبل چسبیده به سینه. پاها کمی بازتر از عرض شانه.</p>
-        <p style='color: #ff6b6b;'>⛔ <b>هشدار ایمنی:</b> زانوها نباید به داخل متمایل شوند. سینه را بالا نگه دارید.</p>
-        <p>💡 <b>تکنیک:</b> تصور کنید می‌خواهید روی صندلی بنشینید. وزن روی پاشنه پا.</p>
-        </div>
-        """,
-        "voice": "گابلت اسکوات. سینه رو بده جلو. سنگینی روی پاشنه."
-    },
-    "RDL": {
-        "name": "ددلیفت رومانیایی", 
-        "desc": """
-        <div style='background-color: #1e272e; padding: 15px; border-radius: 10px; border: 1px solid #ffeaa7;'>
-        <p>✅ <b>نحوه اجرا:</b> زانو کمی خم و قفل. خم شدن از لگن با کمر صاف.</p>
-        <p style='color: #ff6b6b;'>⛔ <b>خطرناکترین حرکت برای کمر اگر قوز کنید!</b> نگاه به جلو پایین باشد.</p>
-        <p>💡 <b>تکنیک:</b> باسن را به عقب هل دهید تا کشش شدیدی پشت ران حس کنید.</p>
-        </div>
-        """,
-        "voice": "ددلیفت رومانیایی. قوز نکن. باسن رو بده عقب."
-    },
-    "Lunges": {
-        "name": "لانژ (Lunges)", 
-        "desc": "✅ **اجرا:** گام به عقب. هر دو زانو ۹۰ درجه. تنه صاف.", 
-        "voice": "لانژ. زانوی پای عقب رو کنترل شده ببر پایین."
-    },
-
-    # --- CORE ---
-    "Plank": {
-        "name": "پلانک (Plank)", 
-        "desc": "✅ **اجرا:** بدن مثل خط‌کش. باسن بالا نباشد. شکم منقبض.", 
-        "voice": "پلانک. شکم رو بده تو. نفس بکش."
-    },
-    "Shadow Boxing": {
-        "name": "بوکس سرعتی", 
-        "desc": "✅ **اجرا:** گارد بوکس. ضربات مستقیم پی‌درپی. رقص پا.", 
-        "voice": "بوکس سرعتی. نفس بگیر."
-    }
-}
+    record = cache.record
+    for ex_id, kg in recommended_weights(record['history'], log_entry['date_ord'], record['weights']).items():
+        cache.set_weight(ex_id, kg)
+    flush_user(cache)
+    if OFFLINE_SYNC:
+        # خلاصه مربی را SyncWorker بعد از رسیدن جلسه می‌سازد
+        return
+    try:
+        update_member_rollup(get_storage(), cache.username, [log_entry], cache.record)
+    except Exception as e:
+        # خلاصه مربی حیاتی نیست و با scripts.rebuild_rollups قابل بازسازی است
+        metrics.error("rollup", e)
+
+def staff_usernames(role):
+    """نام کاربری مربی‌ها از متغیر محیطی (مثلا GYM_COACHES=a,b) یا سکرت coaches"""
+    env = os.environ.get(f"GYM_{role.upper()}")
+    if env: return {u.strip() for u in env.split(",") if u.strip()}
+    try:
+        return set(st.secrets.get(role, []))
+    except Exception:
+        return set()
+
+@st.cache_data(ttl=60)
+def coach_aggregates():
+    """خلاصه همه اعضا در یک درخواست؛ هر دقیقه یک بار تازه می‌شود"""
+    rollups = get_storage().list_rollups()
+    return len(rollups), volume_by_week(rollups), adherence(rollups), progression(rollups)
 
 # --- HELPERS ---
+@st.cache_resource
+def get_voice_cache():
+    return VoiceCache(shared=get_shared_store())
+
+@st.cache_resource
+def get_assets():
+    # فایل‌های استاتیک یک بار در هر پروسه ساخته می‌شوند
+    if ASSET_PORT: serve_assets(ASSET_PORT)
+    return build_assets(EXERCISE_LIB, THEME_IMG_URL)
+
+@st.cache_resource
+def start_metrics_server():
+    # اختیاری: آدرس /metrics برای Prometheus روی همین ماشین
+    if metrics.METRICS_PORT: metrics.serve_metrics(metrics.METRICS_PORT)
+
+@st.cache_resource
+def preload_pandas():
+    """بعد از اولین رندر داشبورد pandas در پس‌زمینه import می‌شود تا ذخیره جلسه و گزارش منتظر آن نمانند"""
+    threading.Thread(target=importlib.import_module, args=("pandas",), name="gym-preload", daemon=True).start()
+
+def rerun():
+    """st.rerun که زمان‌سنجی را به اجرای بعدی می‌سپارد تا کل زمان یک کلیک یک نمونه باشد"""
+    timer.phase(None)
+    st.session_state['_rerun_started'] = timer.started
+    st.rerun()
+
 def autoplay_audio(text):
-    try:
-        tts = gTTS(text=text, lang='fa')
-        filename = "temp_audio.mp3"
-        tts.save(filename)
-        with open(filename, "rb") as f:
-            audio_bytes = f.read()
-        b64 = base64.b64encode(audio_bytes).decode()
-        md = f"""<audio autoplay="true"><source src="data:audio/mp3;base64,{b64}" type="audio/mp3"></audio>"""
-        st.markdown(md, unsafe_allow_html=True)
-    except: pass
-
-def get_weekly_status(history, total_days_in_plan):
+    # صدا فقط از کش (حافظه/دیسک/انبار مشترک)؛ کلیپی که scripts.build_voice_cache نساخته پخش نمی‌شود
+    with span("tts.voice"):
+        if ASSET_MODE == "inline":
+            audio_bytes = get_voice_cache().get(text)
+            if not audio_bytes: return
+            b64 = base64.b64encode(audio_bytes).decode()
+            src = f"data:audio/mp3;base64,{b64}"
+        else:
+            clip = get_voice_cache().ensure(text)
+            if not clip: return
+            src = asset_url(f"audio/{clip}")
+    md = f"""<audio autoplay="true"><source src="{src}" type="audio/mp3"></audio>"""
+    st.markdown(md, unsafe_allow_html=True)
+
+def render_exercise_desc(ex_id):
+    """توضیح حرکت؛ در حالت url فقط آدرس صفحه توضیح ارسال می‌شود و مرورگر آن را کش می‌کند"""
+    desc = EXERCISE_LIB[ex_id]['desc']
+    if ASSET_MODE == "inline":
+        st.markdown(desc, unsafe_allow_html=True)
+    else:
+        st.iframe(asset_url(get_assets()['exercises'][ex_id]), height=fragment_height(desc))
+
+@lru_cache(maxsize=None)
+def exercise_block(ex_id):
+    """محتوای ثابت حرکت در برنامه هفتگی، یک بار برای هر حرکت ساخته می‌شود"""
+    lib = EXERCISE_LIB[ex_id]
+    if ASSET_MODE == "inline":
+        return f"### {lib['name']}\n\n{lib['desc']}\n\n---", None, None
+    return f"### {lib['name']}", asset_url(get_assets()['exercises'][ex_id]), fragment_height(lib['desc'])
+
+def render_plan_exercise(ex_id):
+    text, url, height = exercise_block(ex_id)
+    st.markdown(text, unsafe_allow_html=True)
+    if url:
+        st.iframe(url, height=height)
+        st.markdown("---")
+
+def lazy_tabs(names, key):
+    if LAZY_RENDER:
+        return st.tabs(names, key=key, on_change="rerun")
+    return st.tabs(names)
+
+def lazy_expander(label, key):
+    if LAZY_RENDER:
+        return st.expander(label, key=key, on_change="rerun")
+    return st.expander(label)
+
+def shown(container):
+    """آیا محتوای تب/بازشو باید رندر شود؛ بدون LAZY_RENDER وضعیت آن‌ها دنبال نمی‌شود (None)"""
+    return container.open is not False
+
+def get_weekly_status(cache, total_days_in_plan):
     today = datetime.now().date()
     # اگر تاریخ عضویت به فرمت رشته است، تبدیل به تاریخ
     if isinstance(total_days_in_plan, str):
         try:
             start_date = datetime.strptime(total_days_in_plan, "%Y-%m-%d").date()
-        except:
+        except Exception as e:
+            metrics.error("joined_date", e)
             start_date = today # فال‌بک
     else:
         start_date = total_days_in_plan
 
     days_passed = (today - start_date).days
     current_week = (days_passed // 7) + 1
-    week_start_day = start_date + timedelta(weeks=current_week-1)
+    # ایندکس یک بار در هر سشن ساخته و با هر جلسه جدید به‌روز می‌شود
+    return current_week, cache.history_index(start_date).completed_in_week(current_week)
 
-    completed_this_week = []
-    for log in history:
-        try:
-            log_date = datetime.strptime(log['date'], "%Y-%m-%d").date()
-            if log_date >= week_start_day:
-                day_name = log.get('day', log.get('plan'))
-                if day_name: completed_this_week.append(day_name)
-        except: continue
-    return current_week, completed_this_week
-
-def prepare_export_data(history):
-    """آماده سازی دیتا برای خروجی مربی با جزییات کامل"""
-    export_list = []
-    for log in history:
-        details = ""
-        if 'details' in log:
-            for ex, w in log['details'].items():
-                details += f"{ex}: {w}kg | "
-        
-        row = {
-            "تاریخ": log.get('date'),
-            "برنامه": log.get('day'),
-            "مدت زمان (دقیقه)": log.get('duration_min', 'نامشخص'),
-            "وزن بدن": log.get('user_weight'),
-            "شرح حرکات و وزنه‌ها": details
-        }
-        export_list.append(row)
-    return pd.DataFrame(export_list)
+@st.cache_data(max_entries=256)
+def export_preview(tail):
+    """پیش‌نمایش فقط از چند جلسه آخر ساخته می‌شود، نه از کل خروجی"""
+    from export import EXPORT_COLUMNS, sets_frame
 
-# --- LOGIC ---
-def generate_program_structure(gender, goal, level):
-    reps_c = "12-15" if goal == "کاهش وزن" else "8-10"
-    rest_t = 45 if goal == "کاهش وزن" else 90
-    plan = {
-        "Day 1 (Upper)": ["WarmUp_Upper", "Floor Press", "One Arm Row", "Overhead Press", "Bicep Curl", "Tricep Ext"],
-        "Day 2 (Lower)": ["WarmUp_Lower", "Goblet Squat", "RDL", "Lunges", "Plank"],
-        "Day 3 (Full)": ["WarmUp_Upper", "Shadow Boxing", "Goblet Squat", "Floor Press", "Plank"]
-    }
-    structured_plan = {}
-    for day, exercises in plan.items():
-        day_exs = []
-        for ex_key in exercises:
-            day_exs.append({
-                "id": ex_key,
-                "sets": 3,
-                "reps": reps_c if "WarmUp" not in ex_key and "Plank" not in ex_key else "Time",
-                "rest": rest_t if "WarmUp" not in ex_key else 0
-            })
-        structured_plan[day] = day_exs
-    return structured_plan
+    return sets_frame(tail, NAME_TO_ID).rename(columns=EXPORT_COLUMNS)
 
+# --- LOGIC ---
 def init_user(username, password, gender, goal, level):
-    db = load_db()
-    if username in db: return False, "نام کاربری تکراری است"
-    prog = generate_program_structure(gender, goal, level)
-    weights = {}
-    for day, exs in prog.items():
-        for ex in exs:
-            eid = ex['id']
-            if eid not in weights:
-                if "Squat" in eid or "RDL" in eid: w = 10
-                elif "Press" in eid: w = 8 if gender == "آقا" else 4
-                else: w = 0
-                weights[eid] = w
-
-    db[username] = {
-        "password": password,
+    storage = get_storage()
+    program_fields, weights = new_program_fields(gender, goal, level)
+    record = {
         "profile": {"gender": gender, "goal": goal, "level": level, "weight": 0, "height": 0, "joined": str(datetime.now().date())},
-        "program": prog,
+        **program_fields,
         "weights": weights,
         "history": []
     }
-    save_db(db)
+    try:
+        # نسخه 0 یعنی کاربر نباید از قبل وجود داشته باشد
+        storage.put_user(username, record, expected_version=0)
+        storage.put_credential(username, hash_in_pool(password).result())
+    except ConflictError:
+        return False, "نام کاربری تکراری است"
+    except Exception as e:
+        metrics.error("signup", e)
+        return False, f"خطا در ذخیره سازی ابری: {e}"
     return True, "خوش آمدید"
 
+def login(username, password):
+    """(درست بودن, پیام خطا)؛ خطای دیتابیس جدا از رمز نادرست گزارش می‌شود"""
+    try:
+        if username and authenticate(get_storage(), username, password):
+            return True, ""
+    except Exception as e:
+        metrics.error("login", e)
+        return False, f"خطا در اتصال به دیتابیس ابری: {e}"
+    return False, "اطلاعات نادرست یا کاربر یافت نشد"
+
 # --- UI SETUP ---
 st.set_page_config(page_title="Gym Architect Pro", page_icon="💪", layout="wide")
+# زمان‌سنجی این اجرا؛ اگر با rerun() آمده باشد از لحظه کلیک در اجرای قبلی
+timer = RerunTimer(st.session_state.pop('_rerun_started', None))
+timer.phase("setup")
+start_metrics_server()
 
-st.markdown(f"""
-<style>
-.stApp {{
-    background-image: linear_gradient(rgba(0,0,0,0.85), rgba(0,0,0,0.95)), url("{THEME_IMG_URL}");
-    background-size: cover;
-    background-attachment: fixed;
-}}
-h1, h2, h3, h4 {{ color: #ffffff !important; font-family: 'Tahoma', sans-serif; }}
-p, div, label, li {{ color: #ecf0f1 !important; font-size: 16px; }}
-.stMetric {{
-    background-color: #1e1e1e;
-    border: 1px solid #333;
-    border-radius: 10px;
-    padding: 10px;
-    text-align: center;
-}}
-/* Timer Style */
-.timer-box {{
-    border: 4px solid #f1c40f;
-    border-radius: 50%;
-    width: 150px;
-    height: 150px;
-    display: flex;
-    align-items: center;
-    justify-content: center;
-    margin: 0 auto;
-    background-color: rgba(0,0,0,0.5);
-    box-shadow: 0 0 20px rgba(241, 196, 15, 0.5);
-}}
-.timer-text {{
-    font-size: 60px;
-    font-weight: bold;
-    color: #f1c40f;
-}}
-/* Session Timer */
-.session-timer {{
-    position: fixed;
-    top: 60px;
-    right: 20px;
-    background-color: rgba(46, 204, 113, 0.2);
-    border: 1px solid #2ecc71;
-    padding: 5px 15px;
-    border-radius: 20px;
-    color: #2ecc71;
-    z-index: 100;
-}}
-</style>
-""", unsafe_allow_html=True)
+if ASSET_MODE == "inline":
+    st.markdown(f"<style>{APP_CSS.replace('$THEME_IMG_URL', THEME_IMG_URL)}</style>", unsafe_allow_html=True)
+else:
+    # فقط لینک فایل CSS؛ خود فایل در مرورگر کش می‌شود
+    st.markdown(f'<link rel="stylesheet" href="{asset_url(get_assets()["css"])}">', unsafe_allow_html=True)
 
 # --- APP LOGIC ---
-if 'user' not in st.session_state: st.session_state['user'] = None
+if 'user' not in st.session_state: st.session_state['user'] = resume_session()
 
 if not st.session_state['user']:
+    timer.phase("login")
     st.title("🏗️ Gym Architect Pro (Cloud)")
     t1, t2 = st.tabs(["ورود", "ثبت نام"])
     with t1:
         u = st.text_input("نام کاربری")
         p = st.text_input("رمز عبور", type="password")
         if st.button("ورود"):
-            db = load_db()
-            if u in db and db[u]['password'] == p:
+            ok, msg = login(u, p)
+            if ok:
                 st.session_state['user'] = u
-                st.rerun()
-            else: st.error("اطلاعات نادرست یا کاربر یافت نشد")
+                start_session(u)
+                rerun()
+            else: st.error(msg)
     with t2:
         u_n = st.text_input("نام کاربری جدید")
         p_n = st.text_input("رمز عبور جدید", type="password")
         c1, c2, c3 = st.columns(3)
         g = c1.selectbox("جنسیت", ["آقا", "خانم"])
-        gl = c2.selectbox("هدف", ["کاهش وزن", "عضله سازی"])
-        lv = c3.selectbox("سطح", ["مبتدی", "متوسط"])
+        gl = c2.selectbox("هدف", GOALS)
+        lv = c3.selectbox("سطح", LEVELS)
         if st.button("ثبت نام"):
             ok, msg = init_user(u_n, p_n, g, gl, lv)
             if ok: st.success(msg)
             else: st.error(msg)
+    timer.finish()
     st.stop()
 
 # --- DASHBOARD ---
+timer.phase("load")
 user = st.session_state['user']
-db = load_db()
-udata = db[user]
+cache = get_user_cache(user)
+udata = cache.load()
+try:
+    cache.maybe_flush()
+except Exception as e:
+    metrics.error("flush", e)
+    st.error(f"خطا در ذخیره سازی ابری: {e}")
+program = user_program(udata)
+restore_workout(user)
 
 # SIDEBAR
+timer.phase("sidebar")
 with st.sidebar:
     st.title(f"پروفایل {user}")
     st.markdown("### 🎧 موزیک انرژی")
@@ -374,10 +344,9 @@ with st.sidebar:
     w = st.number_input("وزن (kg)", value=float(udata['profile']['weight']))
     h = st.number_input("قد (cm)", value=float(udata['profile']['height']))
     if st.button("آپدیت وزن"):
-        udata['profile']['weight'] = w
-        udata['profile']['height'] = h
-        save_db(db)
-        st.rerun()
+        cache.update_profile(weight=w, height=h)
+        flush_user(cache)
+        rerun()
     if w > 0 and h > 0:
         bmi = w / ((h/100)**2)
         pos = min(max((bmi - 15) / 20 * 100, 0), 100)
@@ -387,160 +356,274 @@ with st.sidebar:
             </div>
             <p style='text-align: center; margin-top: 5px;'>BMI: {bmi:.1f}</p>
         """, unsafe_allow_html=True)
+
+    if OFFLINE_SYNC:
+        sync = cache.pending()
+        if sync['failing']:
+            st.warning(f"📡 اتصال برقرار نیست؛ {sync['pending']} تغییر در صف ذخیره شده و بعدا ارسال می‌شود")
+        elif sync['pending']:
+            st.caption(f"⏳ {sync['pending']} تغییر در حال ارسال")
     
     if st.button("خروج"):
+        flush_user(cache)
+        end_session()
         st.session_state['user'] = None
-        st.rerun()
+        st.session_state['user_cache'] = None
+        rerun()
 
 # TABS
-tab_plan, tab_gym, tab_report = st.tabs(["📅 برنامه و تقویم", "🏋️ اتاق تمرین", "📈 گزارش و مربی"])
+is_coach = user in staff_usernames("coaches")
+is_admin = user in staff_usernames("admins")
+tab_names = ["📅 برنامه و تقویم", "🏋️ اتاق تمرین", "📈 گزارش و مربی"]
+if is_coach: tab_names.append("👥 داشبورد مربی")
+if is_admin: tab_names.append("🛠️ عملکرد")
+tab_plan, tab_gym, tab_report, *staff_tabs = lazy_tabs(tab_names, "main_tab")
+tab_coach = staff_tabs.pop(0) if is_coach else None
+tab_perf = staff_tabs.pop(0) if is_admin else None
 
 # --- TAB 1: WEEKLY PLAN ---
 with tab_plan:
-    curr_week, completed_days = get_weekly_status(udata['history'], udata['profile']['joined'])
-    st.header(f"هفته {curr_week} از دوره تمرینی")
+    if shown(tab_plan):
+        timer.phase("render.plan")
+        curr_week, completed_days = get_weekly_status(cache, udata['profile']['joined'])
+        st.header(f"هفته {curr_week} از دوره تمرینی")
     
-    days = list(udata['program'].keys())
-    cols = st.columns(len(days))
-    for i, day in enumerate(days):
-        done = day in completed_days
-        color = "#2ecc71" if done else "#34495e"
-        icon = "✅ انجام شده" if done else "⬜ تمرین امروز؟"
-        with cols[i]:
-            st.markdown(f"<div style='background:{color}; padding:10px; border-radius:5px; text-align:center; color:white;'>{day}<br>{icon}</div>", unsafe_allow_html=True)
-            with st.expander("مشاهده کامل حرکات"):
-                for ex in udata['program'][day]:
-                    lib = EXERCISE_LIB[ex['id']]
-                    st.markdown(f"### {lib['name']}")
-                    st.markdown(lib['desc'], unsafe_allow_html=True) # HTML Render
-                    st.markdown("---")
+        days = list(program.keys())
+        cols = st.columns(len(days))
+        for i, day in enumerate(days):
+            done = day in completed_days
+            color = "#2ecc71" if done else "#34495e"
+            icon = "✅ انجام شده" if done else "⬜ تمرین امروز؟"
+            with cols[i]:
+                st.markdown(f"<div style='background:{color}; padding:10px; border-radius:5px; text-align:center; color:white;'>{day}<br>{icon}</div>", unsafe_allow_html=True)
+                exp = lazy_expander("مشاهده کامل حرکات", f"plan_{day}")
+                if shown(exp):
+                    with exp:
+                        for ex in program[day]:
+                            render_plan_exercise(ex['id'])
 
 # --- TAB 2: WORKOUT ROOM ---
 with tab_gym:
-    st.header("اتاق تمرین هوشمند")
+    if shown(tab_gym):
+        timer.phase("render.gym")
+        st.header("اتاق تمرین هوشمند")
     
-    selected_day = st.selectbox("برنامه امروز:", list(udata['program'].keys()))
+        selected_day = st.selectbox("برنامه امروز:", list(program.keys()))
     
-    if st.button("🚀 شروع جلسه تمرینی"):
-        st.session_state['active'] = True
-        st.session_state['day'] = selected_day
-        st.session_state['idx'] = 0
-        st.session_state['start_time'] = time.time() # Start Session Timer
-        st.session_state['session_weights'] = {} # Track weights for this session
-        st.rerun()
+        if st.button("🚀 شروع جلسه تمرینی"):
+            st.session_state['active'] = True
+            st.session_state['day'] = selected_day
+            st.session_state['idx'] = 0
+            st.session_state['start_time'] = time.time() # Start Session Timer
+            st.session_state['session_sets'] = [] # Track every set of this session
+            # تایمرهای استراحت جلسه قبل نباید به ست اول این جلسه برسند
+            for k in [k for k in st.session_state if str(k).startswith("rest_")]:
+                del st.session_state[k]
+            save_workout(user)
+            rerun()
         
-    if st.session_state.get('active'):
-        # Session Timer Display
-        elapsed = int(time.time() - st.session_state['start_time'])
-        mins, secs = divmod(elapsed, 60)
-        # JS for live update
-        start_ts = st.session_state['start_time'] * 1000
-        st.markdown(f"""
-        <div id="live_timer" class="session-timer">00:00</div>
-        <script>
-        function updateTimer() {{
-            var start = {start_ts};
-            var now = new Date().getTime();
-            var diff = Math.floor((now - start) / 1000);
-            var m = Math.floor(diff / 60);
-            var s = diff % 60;
-            m = m < 10 ? "0" + m : m;
-            s = s < 10 ? "0" + s : s;
-            document.getElementById("live_timer").innerHTML = "⏱️ " + m + ":" + s;
-        }}
-        setInterval(updateTimer, 1000);
-        </script>
-        """, unsafe_allow_html=True)
+        if st.session_state.get('active'):
+            # Session Timer Display
+            elapsed = int(time.time() - st.session_state['start_time'])
+            mins, secs = divmod(elapsed, 60)
+            # JS for live update
+            start_ts = st.session_state['start_time'] * 1000
+            st.markdown(f"""
+            <div id="live_timer" class="session-timer">00:00</div>
+            <script>
+            function updateTimer() {{
+                var start = {start_ts};
+                var now = new Date().getTime();
+                var diff = Math.floor((now - start) / 1000);
+                var m = Math.floor(diff / 60);
+                var s = diff % 60;
+                m = m < 10 ? "0" + m : m;
+                s = s < 10 ? "0" + s : s;
+                document.getElementById("live_timer").innerHTML = "⏱️ " + m + ":" + s;
+            }}
+            setInterval(updateTimer, 1000);
+            </script>
+            """, unsafe_allow_html=True)
         
-        day_plan = udata['program'][st.session_state['day']]
-        idx = st.session_state['idx']
+            day_plan = program[st.session_state['day']]
+            idx = st.session_state['idx']
         
-        if idx < len(day_plan):
-            ex_conf = day_plan[idx]
-            lib = EXERCISE_LIB[ex_conf['id']]
+            if idx < len(day_plan):
+                ex_conf = day_plan[idx]
+                lib = EXERCISE_LIB[ex_conf['id']]
             
-            # Autoplay only once
-            if f"p_{idx}" not in st.session_state:
-                autoplay_audio(lib['voice'])
-                st.session_state[f"p_{idx}"] = True
+                # Autoplay only once
+                if f"p_{idx}" not in st.session_state:
+                    autoplay_audio(lib['voice'])
+                    st.session_state[f"p_{idx}"] = True
             
-            # Layout
-            st.markdown(f"## {idx+1}. {lib['name']}")
-            st.markdown(lib['desc'], unsafe_allow_html=True) # Detailed Description
+                # Layout
+                st.markdown(f"## {idx+1}. {lib['name']}")
+                render_exercise_desc(ex_conf['id']) # Detailed Description
             
-            c1, c2 = st.columns([1, 1])
-            with c1:
-                rec_w = udata['weights'].get(ex_conf['id'], 0)
-                st.info(f"📊 **هدف:** {ex_conf['sets']} ست | {ex_conf['reps']} تکرار")
-                st.metric("وزن پیشنهادی سیستم", f"{rec_w} kg")
+                rest_key = f"rest_{idx}"
+                done_sets = sum(1 for s in st.session_state['session_sets'] if s['exercise_id'] == ex_conf['id'])
+                c1, c2 = st.columns([1, 1])
+                with c1:
+                    rec_w = udata['weights'].get(ex_conf['id'], 0)
+                    st.info(f"📊 **هدف:** {ex_conf['sets']} ست | {ex_conf['reps']} تکرار")
+                    st.metric("وزن پیشنهادی سیستم", f"{rec_w} kg")
+                    st.caption(f"ست‌های ثبت شده: {done_sets} از {ex_conf['sets']}")
+                    kg = st.number_input("وزنه این ست (kg)", min_value=0.0, value=float(rec_w), step=0.5, key=f"kg_{idx}")
+                    reps = None
+                    if lib['kind'] == "reps":
+                        reps = st.number_input("تکرار انجام شده", min_value=0, value=int(round(reps_estimate(ex_conf['reps']))),
+                                               key=f"reps_{idx}")
                 
-                # Feedback
-                fb = st.radio("فشار حرکت:", ["سبک", "مناسب", "سنگین"], horizontal=True, key=f"f_{idx}")
-
-            with c2:
-                # Graphical Rest Timer
-                rest_t = ex_conf['rest']
-                st.write("") # Spacer
-                if rest_t > 0:
-                    if st.button("⏳ شروع استراحت"):
-                        ph = st.empty()
-                        for s in range(rest_t, -1, -1):
-                            ph.markdown(f"""
-                                <div class="timer-box">
-                                    <span class="timer-text">{s}</span>
-                                </div>
-                            """, unsafe_allow_html=True)
-                            time.sleep(1)
-                        ph.markdown("<h2 style='text-align:center; color:#2ecc71;'>حرکت کن!</h2>", unsafe_allow_html=True)
-                        st.balloons()
-                else:
-                    st.warning("این حرکت استراحت ندارد (سوپرست یا گرم کردن)")
+                    # Feedback
+                    fb = st.radio("فشار حرکت:", ["سبک", "مناسب", "سنگین"], horizontal=True, key=f"f_{idx}")
+                    if st.button("➕ ثبت ست"):
+                        # استراحت واقعی قبل از این ست از نتیجه تایمر مرورگر؛ تایمر هم برداشته می‌شود تا
+                        # کامپوننت با همان key دوباره نصب نشود و نتیجه قبلی را برنگرداند
+                        rest = st.session_state.pop(f"{rest_key}_result", {}).get('elapsed')
+                        st.session_state.pop(rest_key, None)
+                        st.session_state['session_sets'].append({
+                            "exercise_id": ex_conf['id'], "set": done_sets + 1, "reps": reps,
+                            "weight": kg, "rpe": RPE_SCALE[fb], "rest": rest})
+                        save_workout(user)
+                        rerun()
+
+                with c2:
+                    # Graphical Rest Timer
+                    rest_t = ex_conf['rest']
+                    st.write("") # Spacer
+                    if rest_t > 0:
+                        # تایمر در مرورگر اجرا می‌شود و ترد سرور آزاد می‌ماند
+                        if st.button("⏳ شروع استراحت"):
+                            # شماره اجرا در کل سشن یکتاست؛ key تایمر هیچ وقت تکرار نمی‌شود
+                            st.session_state['_rest_runs'] = st.session_state.get('_rest_runs', 0) + 1
+                            st.session_state[rest_key] = st.session_state['_rest_runs']
+                            st.session_state.pop(f"{rest_key}_result", None)
+                        run = st.session_state.get(rest_key)
+                        if run and f"{rest_key}_result" not in st.session_state:
+                            from rest_timer import rest_timer
+                            result = rest_timer(rest_t, key=f"{rest_key}_{run}")
+                            if result:
+                                st.session_state[f"{rest_key}_result"] = result
+                                if result['status'] == "done": st.balloons()
+                        if f"{rest_key}_result" in st.session_state:
+                            st.markdown("<h2 style='text-align:center; color:#2ecc71;'>حرکت کن!</h2>", unsafe_allow_html=True)
+                    else:
+                        st.warning("این حرکت استراحت ندارد (سوپرست یا گرم کردن)")
             
-            st.markdown("---")
-            if st.button("✅ ثبت و بعدی", use_container_width=True):
-                # Save Weight Data for Report
-                st.session_state['session_weights'][lib['name']] = rec_w
-                
-                # Logic for Next Weight
-                if fb == "سبک": udata['weights'][ex_conf['id']] += 1
-                elif fb == "سنگین" and udata['weights'][ex_conf['id']] > 0: udata['weights'][ex_conf['id']] -= 1
-                save_db(db)
-                
-                st.session_state['idx'] += 1
-                st.rerun()
-        else:
-            # End of Session
-            total_time = int((time.time() - st.session_state['start_time']) / 60)
-            st.success(f"🎉 پایان تمرین! مدت زمان: {total_time} دقیقه")
+                st.markdown("---")
+                if st.button("✅ ثبت و بعدی", use_container_width=True):
+                    if not done_sets:
+                        # بدون ثبت ست به ست: همه ست‌های هدف با همین وزنه و فشار
+                        st.session_state['session_sets'].extend({
+                            "exercise_id": ex_conf['id'], "set": n, "reps": reps,
+                            "weight": kg, "rpe": RPE_SCALE[fb], "rest": None} for n in range(1, ex_conf['sets'] + 1))
+                    # وزنه بعدی در ذخیره نهایی از روی تاریخچه و RPE حساب می‌شود
+                    st.session_state['idx'] += 1
+                    save_workout(user)
+                    rerun()
+            else:
+                # End of Session
+                total_time = int((time.time() - st.session_state['start_time']) / 60)
+                st.success(f"🎉 پایان تمرین! مدت زمان: {total_time} دقیقه")
             
-            if st.button("ذخیره نهایی در کارنامه"):
-                log_entry = {
-                    "date": str(datetime.now().date()),
-                    "day": st.session_state['day'],
-                    "duration_min": total_time,
-                    "user_weight": udata['profile']['weight'],
-                    "details": st.session_state['session_weights'] # Log exact weights used
-                }
-                udata['history'].append(log_entry)
-                save_db(db)
+                if st.button("ذخیره نهایی در کارنامه"):
+                    today = datetime.now().date()
+                    log_entry = session_entry(today, st.session_state['day'], total_time,
+                                              udata['profile']['weight'], st.session_state['session_sets'])
+                    save_session_log(cache, log_entry)
                 
-                # Cleanup
-                st.session_state['active'] = False
-                st.rerun()
+                    # Cleanup
+                    st.session_state['active'] = False
+                    save_workout(user)
+                    rerun()
 
 # --- TAB 3: REPORTS ---
 with tab_report:
-    st.header("گزارش حرفه‌ای (مخصوص مربی)")
+    if shown(tab_report):
+        timer.phase("render.report")
+        st.header("گزارش حرفه‌ای (مخصوص مربی)")
     
-    if udata['history']:
-        # Prepare Dataframe
-        df = prepare_export_data(udata['history'])
-        
-        st.write("این فایل شامل جزئیات کامل (وزن هر حرکت + مدت زمان) است:")
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button("📥 دانلود خروجی کامل (Excel/CSV)", csv, "gym_report_full.csv", "text/csv")
-        
-        st.markdown("### تاریخچه اخیر")
-        st.dataframe(df.tail(5)) # Show last 5 sessions
-    else:
-        st.info("هنوز تمرینی ثبت نشده است.")
+        if udata['history']:
+            from export import export_bytes, parquet_available
+            history = udata['history']
+            st.write("این فایل شامل جزئیات کامل (وزن هر حرکت + مدت زمان) است:")
+            # خروجی فقط هنگام کلیک ساخته می‌شود
+            st.download_button("📥 دانلود خروجی کامل (Excel/CSV)", lambda: export_bytes(history, "csv", NAME_TO_ID),
+                               "gym_report_full.csv", "text/csv")
+            if parquet_available():
+                st.download_button("📥 دانلود Parquet", lambda: export_bytes(history, "parquet", NAME_TO_ID),
+                                   "gym_report_full.parquet", "application/octet-stream")
+
+            st.markdown("### تاریخچه اخیر")
+            st.dataframe(export_preview(history[-5:])) # Show last 5 sessions
+        else:
+            st.info("هنوز تمرینی ثبت نشده است.")
+
+# --- TAB 4: COACH DASHBOARD ---
+if is_coach:
+    with tab_coach:
+        if shown(tab_coach):
+            timer.phase("render.coach")
+            st.header("داشبورد مربی (همه اعضا)")
+            members, volume, adh, prog = coach_aggregates()
+            if not members:
+                st.info("هنوز خلاصه‌ای ثبت نشده است.")
+            else:
+                c1, c2, c3 = st.columns(3)
+                c1.metric("اعضای فعال", members)
+                c2.metric("میانگین پایبندی (۴ هفته)", f"{adh['adherence'].mean():.0f}%")
+                c3.metric("میانگین پیشرفت وزنه", f"{prog['change'].mean():+.1f} kg")
+
+                st.markdown("### حجم تمرین هر حرکت در هفته")
+                weeks = sorted(volume['week'].unique())[-12:]
+                chart = volume[volume['week'].isin(weeks)].pivot(index='week', columns='exercise_id', values='volume')
+                st.line_chart(chart)
+
+                st.markdown("### پایبندی به برنامه سه‌روزه (کمترین اول)")
+                st.dataframe(adh, hide_index=True)
+
+                st.markdown("### پیشرفت وزنه‌ها")
+                st.dataframe(prog.groupby('exercise_id')[['first', 'current', 'change']].mean().round(1))
+                member = st.selectbox("جزییات عضو", sorted(prog['member'].unique()))
+                st.dataframe(prog[prog['member'] == member], hide_index=True)
+
+# --- TAB 5: PERFORMANCE (ADMINS) ---
+if is_admin:
+    with tab_perf:
+        if shown(tab_perf):
+            timer.phase("render.perf")
+            st.header("عملکرد برنامه (این پروسه، از آخرین راه‌اندازی)")
+            reruns = metrics.histogram(metrics.RERUN)
+            if reruns:
+                counts, total = reruns
+                c1, c2, c3 = st.columns(3)
+                c1.metric("تعداد اجرا (rerun)", sum(counts))
+                c2.metric("میانه زمان اجرا", f"{1000 * metrics.quantile(counts, 0.5):.0f} ms")
+                c3.metric("p95 زمان اجرا", f"{1000 * metrics.quantile(counts, 0.95):.0f} ms")
+                st.markdown("### توزیع زمان اجرا")
+                bounds = [f"≤{b * 1000:g}ms" for b in metrics.BUCKETS] + [f">{metrics.BUCKETS[-1]:g}s"]
+                st.bar_chart([{"bucket": b, "reruns": n} for b, n in zip(bounds, counts)],
+                             x="bucket", y="reruns", sort=False)
+
+            st.markdown("### زمان هر بخش (storage، شیت، صدا، رندر)")
+            st.dataframe(metrics.span_table(), hide_index=True)
+            st.markdown("### شمارنده‌ها (درخواست‌ها، حجم داده، خطاها)")
+            st.dataframe(metrics.counter_table(), hide_index=True)
+            c1, c2 = st.columns(2)
+            c1.caption("کش صدا"); c1.json(get_voice_cache().stats)
+            if OFFLINE_SYNC:
+                c2.caption("صف ارسال"); c2.json(get_write_queue().stats())
+
+            st.markdown("### آخرین خطاهای ثبت شده")
+            errors = metrics.recent_errors()
+            if errors:
+                st.dataframe([{"time": datetime.fromtimestamp(t).strftime("%H:%M:%S"), "where": where, "error": msg}
+                              for t, where, msg in errors], hide_index=True)
+            else:
+                st.info("خطایی ثبت نشده است.")
+            st.download_button("📥 دانلود متریک‌ها (Prometheus)", metrics.render_prometheus,
+                               "gym_metrics.prom", "text/plain")
+
+timer.finish()
+preload_pandas()
@@ -0,0 +1,153 @@
+import hashlib
+import html
+import os
+import re
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+# پوشه static کنار app.py توسط استریم‌لیت در آدرس app/static سرو می‌شود (enableStaticServing)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ASSET_BASE_URL = os.environ.get("GYM_ASSET_BASE_URL", "app/static")
+# url: ارجاع با آدرس | inline: رفتار قبلی (همه چیز داخل پیام)
+ASSET_MODE = os.environ.get("GYM_ASSET_MODE", "url")
+# سرو پیش‌فرض استریم‌لیت (app/static) فقط ETag و Last-Modified می‌فرستد و Cache-Control ندارد؛ مرورگر
+# در هر بار باز شدن صفحه دوباره می‌پرسد (پاسخ 304 بدون بدنه). کش طولانی (immutable) فقط با این سرور است:
+# اگر تنظیم شود، یک سرور فایل کوچک روی این پورت اجرا می‌شود و GYM_ASSET_BASE_URL باید به آن اشاره کند
+ASSET_PORT = int(os.environ.get("GYM_ASSET_PORT", 0))
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+APP_CSS = """
+.stApp {
+    background-image: linear_gradient(rgba(0,0,0,0.85), rgba(0,0,0,0.95)), url("$THEME_IMG_URL");
+    background-size: cover;
+    background-attachment: fixed;
+}
+h1, h2, h3, h4 { color: #ffffff !important; font-family: 'Tahoma', sans-serif; }
+p, div, label, li { color: #ecf0f1 !important; font-size: 16px; }
+.stMetric {
+    background-color: #1e1e1e;
+    border: 1px solid #333;
+    border-radius: 10px;
+    padding: 10px;
+    text-align: center;
+}
+/* Session Timer */
+.session-timer {
+    position: fixed;
+    top: 60px;
+    right: 20px;
+    background-color: rgba(46, 204, 113, 0.2);
+    border: 1px solid #2ecc71;
+    padding: 5px 15px;
+    border-radius: 20px;
+    color: #2ecc71;
+    z-index: 100;
+}
+"""
+
+# استایل صفحه‌های توضیح حرکت که داخل iframe باز می‌شوند
+FRAGMENT_CSS = """
+body { margin: 0; background: transparent; color: #ecf0f1; font-family: 'Tahoma', sans-serif; font-size: 16px; }
+h4 { color: #ffffff; }
+"""
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def write_asset(name, data, static_dir=STATIC_DIR):
+    """ذخیره فایل با نام محتوایی (name.<hash>.ext) و برگرداندن مسیر نسبی
+
+    چون نام با محتوا عوض می‌شود، مرورگر می‌تواند فایل را برای همیشه کش کند.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    stem, ext = os.path.splitext(name)
+    rel = f"{stem}.{content_hash(data)}{ext}"
+    path = os.path.join(static_dir, rel)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return rel.replace(os.sep, "/")
+
+
+def asset_url(rel):
+    return f"{ASSET_BASE_URL}/{rel}"
+
+
+def _markdown_to_html(text):
+    # توضیحات کوتاه به صورت مارک‌داون نوشته شده‌اند
+    if "<" in text:
+        return text
+    return "<p>" + re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", html.escape(text)) + "</p>"
+
+
+def fragment_height(desc):
+    """تخمین ارتفاع iframe از تعداد خط‌های توضیح"""
+    lines = len(re.findall(r"<(p|li|h4)\b", desc)) or 1
+    return 40 + 34 * lines
+
+
+def build_assets(exercise_lib, theme_img_url, static_dir=STATIC_DIR):
+    """ساخت فایل‌های CSS و توضیح حرکات؛ خروجی: نام منطقی ← مسیر نسبی"""
+    css_rel = write_asset("style.css", APP_CSS.replace("$THEME_IMG_URL", theme_img_url), static_dir)
+    frag_css_rel = write_asset("fragment.css", FRAGMENT_CSS, static_dir)
+    manifest = {"css": css_rel, "exercises": {}}
+    for ex_id, ex in exercise_lib.items():
+        page = (
+            "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            f"<link rel='stylesheet' href='../{frag_css_rel}'></head>"
+            f"<body>{_markdown_to_html(ex['desc'])}</body></html>"
+        )
+        name = f"exercises/{content_hash(ex_id.encode('utf-8'))}.html"
+        manifest["exercises"][ex_id] = write_asset(name, page, static_dir)
+    return manifest
+
+
+# --- LOCAL ASSET SERVER (OPTIONAL) ---
+class AssetHandler(SimpleHTTPRequestHandler):
+    """سرو فایل‌ها با ETag و کش طولانی (نام فایل‌ها محتوایی است)"""
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return super().send_head()
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self._cache_headers(etag)
+            self.end_headers()
+            return None
+        f = open(path, "rb")
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(stat.st_size))
+        self._cache_headers(etag)
+        self.end_headers()
+        return f
+
+    def _cache_headers(self, etag):
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", CACHE_CONTROL)
+        self.send_header("Access-Control-Allow-Origin", "*")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_assets(port, host="127.0.0.1", static_dir=STATIC_DIR):
+    """اجرای سرور فایل در یک ترد پس‌زمینه؛ GYM_ASSET_BASE_URL باید به آن اشاره کند"""
+    os.makedirs(static_dir, exist_ok=True)
+
+    def handler(*args, **kwargs):
+        return AssetHandler(*args, directory=static_dir, **kwargs)
+
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,47 @@
+"""حجم ذخیره شده برای هر جلسه: فرمت قدیمی (دیکشنری با نام فارسی) در برابر set_log
+
+    python -m bench.bench_history_size --sessions 300
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+import set_log
+from exercises import EXERCISE_LIB
+from programs import DEFAULT_TEMPLATE, compile_program
+
+
+def sessions(count, rng):
+    program, weights = compile_program(DEFAULT_TEMPLATE, "آقا", "عضله سازی", "مبتدی")
+    days = list(program)
+    start = date(2025, 1, 1)
+    for i in range(count):
+        day = days[i % len(days)]
+        sets = [{"exercise_id": ex["id"], "set": n, "reps": rng.randint(6, 12), "weight": weights[ex["id"]],
+                 "rpe": rng.choice([6, 8, 9.5]), "rest": rng.randint(40, 120)}
+                for ex in program[day] for n in range(1, ex["sets"] + 1)]
+        yield set_log.session_entry(start + timedelta(days=2 * i), day, rng.randint(30, 60), 80, sets)
+
+
+def legacy(entry):
+    """همان جلسه در فرمت قبلی: فقط وزنه هر حرکت با نام نمایشی"""
+    return {key: entry[key] for key in ("date", "date_ord", "day", "duration_min", "user_weight", "details")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    entries = list(sessions(args.sessions, random.Random(1)))
+    old = len(json.dumps([legacy(e) for e in entries]))
+    packed = len(set_log.dumps(set_log.pack(entries)))
+    sets = sum(len(e["sets"]) for e in entries)
+    print(f"{args.sessions} sessions, {sets} sets, {len(EXERCISE_LIB)} exercises in catalog")
+    print(f"legacy (one weight per exercise): {old / args.sessions:8.0f} bytes/session")
+    print(f"set_log (every set):              {packed / args.sessions:8.0f} bytes/session")
+
+
+if __name__ == "__main__":
+    main()
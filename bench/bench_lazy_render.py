@@ -0,0 +1,86 @@
+"""زمان و حجم هر rerun در اتاق تمرین با و بدون رندر تنبل تب‌ها و بازشوها
+
+    python -m bench.bench_lazy_render
+    python -m bench.bench_lazy_render --asset-mode url --rounds 3
+
+در حالت eager (GYM_LAZY_RENDER=0) همه تب‌ها و کتابخانه حرکات برنامه هفتگی در هر کلیک دوباره ساخته می‌شوند.
+هر حالت در پروسه جدا اجرا می‌شود چون تنظیمات هنگام import خوانده می‌شوند.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.payload import APP, GYM_TAB, ROOT, find_button, prebuild_voices, tree_bytes
+
+
+def measure(rounds):
+    """ورود، شروع جلسه و کلیک‌های «بعدی»؛ زمان و بایت هر rerun"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.text_input[2].input("bench")
+    at.text_input[3].input("pw")
+    find_button(at, "ثبت نام").click().run()
+    at.text_input[0].input("bench")
+    at.text_input[1].input("pw")
+    find_button(at, "ورود").click().run()
+    at.session_state["main_tab"] = GYM_TAB
+    at.run()
+
+    times, sizes = [], []
+    for _ in range(rounds):
+        find_button(at, "🚀").click().run()
+        while any(b.label.startswith("✅") for b in at.button):
+            button = find_button(at, "✅")
+            start = time.perf_counter()
+            button.click().run()
+            times.append(time.perf_counter() - start)
+            sizes.append(tree_bytes(at))
+        find_button(at, "ذخیره نهایی").click().run()
+        at.run()
+    return {"times": times, "sizes": sizes}
+
+
+def run_mode(lazy, asset_mode, rounds):
+    env = dict(os.environ)
+    workdir = tempfile.mkdtemp(prefix="gym_lazy_")
+    prebuild_voices(os.path.join(workdir, "audio"))
+    env.update({
+        "GYM_LAZY_RENDER": "1" if lazy else "0",
+        "GYM_ASSET_MODE": asset_mode,
+        "GYM_VOICE_DIR": os.path.join(workdir, "audio"),
+        "GYM_STORAGE": "sqlite",
+        "GYM_SQLITE_PATH": os.path.join(workdir, "gym.db"),
+        "GYM_JOURNAL_DIR": os.path.join(workdir, "journal"),
+    })
+    out = subprocess.run([sys.executable, "-m", "bench.bench_lazy_render", "--child", "--rounds", str(rounds)],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--asset-mode", choices=["inline", "url"], default="inline")
+    parser.add_argument("--rounds", type=int, default=2, help="تعداد جلسه‌های کامل")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(measure(args.rounds)))
+        return
+
+    print(f"{'mode':<8}{'reruns':>8}{'median ms':>12}{'p95 ms':>10}{'bytes/rerun':>14}")
+    for name, lazy in (("eager", False), ("lazy", True)):
+        result = run_mode(lazy, args.asset_mode, args.rounds)
+        times = sorted(result["times"])
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{name:<8}{len(times):>8}{statistics.median(times) * 1000:>12.1f}{p95 * 1000:>10.1f}"
+              f"{statistics.mean(result['sizes']):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
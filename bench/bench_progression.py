@@ -0,0 +1,53 @@
+"""زمان محاسبه وزنه‌های پیشنهادی برای کل باشگاه (همان مسیر scripts.nightly_progression)
+
+    python -m bench.bench_progression --members 10000 --sessions 150
+"""
+import argparse
+import random
+import time
+from datetime import date
+
+from exercises import EXERCISE_LIB
+from overload import history_frame, recommend
+from set_log import RPE_SCALE
+
+LIFTS = [ex_id for ex_id, ex in EXERCISE_LIB.items() if ex["kind"] == "reps"]
+
+
+def synthetic_history(sessions, today_ord, rng):
+    history = []
+    weights = {ex_id: rng.choice([0, 4, 8, 10]) for ex_id in LIFTS}
+    for i in range(sessions):
+        done = rng.sample(LIFTS, 4)
+        history.append({
+            "date_ord": today_ord - 2 * (sessions - i),
+            "details": {EXERCISE_LIB[ex_id]["name"]: weights[ex_id] for ex_id in done},
+            "rpe": {ex_id: rng.choice(list(RPE_SCALE.values())) for ex_id in done},
+        })
+        for ex_id in done:
+            weights[ex_id] += rng.choice([0, 0, 1])
+    return history
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=100, help="جلسه برای هر عضو")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    today = date.today().toordinal()
+    members = [(f"m{i}", synthetic_history(args.sessions, today, rng)) for i in range(args.members)]
+
+    start = time.perf_counter()
+    frame = history_frame(members)
+    built = time.perf_counter()
+    recs = recommend(frame, today)
+    done = time.perf_counter()
+    print(f"{len(frame)} rows -> {len(recs)} recommendations")
+    print(f"frame {built - start:.2f}s, recommend {done - built:.2f}s")
+    print(recs["reason"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
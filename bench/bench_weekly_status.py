@@ -0,0 +1,79 @@
+"""میکروبنچمارک وضعیت هفتگی: پیمایش کامل تاریخچه در هر rerun در برابر ایندکس
+
+    python -m bench.bench_weekly_status --rows 10000 100000
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from history_index import HistoryIndex
+
+DAYS = ["Day 1 (Upper)", "Day 2 (Lower)", "Day 3 (Full)"]
+
+
+def synthetic_history(rows, start):
+    """چند جلسه در روز به ترتیب زمانی، تا امروز"""
+    span = max(1, (date.today() - start).days)
+    entries = []
+    for i in range(rows):
+        d = start + timedelta(days=i * span // rows)
+        entries.append({"date": str(d), "day": random.choice(DAYS), "duration_min": 40})
+    return entries
+
+
+def full_scan(history, start_date):
+    """پیاده‌سازی قبلی get_weekly_status (strptime روی همه جلسه‌ها)"""
+    today = datetime.now().date()
+    current_week = ((today - start_date).days // 7) + 1
+    week_start_day = start_date + timedelta(weeks=current_week - 1)
+    completed = []
+    for log in history:
+        try:
+            log_date = datetime.strptime(log['date'], "%Y-%m-%d").date()
+            if log_date >= week_start_day:
+                day_name = log.get('day', log.get('plan'))
+                if day_name:
+                    completed.append(day_name)
+        except Exception:
+            continue
+    return current_week, completed
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - t0) / repeat, result
+
+
+def run(rows, repeat=20):
+    start = date.today() - timedelta(days=3 * 365)
+    history = synthetic_history(rows, start)
+    current_week = ((date.today() - start).days // 7) + 1
+
+    scan_s, (_, expected) = timed(lambda: full_scan(history, start), max(1, repeat // 10))
+    build_s, index = timed(lambda: HistoryIndex(start, history), max(1, repeat // 10))
+    lookup_s, got = timed(lambda: index.completed_in_week(current_week), repeat * 1000)
+    today = date.today()
+    entry = {"date": str(today), "date_ord": today.toordinal(), "day": DAYS[0]}
+    add_s, _ = timed(lambda: index.add(entry), repeat * 100)
+    assert sorted(got[:len(expected)]) == sorted(expected)
+    return {"rows": rows, "full_scan_ms": scan_s * 1e3, "index_build_ms": build_s * 1e3,
+            "lookup_us": lookup_s * 1e6, "incremental_add_us": add_s * 1e6}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    print(f"{'rows':>8} {'full scan/rerun':>16} {'index build/session':>20} {'lookup/rerun':>13} {'add':>9}")
+    for rows in args.rows:
+        r = run(rows, args.repeat)
+        print(f"{r['rows']:>8} {r['full_scan_ms']:>13.2f} ms {r['index_build_ms']:>17.2f} ms"
+              f" {r['lookup_us']:>10.3f} us {r['incremental_add_us']:>6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
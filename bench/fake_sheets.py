@@ -0,0 +1,179 @@
+"""جایگزین محلی گوگل شیت برای تست بار و بنچمارک (فقط متدهایی که storage استفاده می‌کند)"""
+import re
+import threading
+import time
+
+_A1 = re.compile(r"^([A-Z]+)(\d*)$")
+
+
+def _parse(cell, last_row=None):
+    col, row = _A1.match(cell).groups()
+    c = 0
+    for ch in col:
+        c = c * 26 + ord(ch) - 64
+    return int(row) if row else last_row, c
+
+
+def _range(rng, last_row=None):
+    """A1:C5؛ بدون شماره ردیف در انتها (A5:C) تا آخرین ردیف"""
+    start, _, end = rng.partition(":")
+    r1, c1 = _parse(start)
+    r2, c2 = _parse(end, last_row) if end else (r1, c1)
+    return r1, c1, r2, c2
+
+
+class FakeCell:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeWorksheet:
+    """ورک‌شیت در حافظه؛ هر درخواست latency ثانیه طول می‌کشد و اتمیک است"""
+
+    def __init__(self, title, latency=0.0):
+        self.title = title
+        self.latency = latency
+        self.rows = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _request(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _cell(self, r, c):
+        if r <= len(self.rows) and c <= len(self.rows[r - 1]):
+            return self.rows[r - 1][c - 1]
+        return ""
+
+    def _set(self, r, c, value):
+        while len(self.rows) < r:
+            self.rows.append([])
+        row = self.rows[r - 1]
+        while len(row) < c:
+            row.append("")
+        row[c - 1] = "" if value is None else str(value)
+
+    def col_values(self, col):
+        self._request()
+        with self._lock:
+            values = [self._cell(r, col) for r in range(1, len(self.rows) + 1)]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def get_all_values(self):
+        self._request()
+        with self._lock:
+            return [list(row) for row in self.rows]
+
+    def get(self, rng):
+        self._request()
+        with self._lock:
+            return self._get(rng)
+
+    def batch_get(self, ranges):
+        self._request()
+        with self._lock:
+            return [self._get(rng) for rng in ranges]
+
+    def _get(self, rng):
+        r1, c1, r2, c2 = _range(rng, len(self.rows))
+        out = []
+        for r in range(r1, r2 + 1):
+            row = [self._cell(r, c) for c in range(c1, c2 + 1)]
+            while row and row[-1] == "":
+                row.pop()
+            out.append(row)
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def acell(self, cell):
+        self._request()
+        with self._lock:
+            return FakeCell(self._cell(*_parse(cell)) or None)
+
+    def _write(self, rng, values):
+        r1, c1, _, _ = _range(rng)
+        for i, row in enumerate(values):
+            for j, value in enumerate(row):
+                self._set(r1 + i, c1 + j, value)
+
+    def update(self, values, range_name, value_input_option=None):
+        self._request()
+        with self._lock:
+            self._write(range_name, values)
+
+    def batch_update(self, data, value_input_option=None):
+        self._request()
+        with self._lock:
+            for item in data:
+                self._write(item["range"], item["values"])
+
+    def append_row(self, values, value_input_option=None):
+        self.append_rows([values], value_input_option)
+
+    def append_rows(self, values, value_input_option=None):
+        self._request()
+        with self._lock:
+            start = len(self.rows) + 1
+            for i, row in enumerate(values):
+                for j, value in enumerate(row):
+                    self._set(start + i, j + 1, value)
+
+
+class FakeSpreadsheet:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.worksheets = {}
+        self._lock = threading.Lock()
+
+    def worksheet(self, title):
+        with self._lock:
+            if title not in self.worksheets:
+                self.worksheets[title] = FakeWorksheet(title, self.latency)
+            return self.worksheets[title]
+
+    def add_worksheet(self, title, rows=100, cols=3):
+        return self.worksheet(title)
+
+    @property
+    def sheet1(self):
+        return self.worksheet("Sheet1")
+
+    @property
+    def calls(self):
+        """تعداد کل درخواست‌ها به همه ورک‌شیت‌ها"""
+        with self._lock:
+            return sum(ws.calls for ws in self.worksheets.values())
+
+
+class FakeClient:
+    """جایگزین gspread.Client؛ همه نام‌ها به یک اسپردشیت مشترک می‌رسند"""
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open(self, name):
+        return self.spreadsheet
+
+
+def fake_sheets_storage(latency=0.0):
+    """SheetsStorage واقعی روی اسپردشیت محلی"""
+    from storage import SheetConnection, SheetsStorage
+
+    spreadsheet = FakeSpreadsheet(latency)
+    conn = SheetConnection(client_factory=lambda: FakeClient(spreadsheet))
+    return SheetsStorage(conn), spreadsheet
+
+
+def install_fake_sheets(latency=0.0):
+    """اتصال شیت برنامه (get_sheet_connection) به اسپردشیت محلی، برای اجرای app.py با AppTest"""
+    import storage
+
+    spreadsheet = FakeSpreadsheet(latency)
+    conn = storage.SheetConnection(client_factory=lambda: FakeClient(spreadsheet))
+    storage.get_sheet_connection = lambda: conn
+    return spreadsheet
@@ -0,0 +1,141 @@
+"""تست بار ذخیره‌سازی همزمان: N سشن روی M عضو (چند دستگاه برای هر عضو)
+
+    python -m bench.load_test --sessions 40 --members 8 --rounds 6
+    python -m bench.load_test --mode naive      # بدون نسخه، برای مقایسه
+    python -m bench.load_test --backend sqlite
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from bench.fake_sheets import fake_sheets_storage
+from session_cache import UserCache
+from storage import ConflictError, SQLiteStorage
+
+
+class CountingStorage:
+    """شمارش تداخل‌ها روی هر بک‌اند"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.conflicts = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def put_user(self, username, record, expected_version=None):
+        try:
+            return self.inner.put_user(username, record, expected_version=expected_version)
+        except ConflictError:
+            with self._lock:
+                self.conflicts += 1
+            raise
+
+
+class NaiveCache(UserCache):
+    """رفتار قبلی: کل رکورد بدون بررسی نسخه بازنویسی می‌شود"""
+
+    def flush(self):
+        if self.dirty:
+            self.storage.put_user(self.username, self.record)
+            self.dirty.clear()
+            self.journal.clear()
+        self.last_flush = time.time()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, round(q / 100 * len(values) + 0.5) - 1))
+    return values[k]
+
+
+def run(sessions=40, members=8, rounds=6, mode="versioned", backend="sheets", latency=0.01):
+    workdir = tempfile.mkdtemp(prefix="gym_load_")
+    if backend == "sqlite":
+        inner = SQLiteStorage(os.path.join(workdir, "gym.db"))
+    else:
+        inner, _ = fake_sheets_storage(latency)
+    storage = CountingStorage(inner)
+    usernames = [f"member{m}" for m in range(members)]
+    for name in usernames:
+        storage.put_user(name, {"password": "x", "profile": {}, "program": {}, "weights": {}, "history": []})
+
+    cache_cls = NaiveCache if mode == "naive" else UserCache
+    latencies = []
+    errors = []
+    lat_lock = threading.Lock()
+    barrier = threading.Barrier(sessions)
+
+    def session(i):
+        username = usernames[i % members]
+        cache = cache_cls(storage, username, journal_dir=os.path.join(workdir, f"journal{i}"))
+        barrier.wait()
+        try:
+            for r in range(rounds):
+                cache.load()
+                cache.set_weight(f"s{i}_ex{r}", r + 1)
+                t0 = time.perf_counter()
+                cache.flush()
+                with lat_lock:
+                    latencies.append(time.perf_counter() - t0)
+            cache.append_history({"session": i})
+        except Exception as e:
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    lost_weights = lost_history = 0
+    for m, name in enumerate(usernames):
+        record = inner.get_user(name)
+        logged = {e.get("session") for e in record["history"]}
+        for i in range(m, sessions, members):
+            for r in range(rounds):
+                if record["weights"].get(f"s{i}_ex{r}") != r + 1:
+                    lost_weights += 1
+            if i not in logged:
+                lost_history += 1
+
+    return {
+        "mode": mode,
+        "backend": backend,
+        "sessions": sessions,
+        "members": members,
+        "saves": len(latencies),
+        "conflicts": storage.conflicts,
+        "errors": len(errors),
+        "lost_weight_updates": lost_weights,
+        "lost_history_entries": lost_history,
+        "p50_save_ms": round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+        "p95_save_ms": round(percentile(latencies, 95) * 1000, 2),
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--members", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--mode", choices=["versioned", "naive"], default="versioned")
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    parser.add_argument("--latency", type=float, default=0.01, help="تاخیر هر درخواست شیت (ثانیه)")
+    args = parser.parse_args(argv)
+    report = run(args.sessions, args.members, args.rounds, args.mode, args.backend, args.latency)
+    for key, value in report.items():
+        print(f"{key:>22}: {value}")
+
+
+if __name__ == "__main__":
+    main()
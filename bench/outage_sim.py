@@ -0,0 +1,176 @@
+"""شبیه‌سازی قطعی دیتابیس اصلی در وسط جلسه‌های تمرین و برگشت آن
+
+    python -m bench.outage_sim
+    python -m bench.outage_sim --backend sqlite --members 20 --sessions 5 --outage 3
+
+چند عضو جلسه ثبت می‌کنند در حالی که دیتابیس اصلی قطع است (هر درخواست خطای شبکه می‌دهد)،
+بعضی درخواست‌ها بعد از نوشته شدن پاسخشان گم می‌شود (ارسال دوباره)، بعد اتصال برمی‌گردد.
+در پایان بررسی می‌شود که هیچ جلسه یا وزنه‌ای گم یا تکراری نشده و UI هیچ وقت منتظر شبکه نمانده است.
+جدا: عضوی که یک عملیات در انتظار تلاش دوباره و یک عملیات تازه دارد نباید ترد ارسال را در حلقه
+بی‌وقفه بیندازد (عملیات تازه تا تلاش دوباره قبلی منتظر می‌ماند).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import sync_queue
+from bench.fake_sheets import fake_sheets_storage
+from set_log import session_entry
+from storage import SQLiteStorage
+from sync_queue import OfflineUserCache, SyncWorker, WriteQueue
+
+
+class FlakyStorage:
+    """بک‌اند با قطعی قابل کنترل؛ lose_acks: احتمال گم شدن پاسخ بعد از نوشتن موفق"""
+
+    def __init__(self, inner, lose_acks=0.0, seed=1):
+        self.inner = inner
+        self.down = False
+        self.lose_acks = lose_acks
+        self.calls = 0
+        self.rejected = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        method = getattr(self.inner, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            with self._lock:
+                self.calls += 1
+                if self.down:
+                    self.rejected += 1
+                    raise ConnectionError("remote store unreachable")
+                lose = name in ("put_user", "append_history_many") and self._rng.random() < self.lose_acks
+            result = method(*args, **kwargs)
+            if lose:
+                raise TimeoutError("response lost after write")
+            return result
+        return call
+
+
+BACKOFF_WINDOW = 1.0  # ثانیه
+
+
+def backoff_polls(workdir, window=BACKOFF_WINDOW):
+    """تعداد دورهای ارسال در مدتی که تنها عضو صف منتظر تلاش دوباره است (باید چند بار باشد، نه هزاران)"""
+    queue = WriteQueue(os.path.join(workdir, "backoff.db"))
+    queue.enqueue("member0", "weight", {"op": "weight", "id": "RDL", "value": 10})
+    queue.failed([row[0] for row in queue.due()], "ConnectionError()", now=time.time() + window)
+    queue.enqueue("member0", "weight", {"op": "weight", "id": "RDL", "value": 11})
+    polls = 0
+    due = queue.due
+
+    def counted_due(*args, **kwargs):
+        nonlocal polls
+        polls += 1
+        return due(*args, **kwargs)
+
+    queue.due = counted_due
+    # در این مدت هیچ عملیاتی آماده نیست، پس به دیتابیس اصلی نیازی نیست
+    worker = SyncWorker(queue, None, batch_delay=0.05, interval=0.2).start()
+    time.sleep(window)
+    worker.stop()
+    return polls
+
+
+def run(backend="sheets", members=10, sessions=4, outage=2.0, lose_acks=0.2):
+    workdir = tempfile.mkdtemp(prefix="gym_outage_")
+    if backend == "sqlite":
+        inner = SQLiteStorage(os.path.join(workdir, "gym.db"))
+    else:
+        inner, _ = fake_sheets_storage()
+    remote = FlakyStorage(inner, lose_acks)
+    usernames = [f"member{m}" for m in range(members)]
+    for name in usernames:
+        inner.put_user(name, {"profile": {"weight": 70}, "weights": {}, "history": []})
+
+    queue = WriteQueue(os.path.join(workdir, "queue.db"))
+    worker = SyncWorker(queue, remote, batch_delay=0.05, interval=0.2)
+    # تلاش دوباره سریع‌تر از حالت واقعی تا شبیه‌سازی کوتاه بماند
+    sync_queue.RETRY_BASE, sync_queue.RETRY_MAX = 0.05, 0.5
+    worker.start()
+
+    caches = {name: OfflineUserCache(remote, name, queue) for name in usernames}
+    for cache in caches.values():
+        cache.load()
+
+    ui_latencies = []
+    remote.down = True
+    started = time.perf_counter()
+    day0 = date(2026, 1, 1)
+    for s in range(sessions):
+        for cache in caches.values():
+            entry = session_entry(day0 + timedelta(days=2 * s), "Day 1", 30, 70, [
+                {"exercise_id": "RDL", "set": n, "reps": 10, "weight": 10 + s, "rpe": 8, "rest": 60} for n in (1, 2, 3)])
+            t0 = time.perf_counter()
+            cache.append_history(entry)
+            cache.set_weight("RDL", 11 + s)
+            cache.update_profile(weight=70 + s)
+            cache.flush()
+            ui_latencies.append(time.perf_counter() - t0)
+        if s == sessions // 2:
+            # بازگشت وسط کار: بقیه جلسه‌ها در حالت آنلاین ولی با پاسخ‌های گم شده
+            time.sleep(max(0.0, outage - (time.perf_counter() - started)))
+            remote.down = False
+
+    remote.down = False
+    deadline = time.time() + 30
+    while queue.stats()["pending"] and time.time() < deadline:
+        time.sleep(0.05)
+    remote.lose_acks = 0.0
+    worker.stop()
+
+    lost = duplicated = wrong_weights = 0
+    for name in usernames:
+        record = inner.get_user(name)
+        keys = [e.get("key") for e in record["history"]]
+        lost += sessions - len(set(keys))
+        duplicated += len(keys) - len(set(keys))
+        if record["weights"].get("RDL") != 10 + sessions or record["profile"].get("weight") != 69 + sessions:
+            wrong_weights += 1
+
+    return {
+        "backend": backend,
+        "members": members,
+        "sessions": members * sessions,
+        "pending_after": queue.stats()["pending"],
+        "remote_calls": remote.calls,
+        "rejected_while_down": remote.rejected,
+        "sync_failures": worker.failures,
+        "lost_sessions": lost,
+        "duplicated_sessions": duplicated,
+        "wrong_records": wrong_weights,
+        "max_ui_ms": round(max(ui_latencies) * 1000, 2),
+        "polls_in_backoff": backoff_polls(workdir),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=4, help="جلسه برای هر عضو")
+    parser.add_argument("--outage", type=float, default=2.0, help="حداقل مدت قطعی (ثانیه)")
+    parser.add_argument("--lose-acks", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    result = run(args.backend, args.members, args.sessions, args.outage, args.lose_acks)
+    for key, value in result.items():
+        print(f"{key:<22}{value}")
+    # بدون عملیات آماده: یک دور برای هر interval (0.2 ثانیه) و چند دور اضافه
+    ok = not (result["pending_after"] or result["lost_sessions"] or result["duplicated_sessions"]
+              or result["wrong_records"] or result["polls_in_backoff"] > BACKOFF_WINDOW / 0.2 + 3)
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""اندازه پیام‌های ارسالی به مرورگر در هر rerun (قبل/بعد از سرو فایل‌ها با آدرس)
+
+    python -m bench.payload            # هر دو حالت inline و url
+    python -m bench.payload --mode url
+
+هر حالت در یک پروسه جدا اجرا می‌شود چون تنظیمات هنگام import خوانده می‌شوند.
+کلیپ‌های صوتی با بایت‌های ساختگی هم‌اندازه خروجی gTTS از قبل ساخته می‌شوند تا شبکه لازم نباشد.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+CLIP_BYTES = 24_000  # اندازه تقریبی یک جمله کوتاه gTTS
+GYM_TAB = "🏋️ اتاق تمرین"
+
+
+def tree_bytes(at):
+    """مجموع اندازه پروتوبافر همه المان‌های صفحه (تقریب حجم delta های یک rerun)"""
+    total = 0
+    for node in at._tree:
+        proto = getattr(node, "proto", None)
+        if proto is not None and hasattr(proto, "ByteSize"):
+            total += proto.ByteSize()
+    return total
+
+
+def find_button(at, label):
+    for b in at.button:
+        if b.label.startswith(label):
+            return b
+    raise KeyError(label)
+
+
+def measure():
+    """ثبت نام، ورود و یک جلسه کامل؛ برگرداندن بایت‌های هر rerun"""
+    from streamlit.testing.v1 import AppTest
+
+    steps = []
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    steps.append(("login_page", tree_bytes(at)))
+    at.text_input[2].input("bench")
+    at.text_input[3].input("pw")
+    find_button(at, "ثبت نام").click().run()
+    at.text_input[0].input("bench")
+    at.text_input[1].input("pw")
+    find_button(at, "ورود").click().run()
+    steps.append(("dashboard", tree_bytes(at)))
+    at.session_state["main_tab"] = GYM_TAB
+    at.run()
+    find_button(at, "🚀").click().run()
+    steps.append(("session_start", tree_bytes(at)))
+    i = 0
+    while any(b.label.startswith("✅") for b in at.button):
+        find_button(at, "✅").click().run()
+        i += 1
+        steps.append((f"next_{i}", tree_bytes(at)))
+    return steps
+
+
+def prebuild_voices(directory):
+    from exercises import EXERCISE_LIB
+    from voice_cache import VoiceCache, voice_key
+
+    cache = VoiceCache(directory)
+    for ex in EXERCISE_LIB.values():
+        cache.store(voice_key(ex["voice"]), b"\xff" * CLIP_BYTES)
+
+
+def run_mode(mode):
+    env = dict(os.environ)
+    workdir = tempfile.mkdtemp(prefix="gym_payload_")
+    prebuild_voices(os.path.join(workdir, "audio"))
+    env.update({
+        "GYM_VOICE_DIR": os.path.join(workdir, "audio"),
+        "GYM_ASSET_MODE": mode,
+        "GYM_STORAGE": "sqlite",
+        "GYM_SQLITE_PATH": os.path.join(workdir, "gym.db"),
+        "GYM_JOURNAL_DIR": os.path.join(workdir, "journal"),
+    })
+    out = subprocess.run([sys.executable, "-m", "bench.payload", "--child"], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["inline", "url", "both"], default="both")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(measure()))
+        return
+
+    modes = ["inline", "url"] if args.mode == "both" else [args.mode]
+    results = {mode: run_mode(mode) for mode in modes}
+    steps = [name for name, _ in results[modes[0]]]
+    print(f"{'step':<16}" + "".join(f"{m:>12}" for m in modes))
+    for i, name in enumerate(steps):
+        print(f"{name:<16}" + "".join(f"{results[m][i][1]:>12}" for m in modes))
+    for m in modes:
+        print(f"{'total ' + m:<16}{sum(b for _, b in results[m]):>12}")
+
+
+if __name__ == "__main__":
+    main()
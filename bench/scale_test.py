@@ -0,0 +1,237 @@
+"""تست مقیاس افقی: K نسخه (پروسه) برنامه با یک دیتابیس و یک انبار مشترک
+
+    python -m bench.scale_test                        # 1، 2 و 4 نسخه، 6 عضو برای هر نسخه
+    python -m bench.scale_test --replicas 1 4 --members 10
+    python -m bench.scale_test --shared redis://localhost:6379/0
+
+هر نسخه یک پروسه جدا با پوشه صدای خودش است (مثل چند سرور پشت load balancer)؛ صف نوشتن در انبار
+مشترک است. مرحله اول: هر نسخه برای اعضای خودش وارد می‌شود، نیمی از جلسه تمرین را انجام می‌دهد و
+بدون صبر برای ارسال صف بسته می‌شود (مثل کوچک شدن مقیاس)؛ نسخه‌های مرحله بعد صف را ارسال می‌کنند.
+مرحله دوم (پروسه‌های تازه، مثل ری‌استارت یا جابجایی load balancer): هر عضو با توکن آدرس صفحه به
+نسخه بعدی وصل می‌شود؛ باید بدون ورود دوباره از همان حرکت ادامه دهد و جلسه را ذخیره کند.
+در پایان هر عضو باید دقیقا یک جلسه تازه در دیتابیس داشته باشد. صداها یک بار قبل از اجرا در انبار
+مشترک ساخته می‌شوند؛ هیچ نسخه‌ای نباید gTTS صدا بزند (tts) یا حرکتی را بی‌صدا بگذارد (no voice).
+
+توان عملیاتی (جلسه کامل در ثانیه) با K نسخه با K برابر یک نسخه مقایسه می‌شود. روی ماشینی با
+هسته‌های کمتر از K، پردازنده گلوگاه است و عدد بهره‌وری مقیاس پایین می‌آید.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+REPLICAS = (1, 2, 4)
+MEMBERS = 6  # عضو برای هر نسخه
+SESSIONS = 4  # جلسه قبلی هر عضو ساختگی
+KDF_ITERATIONS = 1000  # ورود در تست بار نباید زیر PBKDF2 گم شود
+CLAIM_SECONDS = 5  # رزرو عملیات نسخه‌ای که وسط ارسال بسته شده زودتر آزاد شود
+GYM_TAB = "🏋️ اتاق تمرین"
+
+
+def find_button(at, label):
+    for b in at.button:
+        if b.label.startswith(label):
+            return b
+    return None
+
+
+def synthesized():
+    import metrics
+
+    hist = metrics.histogram(metrics.SPAN, span="tts.synthesize")
+    return sum(hist[0]) if hist else 0
+
+
+def voice_missing():
+    import metrics
+
+    counters = metrics.REGISTRY.snapshot()[0]
+    return sum(v for (name, _), v in counters.items() if name == "gym_voice_missing_total")
+
+
+def prebuild_voices(shared):
+    """صدای حرکات یک بار (با gTTS ساختگی) در انبار مشترک، مثل اجرای scripts.build_voice_cache قبل از استقرار"""
+    from bench.stub_tts import install_stub_tts
+    from scripts.build_voice_cache import build
+    from shared_store import open_shared_store
+    from voice_cache import VoiceCache
+
+    install_stub_tts()
+    build(VoiceCache(tempfile.mkdtemp(prefix="gym_voices_"), shared=open_shared_store(shared)))
+
+
+def start_phase(members):
+    """ورود و نیمی از جلسه؛ توکن سشن و شماره حرکت هر عضو"""
+    from streamlit.testing.v1 import AppTest
+
+    from bench.synthetic import PASSWORD
+
+    state = {}
+    for username in members:
+        at = AppTest.from_file(APP, default_timeout=120).run()
+        at.text_input[0].input(username)
+        at.text_input[1].input(PASSWORD)
+        find_button(at, "ورود").click().run()
+        at.session_state["main_tab"] = GYM_TAB
+        at.run()
+        find_button(at, "🚀").click().run()
+        for _ in range(3):
+            find_button(at, "➕").click().run()
+            find_button(at, "✅").click().run()
+        assert not at.exception, at.exception
+        state[username] = {"token": at.query_params["s"], "idx": at.session_state["idx"]}
+    return state
+
+
+def resume_phase(state):
+    """اتصال دوباره با توکن، ادامه از همان حرکت و ذخیره؛ تعداد اعضایی که درست ادامه دادند"""
+    from streamlit.testing.v1 import AppTest
+
+    resumed = 0
+    for username, saved in state.items():
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.query_params["s"] = saved["token"]
+        at.session_state["main_tab"] = GYM_TAB
+        at.run()
+        assert not at.exception, at.exception
+        if at.session_state["user"] != username or at.session_state["idx"] != saved["idx"]:
+            continue
+        resumed += 1
+        while find_button(at, "✅"):
+            find_button(at, "➕").click().run()
+            find_button(at, "✅").click().run()
+        find_button(at, "ذخیره نهایی").click().run()
+        assert not at.exception, at.exception
+    return resumed
+
+
+def replica(phase, state_file):
+    """یک نسخه برنامه در همین پروسه؛ خروجی JSON در آخرین خط"""
+    from bench.stub_tts import install_stub_tts
+    from streamlit.testing.v1 import AppTest
+
+    install_stub_tts()
+    # هزینه import استریم‌لیت و برنامه جزو زمان اندازه‌گیری نیست
+    AppTest.from_file(APP, default_timeout=120).run()
+    with open(state_file) as f:
+        work = json.load(f)
+    start = time.time()
+    if phase == "start":
+        out = {"state": start_phase(work)}
+    else:
+        out = {"resumed": resume_phase(work)}
+    end = time.time()
+    if phase != "start":
+        from shared_store import open_shared_store
+        from sync_queue import open_write_queue
+
+        # صف مشترک است: هر نسخه تا ارسال تغییرات همه نسخه‌ها (از جمله نسخه‌های بسته شده) صبر می‌کند
+        queue = open_write_queue(open_shared_store())
+        while queue.stats()["pending"]:
+            time.sleep(0.02)
+    out.update({"start": start, "end": end, "synthesized": synthesized(), "missing": voice_missing()})
+    return out
+
+
+def run_phase(phase, workdir, k, work, shared):
+    """K نسخه همزمان؛ کار هر نسخه در work[r]"""
+    procs = []
+    for r in range(k):
+        state_file = os.path.join(workdir, f"{phase}-{r}.json")
+        with open(state_file, "w") as f:
+            json.dump(work[r], f)
+        env = dict(os.environ)
+        env.update({
+            "GYM_STORAGE": "sqlite",
+            "GYM_SQLITE_PATH": os.path.join(workdir, "gym.db"),
+            "GYM_SHARED_STORE": shared,
+            "GYM_SYNC_CLAIM": str(CLAIM_SECONDS),
+            "GYM_VOICE_DIR": os.path.join(workdir, f"audio-{r}"),
+            "GYM_JOURNAL_DIR": os.path.join(workdir, f"journal-{r}"),
+            "GYM_KDF_ITERATIONS": str(KDF_ITERATIONS),
+        })
+        env.pop("GYM_QUEUE_PATH", None)
+        env.pop("GYM_METRICS_FILE", None)
+        env.pop("GYM_METRICS_PORT", None)
+        procs.append(subprocess.Popen([sys.executable, "-m", "bench.scale_test", "--replica", phase, state_file],
+                                      cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True))
+    results = []
+    for proc in procs:
+        stdout, stderr = proc.communicate()
+        if proc.returncode:
+            sys.stderr.write(stderr)
+            raise SystemExit(f"replica failed: {phase}")
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+    return results
+
+
+def run(k, members, sessions, shared=None):
+    os.environ["GYM_KDF_ITERATIONS"] = str(KDF_ITERATIONS)
+    from bench.synthetic import member_name, seed_storage
+    from storage import SQLiteStorage
+
+    workdir = tempfile.mkdtemp(prefix="gym_scale_")
+    shared = shared or os.path.join(workdir, "shared.db")
+    storage = SQLiteStorage(os.path.join(workdir, "gym.db"))
+    seed_storage(storage, k * members, sessions)
+    names = [member_name(i) for i in range(k * members)]
+    assigned = [names[r * members:(r + 1) * members] for r in range(k)]
+    prebuild_voices(shared)
+
+    first = run_phase("start", workdir, k, assigned, shared)
+    # هر عضو در مرحله دوم به نسخه بعدی می‌رسد
+    handover = [first[(r - 1) % k]["state"] for r in range(k)]
+    second = run_phase("resume", workdir, k, handover, shared)
+
+    wall = sum(max(p["end"] for p in phase) - min(p["start"] for p in phase) for phase in (first, second))
+    saved = sum(len(storage.get_user(name)["history"]) - sessions for name in names)
+    return {
+        "replicas": k,
+        "workouts": len(names),
+        "wall_s": round(wall, 2),
+        "throughput": round(len(names) / wall, 3),
+        "resumed": sum(p["resumed"] for p in second),
+        "saved": saved,
+        "synthesized": sum(p["synthesized"] for p in first + second),
+        "missing": sum(p["missing"] for p in first + second),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replicas", type=int, nargs="+", default=list(REPLICAS))
+    parser.add_argument("--members", type=int, default=MEMBERS, help="عضو برای هر نسخه")
+    parser.add_argument("--sessions", type=int, default=SESSIONS, help="جلسه قبلی هر عضو ساختگی")
+    parser.add_argument("--shared", help="GYM_SHARED_STORE (پیش‌فرض فایل SQLite موقت)")
+    parser.add_argument("--min-efficiency", type=float, default=0.0,
+                        help="خروج با کد 1 اگر بهره‌وری مقیاس کمتر باشد (مثلا 0.8)")
+    parser.add_argument("--replica", nargs=2, metavar=("PHASE", "STATE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.replica:
+        print(json.dumps(replica(*args.replica)))
+        return
+
+    print(f"cpus {os.cpu_count()}, {args.members} members per replica")
+    print(f"{'replicas':>8}{'workouts':>10}{'wall s':>9}{'per s':>8}{'efficiency':>12}{'resumed':>9}"
+          f"{'saved':>7}{'tts':>5}{'no voice':>10}")
+    base, failed = None, False
+    for k in args.replicas:
+        r = run(k, args.members, args.sessions, args.shared)
+        base = base or r["throughput"] / r["replicas"]
+        efficiency = r["throughput"] / (base * k)
+        # صدا فقط از کلیپ‌های از قبل ساخته شده (انبار مشترک)؛ هیچ نسخه‌ای gTTS صدا نمی‌زند
+        ok = r["resumed"] == r["saved"] == r["workouts"] and not r["synthesized"] and not r["missing"]
+        failed |= not ok or efficiency < args.min_efficiency
+        print(f"{k:>8}{r['workouts']:>10}{r['wall_s']:>9}{r['throughput']:>8}{efficiency:>12.2f}"
+              f"{r['resumed']:>9}{r['saved']:>7}{r['synthesized']:>5}{r['missing']:>10}{'' if ok else '  FAILED'}")
+    print("FAILED" if failed else "OK")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
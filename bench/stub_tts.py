@@ -0,0 +1,24 @@
+"""جایگزین gTTS برای بنچمارک: بدون شبکه، کلیپ ساختگی هم‌اندازه خروجی واقعی"""
+import sys
+import time
+import types
+
+from bench.payload import CLIP_BYTES
+
+
+def install_stub_tts(delay=0.0, clip_bytes=CLIP_BYTES):
+    """ماژول gtts با نسخه ساختگی جایگزین می‌شود (voice_cache آن را هنگام ساخت صدا import می‌کند)"""
+
+    class gTTS:
+        def __init__(self, text, lang="en", **kwargs):
+            self.text = text
+            self.lang = lang
+
+        def write_to_fp(self, fp):
+            if delay:
+                time.sleep(delay)
+            fp.write(b"\xff" * clip_bytes)
+
+    module = types.ModuleType("gtts")
+    module.gTTS = gTTS
+    sys.modules["gtts"] = module
@@ -0,0 +1,395 @@
+"""بنچمارک تکرارپذیر جریان‌های اصلی برنامه، بدون حساب گوگل و اینترنت
+
+    python -m bench.suite                           # 10، 100، 1000 و 10000 عضو
+    python -m bench.suite --users 10 1000 --latency 0.05
+    python -m bench.suite --compare HEAD~1          # مقایسه با نتیجه ذخیره شده یک commit دیگر
+
+app.py با AppTest اجرا می‌شود؛ گوگل شیت با bench.fake_sheets و gTTS با bench.stub_tts جایگزین
+می‌شوند. برای هر اندازه دیتابیس یک پروسه جدا ساخته می‌شود (حافظه و کش‌ها از صفر) و جریان‌های
+ثبت نام، ورود، یک جلسه کامل و خروجی گزارش اجرا می‌شوند. نتیجه: زمان هر مرحله، تعداد درخواست
+به شیت در هر جریان و بیشینه حافظه پروسه. خروجی در bench/results/<commit>.json ذخیره می‌شود.
+
+شروع سرد جدا و در چند پروسه تازه اندازه گرفته می‌شود: زمان اولین رندر صفحه ورود باید زیر
+FIRST_PAINT_TARGET_MS باشد و هیچ ماژول سنگینی (HEAVY_MODULES) برای آن بارگذاری نشده باشد؛
+در غیر این صورت خروج با کد 1.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+SIZES = (10, 100, 1000, 10000)
+SESSIONS = 24  # جلسه برای هر عضو ساختگی
+TOLERANCE = 0.25  # کندتر شدن بیش از این نسبت (و حداقل MIN_DELTA_MS) پسرفت حساب می‌شود
+MIN_DELTA_MS = 5.0
+FIRST_PAINT_TARGET_MS = 600.0  # اولین رندر صفحه ورود در پروسه تازه
+COLD_RUNS = 3
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "gspread", "gtts", "google.auth")
+# اسکریپت خالی برای گرم کردن خود استریم‌لیت (اسکن کامپوننت‌ها در هر AppTest) تا فقط هزینه برنامه بماند
+WARMUP_SCRIPT = "import streamlit as st\nst.title('warmup')"
+GYM_TAB = "🏋️ اتاق تمرین"
+REPORT_TAB = "📈 گزارش و مربی"
+
+
+class Recorder:
+    """زمان مرحله‌ها و درخواست‌های شیت هر جریان"""
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self.steps = {}
+        self.flows = {}
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        yield
+        self.steps.setdefault(name, []).append(time.perf_counter() - start)
+
+    @contextmanager
+    def flow(self, name):
+        import metrics
+
+        def transferred():
+            counters = metrics.REGISTRY.snapshot()[0]
+            return sum(v for (n, _), v in counters.items() if n == "gym_remote_bytes_total")
+
+        calls, size = self.spreadsheet.calls, transferred()
+        yield
+        self.flows[name] = {"remote_calls": self.spreadsheet.calls - calls,
+                            "remote_kb": round((transferred() - size) / 1024, 1)}
+
+    def summary(self):
+        return {name: {"n": len(times), "p50_ms": round(1000 * statistics.median(times), 2),
+                       "max_ms": round(1000 * max(times), 2)} for name, times in self.steps.items()}
+
+
+def find_button(at, label):
+    for b in at.button:
+        if b.label.startswith(label):
+            return b
+    return None
+
+
+# MediaFileManager هر اجرای AppTest؛ دکمه دانلود با callable فقط شناسه فایل می‌گیرد
+_DEFERRED = {}
+
+
+def capture_downloads():
+    """ثبت MediaFileManager دکمه‌های دانلود تا کلیک آن‌ها بعد از اجرای اسکریپت شبیه‌سازی شود"""
+    from streamlit.runtime.media_file_manager import MediaFileManager
+
+    add_deferred = MediaFileManager.add_deferred
+
+    def add(self, *args, **kwargs):
+        file_id = add_deferred(self, *args, **kwargs)
+        _DEFERRED[file_id] = self
+        return file_id
+
+    MediaFileManager.add_deferred = add
+
+
+def download(at, label):
+    """کلیک دکمه دانلود از همان مسیر مرورگر (execute_deferred: اجرای callable و تبدیل به bytes)"""
+    for button in at.get("download_button"):
+        if button.proto.label.startswith(label):
+            file_id = button.proto.deferred_file_id
+            manager = _DEFERRED[file_id]
+            url = manager.execute_deferred(file_id)
+            return manager._storage.get_file(os.path.basename(url)).content
+    raise LookupError(label)
+
+
+def wait_for_sync(queue_path, timeout=60):
+    """صبر تا صف محلی کاملا به شیت ارسال شود"""
+    from sync_queue import WriteQueue
+
+    queue = WriteQueue(queue_path)
+    deadline = time.time() + timeout
+    while queue.stats()["pending"] and time.time() < deadline:
+        time.sleep(0.02)
+
+
+def run_flows(rec, username, queue_path):
+    from streamlit.testing.v1 import AppTest
+
+    from bench.synthetic import PASSWORD
+    from export import parquet_available
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    with rec.flow("signup"):
+        with rec.step("login_page"):
+            at.run()
+        at.text_input[2].input("bench_new")
+        at.text_input[3].input(PASSWORD)
+        with rec.step("signup"):
+            find_button(at, "ثبت نام").click().run()
+        assert at.success, [e.value for e in at.error]
+
+    with rec.flow("login"):
+        at.text_input[0].input(username)
+        at.text_input[1].input(PASSWORD)
+        with rec.step("login"):
+            find_button(at, "ورود").click().run()
+        assert not at.exception and not at.error, at.exception or [e.value for e in at.error]
+
+    with rec.flow("workout"):
+        at.session_state["main_tab"] = GYM_TAB
+        with rec.step("open_gym"):
+            at.run()
+        with rec.step("session_start"):
+            find_button(at, "🚀").click().run()
+        while find_button(at, "✅"):
+            with rec.step("log_set"):
+                find_button(at, "➕").click().run()
+            with rec.step("next_exercise"):
+                find_button(at, "✅").click().run()
+        with rec.step("save_session"):
+            find_button(at, "ذخیره نهایی").click().run()
+        assert not at.exception, at.exception
+        # ارسال در پس‌زمینه است؛ جدا اندازه گرفته می‌شود ولی درخواست‌هایش جزو همین جریان است
+        with rec.step("sync_drain"):
+            wait_for_sync(queue_path)
+
+    with rec.flow("report"):
+        at.session_state["main_tab"] = REPORT_TAB
+        with rec.step("open_report"):
+            at.run()
+        assert not at.exception, at.exception
+        with rec.step("export_csv"):
+            assert download(at, "📥 دانلود خروجی کامل")
+        if parquet_available():
+            with rec.step("export_parquet"):
+                assert download(at, "📥 دانلود Parquet")
+
+
+def child(users, sessions, latency):
+    """اجرای جریان‌ها در همین پروسه؛ خروجی JSON در آخرین خط"""
+    from bench.fake_sheets import install_fake_sheets
+    from bench.stub_tts import install_stub_tts
+
+    spreadsheet = install_fake_sheets()
+    install_stub_tts()
+    capture_downloads()
+
+    from bench.synthetic import member_name, seed_storage
+    from storage import open_storage
+
+    # دیتابیس بدون تاخیر شبکه ساخته می‌شود؛ تاخیر فقط برای جریان‌ها
+    start = time.perf_counter()
+    seed_storage(open_storage("sheets"), users, sessions)
+    seed_s = time.perf_counter() - start
+    spreadsheet.latency = latency
+    for ws in spreadsheet.worksheets.values():
+        ws.latency = latency
+        ws.calls = 0
+
+    rec = Recorder(spreadsheet)
+    # آخرین عضو: بدترین حالت برای هر جستجوی خطی
+    run_flows(rec, member_name(users - 1), os.environ["GYM_QUEUE_PATH"])
+    return {
+        "users": users,
+        "seed_s": round(seed_s, 2),
+        "steps": rec.summary(),
+        "flows": rec.flows,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def cold_start():
+    """اولین و دومین رندر صفحه ورود در همین پروسه تازه و ماژول‌های سنگین بارگذاری شده"""
+    from streamlit.testing.v1 import AppTest
+
+    AppTest.from_string(WARMUP_SCRIPT).run()
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        at = AppTest.from_file(APP, default_timeout=120).run()
+        timings.append(time.perf_counter() - start)
+        assert not at.exception, at.exception
+    return {"first_paint_ms": round(1000 * timings[0], 1), "warm_paint_ms": round(1000 * timings[1], 1),
+            "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules]}
+
+
+def run_child(*args):
+    workdir = tempfile.mkdtemp(prefix="gym_suite_")
+    env = dict(os.environ)
+    env.update({
+        "GYM_STORAGE": "sheets",
+        "GYM_QUEUE_PATH": os.path.join(workdir, "queue.db"),
+        "GYM_SHARED_STORE": os.path.join(workdir, "shared.db"),
+        "GYM_VOICE_DIR": os.path.join(workdir, "audio"),
+        "GYM_JOURNAL_DIR": os.path.join(workdir, "journal"),
+    })
+    env.pop("GYM_METRICS_FILE", None)
+    out = subprocess.run([sys.executable, "-m", "bench.suite", *args], cwd=ROOT, env=env, capture_output=True,
+                         text=True)
+    if out.returncode:
+        sys.stderr.write(out.stderr)
+        raise SystemExit(f"benchmark child failed: {' '.join(args)}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_size(users, sessions, latency):
+    return run_child("--child", str(users), "--sessions", str(sessions), "--latency", str(latency))
+
+
+def run_cold_start(runs=COLD_RUNS, target_ms=FIRST_PAINT_TARGET_MS):
+    """میانه چند پروسه تازه"""
+    samples = [run_child("--child-cold") for _ in range(runs)]
+    return {
+        "runs": runs,
+        "first_paint_ms": statistics.median(s["first_paint_ms"] for s in samples),
+        "warm_paint_ms": statistics.median(s["warm_paint_ms"] for s in samples),
+        "heavy_modules": sorted({m for s in samples for m in s["heavy_modules"]}),
+        "target_ms": target_ms,
+    }
+
+
+def cold_start_ok(cold):
+    return cold["first_paint_ms"] <= cold["target_ms"] and not cold["heavy_modules"]
+
+
+# --- RESULTS ---
+def git(*args):
+    return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+
+def commit_id():
+    """شناسه کوتاه commit فعلی؛ با تغییرات ثبت نشده -dirty"""
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    if git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    return commit
+
+
+def result_path(ref):
+    """مسیر فایل نتیجه برای یک ref گیت (یا مسیر مستقیم فایل)"""
+    if os.path.exists(ref):
+        return ref
+    return os.path.join(RESULTS_DIR, f"{git('rev-parse', '--short', ref) or ref}.json")
+
+
+def metrics_of(size):
+    """متریک‌های مقایسه‌پذیر یک اندازه: name -> (value, kind)"""
+    out = {f"{name} p50_ms": (s["p50_ms"], "ms") for name, s in size["steps"].items() if name != "sync_drain"}
+    out.update({f"{name} calls": (f["remote_calls"], "calls") for name, f in size["flows"].items()})
+    out["peak_rss_mb"] = (size["peak_rss_mb"], "mb")
+    return out
+
+
+def is_regression(old, new, kind):
+    if kind == "calls":
+        return new > old
+    if kind == "ms":
+        return new - old > MIN_DELTA_MS and new > old * (1 + TOLERANCE)
+    return new > old * (1 + TOLERANCE)
+
+
+def compare(old, new):
+    """چاپ تفاوت‌ها؛ تعداد پسرفت‌ها را برمی‌گرداند"""
+    regressions = 0
+    print(f"\ncompare {old['commit']} -> {new['commit']}")
+    if "cold_start" in old and "cold_start" in new:
+        prev, value = old["cold_start"]["first_paint_ms"], new["cold_start"]["first_paint_ms"]
+        bad = is_regression(prev, value, "ms")
+        regressions += bad
+        print(f"{'REGRESSION' if bad else 'ok':<11}{'cold start':>12}  {'first_paint_ms':<26}{prev:>10} -> {value}")
+    for users, size in new["sizes"].items():
+        if users not in old["sizes"]:
+            continue
+        before = metrics_of(old["sizes"][users])
+        for name, (value, kind) in metrics_of(size).items():
+            if name not in before:
+                continue
+            prev = before[name][0]
+            change = (value - prev) / prev * 100 if prev else 0.0
+            bad = is_regression(prev, value, kind)
+            regressions += bad
+            if bad or abs(change) >= TOLERANCE * 100:
+                print(f"{'REGRESSION' if bad else 'improved':<11}{users:>6} users  {name:<26}{prev:>10} -> {value:<10}"
+                      f"({change:+.0f}%)")
+    print(f"{regressions} regressions")
+    return regressions
+
+
+def print_report(result):
+    cold = result.get("cold_start")
+    if cold:
+        print(f"\n== cold start ({cold['runs']} fresh processes) ==")
+        print(f"first paint {cold['first_paint_ms']} ms (target {cold['target_ms']:g}), "
+              f"warm {cold['warm_paint_ms']} ms, heavy modules: {', '.join(cold['heavy_modules']) or 'none'}"
+              f"  {'OK' if cold_start_ok(cold) else 'FAILED'}")
+    for users, size in result["sizes"].items():
+        print(f"\n== {users} users (seed {size['seed_s']}s, peak {size['peak_rss_mb']} MB) ==")
+        print(f"{'step':<16}{'n':>4}{'p50 ms':>10}{'max ms':>10}")
+        for name, s in size["steps"].items():
+            print(f"{name:<16}{s['n']:>4}{s['p50_ms']:>10}{s['max_ms']:>10}")
+        print(f"{'flow':<16}{'calls':>10}{'KB':>10}")
+        for name, f in size["flows"].items():
+            print(f"{name:<16}{f['remote_calls']:>10}{f['remote_kb']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="*", default=list(SIZES),
+                        help="اندازه‌های دیتابیس (بدون مقدار: فقط شروع سرد)")
+    parser.add_argument("--sessions", type=int, default=SESSIONS, help="جلسه برای هر عضو ساختگی")
+    parser.add_argument("--latency", type=float, default=0.0, help="تاخیر هر درخواست شیت (ثانیه)")
+    parser.add_argument("--out", help="فایل نتیجه (پیش‌فرض bench/results/<commit>.json)")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", metavar="REF", help="commit یا فایل نتیجه برای مقایسه")
+    parser.add_argument("--fail-on-regression", action="store_true", help="خروج با کد 1 اگر پسرفت دیده شود")
+    parser.add_argument("--first-paint-target", type=float, default=FIRST_PAINT_TARGET_MS, help="میلی‌ثانیه")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-cold", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(child(args.child, args.sessions, args.latency)))
+        return
+    if args.child_cold:
+        print(json.dumps(cold_start()))
+        return
+
+    result = {
+        "commit": commit_id(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": {"sessions": args.sessions, "latency": args.latency},
+        "sizes": {},
+    }
+    print("measuring cold start...", flush=True)
+    result["cold_start"] = run_cold_start(target_ms=args.first_paint_target)
+    for users in args.users:
+        print(f"running {users} users...", flush=True)
+        result["sizes"][str(users)] = run_size(users, args.sessions, args.latency)
+    print_report(result)
+
+    if not args.no_save:
+        path = args.out or os.path.join(RESULTS_DIR, f"{result['commit']}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+        print(f"\nsaved {os.path.relpath(path, ROOT)}")
+    if args.compare:
+        with open(result_path(args.compare), encoding="utf-8") as f:
+            regressions = compare(json.load(f), result)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+    if not cold_start_ok(result["cold_start"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""دیتابیس ساختگی تکرارپذیر: N عضو با برنامه از قالب و تاریخچه جلسه‌های ست به ست
+
+    from bench.synthetic import seed_storage
+    seed_storage(storage, users=1000, sessions=24)
+
+همه اعضا رمز PASSWORD دارند (یک هش مشترک تا ساخت دیتابیس بزرگ به خاطر PBKDF2 کند نشود).
+"""
+import json
+import random
+from datetime import date, timedelta
+
+import set_log
+from analytics import build_rollup, reps_estimate
+from credentials import hash_password
+from exercises import EXERCISE_LIB
+from programs import GOALS, LEVELS, new_program_fields, user_program
+from storage import SheetsStorage
+
+PASSWORD = "pw"
+CHUNK = 1000  # ردیف در هر درخواست افزودن به شیت
+
+
+def member_name(i):
+    return f"member{i:05d}"
+
+
+def member_record(rng, sessions, today):
+    """رکورد یک عضو با sessions جلسه (یک روز در میان تا دیروز)"""
+    gender, goal, level = rng.choice(["آقا", "خانم"]), rng.choice(GOALS), rng.choice(LEVELS)
+    joined = today - timedelta(days=2 * sessions + 7)
+    program_fields, weights = new_program_fields(gender, goal, level)
+    record = {
+        "profile": {"gender": gender, "goal": goal, "level": level, "weight": rng.randint(55, 95),
+                    "height": rng.randint(155, 195), "joined": str(joined)},
+        **program_fields,
+        "weights": weights,
+        "history": [],
+    }
+    program = user_program(record)
+    days = list(program)
+    for s in range(sessions):
+        day = days[s % len(days)]
+        sets = []
+        for ex in program[day]:
+            kind = EXERCISE_LIB[ex["id"]]["kind"]
+            for n in range(1, ex["sets"] + 1):
+                sets.append({
+                    "exercise_id": ex["id"], "set": n,
+                    "reps": int(reps_estimate(ex["reps"])) - rng.randint(0, 2) if kind == "reps" else None,
+                    "weight": weights.get(ex["id"], 0), "rpe": rng.choice(list(set_log.RPE_SCALE.values())),
+                    "rest": ex["rest"] + rng.randint(-10, 30) if ex["rest"] else None,
+                })
+        record["history"].append(set_log.session_entry(
+            today - timedelta(days=2 * (sessions - s)), day, rng.randint(35, 60), record["profile"]["weight"],
+            sets, key=f"{rng.getrandbits(48):012x}"))
+        for ex_id in weights:
+            if EXERCISE_LIB[ex_id]["kind"] == "reps" and rng.random() < 0.3:
+                weights[ex_id] += 1
+    return record
+
+
+def members(users, sessions, seed=1, today=None):
+    """(username, record) برای users عضو؛ با seed یکسان همیشه همان داده"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    for i in range(users):
+        yield member_name(i), member_record(rng, sessions, today)
+
+
+def seed_storage(storage, users, sessions, seed=1, rollups=False, chunk=CHUNK):
+    """نوشتن اعضای ساختگی؛ هر chunk عضو با یک create_users (در شیت یک درخواست افزودن)"""
+    password_hash = hash_password(PASSWORD)
+    batch = []
+
+    def write(batch):
+        storage.create_users([(username, record, password_hash) for username, record in batch])
+        if not rollups:
+            return
+        if isinstance(storage, SheetsStorage):
+            storage.rollups.append([[username, json.dumps(build_rollup(record))] for username, record in batch])
+            return
+        for username, record in batch:
+            storage.put_rollup(username, build_rollup(record))
+
+    for item in members(users, sessions, seed):
+        batch.append(item)
+        if len(batch) == chunk:
+            write(batch)
+            batch = []
+    if batch:
+        write(batch)
@@ -0,0 +1,70 @@
+import copy
+import random
+import time
+
+from storage import VERSION_KEY, ConflictError
+
+# --- CONFIGURATION ---
+MAX_RETRIES = 6
+BACKOFF_BASE = 0.05  # ثانیه
+BACKOFF_MAX = 2.0
+
+
+def _merge_dict(base, mine, theirs):
+    """کلیدهایی که این سشن نسبت به base عوض کرده برنده می‌شوند، بقیه از theirs"""
+    merged = dict(theirs)
+    for key, value in mine.items():
+        if base.get(key) != value:
+            merged[key] = value
+    return merged
+
+
+def merge_records(base, mine, theirs):
+    """ادغام سه‌طرفه رکورد کاربر
+
+    base: نسخه‌ای که این سشن خوانده بود، mine: تغییرات این سشن، theirs: نسخه فعلی دیتابیس.
+    وزنه‌ها و پروفایل برای هر کلید جدا (آخرین نویسنده برنده)، تاریخچه فقط اضافه می‌شود.
+    """
+    merged = copy.deepcopy(theirs)
+    merged["weights"] = _merge_dict(base.get("weights", {}), mine.get("weights", {}), theirs.get("weights", {}))
+    merged["profile"] = _merge_dict(base.get("profile", {}), mine.get("profile", {}), theirs.get("profile", {}))
+    for field in ("password", "program", "template", "program_overrides"):
+        if field in mine:
+            if mine[field] != base.get(field):
+                merged[field] = copy.deepcopy(mine[field])
+        elif field in base:
+            # این سشن فیلد را حذف کرده (مثلا رمز متنی بعد از انتقال به هش)
+            merged.pop(field, None)
+
+    # جلسه‌هایی که این سشن اضافه کرده و در theirs نیستند
+    base_len = len(base.get("history", []))
+    new_entries = mine.get("history", [])[base_len:]
+    merged["history"] = list(theirs.get("history", []))
+    for entry in new_entries:
+        if entry not in merged["history"]:
+            merged["history"].append(entry)
+    return merged
+
+
+def backoff_delay(attempt):
+    """تاخیر نمایی با jitter کامل"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def save_with_retry(storage, username, base, mine, retries=MAX_RETRIES):
+    """نوشتن نسخه‌دار؛ در صورت تداخل ادغام و دوباره تلاش می‌کند
+
+    رکورد نهایی ذخیره شده (با نسخه جدید) برگردانده می‌شود.
+    """
+    for attempt in range(retries + 1):
+        try:
+            version = storage.put_user(username, mine, expected_version=base.get(VERSION_KEY))
+            mine[VERSION_KEY] = version
+            return mine
+        except ConflictError:
+            if attempt == retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+            theirs = storage.get_user(username)
+            mine = merge_records(base, mine, theirs)
+            base = theirs
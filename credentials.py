@@ -0,0 +1,89 @@
+import base64
+import functools
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURATION ---
+KDF_ALGORITHM = "pbkdf2_sha256"
+KDF_ITERATIONS = int(os.environ.get("GYM_KDF_ITERATIONS", 600_000))
+SALT_BYTES = 16
+VERIFY_WORKERS = int(os.environ.get("GYM_VERIFY_WORKERS", 4))
+
+# hashlib.pbkdf2_hmac قفل GIL را آزاد می‌کند؛ استخر محدود مصرف CPU را در اوج ورودها کنترل می‌کند
+_executor = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix="kdf")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password, iterations=None, salt=None):
+    """رمز نمکدار: pbkdf2_sha256$<iterations>$<salt>$<hash>"""
+    iterations = iterations or KDF_ITERATIONS
+    salt = salt or os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{KDF_ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, encoded):
+    try:
+        algorithm, iterations, salt, digest = encoded.split("$")
+    except (AttributeError, ValueError):
+        return False
+    if algorithm != KDF_ALGORITHM:
+        return False
+    candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), base64.b64decode(salt), int(iterations))
+    return hmac.compare_digest(candidate, base64.b64decode(digest))
+
+
+def needs_rehash(encoded):
+    """هش با هزینه کمتر از تنظیم فعلی ساخته شده است"""
+    try:
+        return int(encoded.split("$")[1]) < KDF_ITERATIONS
+    except (AttributeError, IndexError, ValueError):
+        return True
+
+
+@functools.lru_cache(maxsize=1)
+def _dummy_hash():
+    # برای کاربر ناموجود هم همان هزینه پرداخت می‌شود تا از زمان پاسخ نتوان وجود کاربر را فهمید
+    return hash_password("")
+
+
+def verify_in_pool(password, encoded):
+    """بررسی رمز در استخر ترد؛ Future برمی‌گرداند"""
+    return _executor.submit(verify_password, password, encoded or _dummy_hash())
+
+
+def hash_in_pool(password):
+    return _executor.submit(hash_password, password)
+
+
+def authenticate(storage, username, password):
+    """ورود با یک خواندن از ایندکس رمزها
+
+    اعضای قدیمی که هنوز رمز متنی در رکوردشان دارند در اولین ورود موفق به هش منتقل می‌شوند.
+    استخر ترد فقط تعداد هش‌های همزمان (CPU) را محدود می‌کند؛ ترد اسکریپت Streamlit تا پایان
+    بررسی رمز (و هش دوباره در صورت نیاز) منتظر نتیجه می‌ماند.
+    """
+    from concurrency import save_with_retry
+
+    stored = storage.get_credential(username)
+    if stored is not None:
+        ok = verify_in_pool(password, stored).result()
+        if ok and needs_rehash(stored):
+            storage.put_credential(username, hash_in_pool(password).result())
+        return ok
+
+    record = storage.get_user(username)
+    if record is None or "password" not in record:
+        verify_in_pool(password, None).result()
+        return False
+    if not hmac.compare_digest(record["password"].encode("utf-8"), password.encode("utf-8")):
+        return False
+    storage.put_credential(username, hash_in_pool(password).result())
+    cleaned = {k: v for k, v in record.items() if k != "password"}
+    save_with_retry(storage, username, record, cleaned)
+    return True
@@ -0,0 +1,66 @@
+import json
+import os
+
+# --- CONFIGURATION ---
+DATA_DIR = os.environ.get("GYM_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+CATALOG_PATH = os.path.join(DATA_DIR, "exercises.json")
+SCHEMA_VERSION = 1  # نسخه ساختار فایل‌های داده که این کد می‌شناسد
+KINDS = ("warmup", "timed", "reps")  # گرم کردن: زمانی بدون استراحت، زمانی: با استراحت، تکراری: طبق هدف
+
+
+class CatalogError(ValueError):
+    """فایل داده (کاتالوگ حرکات یا قالب برنامه) با ساختار مورد انتظار نمی‌خواند"""
+
+
+def require(condition, where, message):
+    if not condition:
+        raise CatalogError(f"{where}: {message}")
+
+
+def load_data_file(path):
+    """خواندن یک فایل داده JSON و بررسی نسخه ساختار آن"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    require(isinstance(data, dict), path, "root must be an object")
+    require(data.get("schema_version") == SCHEMA_VERSION, path,
+            f"unsupported schema_version {data.get('schema_version')!r} (expected {SCHEMA_VERSION})")
+    require(isinstance(data.get("version"), str), path, "missing version")
+    return data
+
+
+def validate_catalog(data, where="catalog"):
+    exercises = data.get("exercises")
+    require(isinstance(exercises, dict) and exercises, where, "exercises must be a non-empty object")
+    names = set()
+    nums = set()
+    for ex_id, ex in exercises.items():
+        at = f"{where}: {ex_id}"
+        require(isinstance(ex, dict), at, "must be an object")
+        for field in ("name", "desc", "voice"):
+            require(isinstance(ex.get(field), str) and ex[field], at, f"missing {field}")
+        # شناسه عددی در تاریخچه فشرده ذخیره می‌شود؛ نباید عوض یا دوباره استفاده شود
+        require(isinstance(ex.get("num"), int) and ex["num"] > 0, at, "num must be a positive integer")
+        require(ex["num"] not in nums, at, f"duplicate num {ex['num']}")
+        nums.add(ex["num"])
+        require(ex.get("kind") in KINDS, at, f"kind must be one of {KINDS}")
+        start = ex.get("start_weight")
+        require(isinstance(start, dict) and "default" in start, at, "start_weight needs a default")
+        require(all(isinstance(w, (int, float)) for w in start.values()), at, "start_weight values must be numbers")
+        # تاریخچه با نام نمایشی ثبت شده، پس نام‌ها باید یکتا باشند
+        require(ex["name"] not in names, at, f"duplicate name {ex['name']!r}")
+        names.add(ex["name"])
+    return data
+
+
+def load_catalog(path=CATALOG_PATH):
+    return validate_catalog(load_data_file(path), path)
+
+
+# --- DETAILED EXERCISE LIBRARY ---
+CATALOG = load_catalog()
+CATALOG_VERSION = CATALOG["version"]
+EXERCISE_LIB = CATALOG["exercises"]
+
+# نام نمایشی -> شناسه (جلسه‌های ثبت شده با نام فارسی حرکت کلید خورده‌اند)
+NAME_TO_ID = {ex["name"]: ex_id for ex_id, ex in EXERCISE_LIB.items()}
+NUM_TO_ID = {ex["num"]: ex_id for ex_id, ex in EXERCISE_LIB.items()}
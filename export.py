@@ -0,0 +1,115 @@
+import io
+
+import pandas as pd
+
+# --- CONFIGURATION ---
+CHUNK_SESSIONS = 2000  # تعداد جلسه‌هایی که هر بار به جدول تبدیل می‌شوند
+
+# ستون‌های خروجی بلند (هر ردیف یک ست) و عنوان فارسی آن‌ها برای مربی
+EXPORT_COLUMNS = {
+    "date": "تاریخ",
+    "day": "برنامه",
+    "exercise_id": "شناسه حرکت",
+    "exercise": "حرکت",
+    "set": "ست",
+    "reps": "تکرار",
+    "weight_kg": "وزنه (kg)",
+    "rpe": "RPE",
+    "rest_s": "استراحت (ثانیه)",
+    "duration_min": "مدت زمان (دقیقه)",
+    "user_weight": "وزن بدن",
+}
+
+
+def sets_frame(entries, name_to_id=None):
+    """تبدیل جلسه‌ها به جدول بلند: یک ردیف برای هر ست ثبت شده
+
+    جلسه‌های قدیمی فقط وزنه هر حرکت را دارند، پس ستون‌های ست، تکرار، RPE و استراحت برای آن‌ها خالی است.
+    """
+    name_to_id = name_to_id or {}
+    sessions = pd.DataFrame.from_records(
+        entries, columns=["date", "day", "duration_min", "user_weight", "details", "sets"])
+    sessions["session"] = range(len(sessions))
+    has_sets = sessions["sets"].map(lambda s: isinstance(s, list)).astype(bool)
+    long = pd.concat([_legacy_rows(sessions[~has_sets], name_to_id),
+                      _set_rows(sessions[has_sets], name_to_id)]).sort_values("session", kind="stable")
+    for col in ("weight_kg", "duration_min", "reps", "rpe", "rest_s"):
+        long[col] = pd.to_numeric(long[col], errors="coerce")
+    return long[list(EXPORT_COLUMNS)].reset_index(drop=True)
+
+
+def _legacy_rows(sessions, name_to_id):
+    sessions = sessions.drop(columns="sets")
+    sessions["item"] = sessions.pop("details").map(lambda d: list(d.items()) if isinstance(d, dict) else [])
+    long = sessions.explode("item", ignore_index=True)
+    long = long[long["item"].notna()]
+    items = pd.DataFrame(long.pop("item").tolist(), columns=["exercise", "weight_kg"], index=long.index)
+    long = long.join(items)
+    long["exercise_id"] = long["exercise"].map(name_to_id).fillna(long["exercise"])
+    long[["set", "reps", "rpe", "rest_s"]] = pd.NA
+    return long
+
+
+def _set_rows(sessions, name_to_id):
+    id_to_name = {ex_id: name for name, ex_id in name_to_id.items()}
+    long = sessions.drop(columns="details").explode("sets", ignore_index=True)
+    long = long[long["sets"].notna()]
+    items = pd.DataFrame(long.pop("sets").tolist(), index=long.index,
+                         columns=["exercise_id", "set", "reps", "weight", "rpe", "rest"])
+    long = long.join(items.rename(columns={"weight": "weight_kg", "rest": "rest_s"}))
+    long["exercise"] = long["exercise_id"].map(id_to_name).fillna(long["exercise_id"])
+    return long
+
+
+def iter_export_chunks(history, name_to_id=None, chunk_sessions=CHUNK_SESSIONS):
+    """جدول خروجی به صورت تکه‌تکه تا حافظه محدود بماند"""
+    for i in range(0, len(history), chunk_sessions):
+        yield sets_frame(history[i:i + chunk_sessions], name_to_id)
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def write_export(history, fp, fmt="csv", name_to_id=None, chunk_sessions=CHUNK_SESSIONS):
+    """نوشتن خروجی کامل در fp (باینری) تکه به تکه؛ fmt: csv یا parquet"""
+    if fmt == "csv":
+        text = io.TextIOWrapper(fp, encoding="utf-8", newline="", write_through=True)
+        header = True
+        for chunk in iter_export_chunks(history, name_to_id, chunk_sessions):
+            chunk.rename(columns=EXPORT_COLUMNS).to_csv(text, index=False, header=header)
+            header = False
+        if header:
+            pd.DataFrame(columns=list(EXPORT_COLUMNS.values())).to_csv(text, index=False)
+        text.detach()
+    elif fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        for chunk in iter_export_chunks(history, name_to_id, chunk_sessions):
+            table = pa.Table.from_pandas(chunk.astype({"set": "Int64", "day": "string", "date": "string",
+                                                        "exercise": "string", "exercise_id": "string"}),
+                                         preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(fp, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        raise ValueError(f"unknown export format: {fmt}")
+
+
+def export_bytes(history, fmt="csv", name_to_id=None):
+    """کل خروجی به صورت bytes برای st.download_button
+
+    جدول‌ها تکه‌تکه ساخته می‌شوند، ولی استریم‌لیت خروجی را کامل در حافظه نگه می‌دارد (فایل موقت یا
+    جریان را قبول نمی‌کند).
+    """
+    fp = io.BytesIO()
+    write_export(history, fp, fmt, name_to_id)
+    return fp.getvalue()
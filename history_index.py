@@ -0,0 +1,43 @@
+from datetime import date
+
+
+def date_ordinal(value):
+    """ordinal تاریخ YYYY-MM-DD؛ سریع‌تر از strptime. برای تاریخ نامعتبر None"""
+    try:
+        return date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def entry_ordinal(entry):
+    # جلسه‌های جدید تاریخ پردازش شده (date_ord) را همراه خود دارند
+    ordinal = entry.get("date_ord")
+    return ordinal if ordinal is not None else date_ordinal(entry.get("date"))
+
+
+class HistoryIndex:
+    """ایندکس تاریخچه: روزهای انجام شده به تفکیک هفته دوره
+
+    هفته‌ها نسبت به تاریخ شروع دوره (start) شماره می‌خورند (هفته اول = 1).
+    فقط یک بار هنگام ساخت کل تاریخچه پیمایش می‌شود؛ بعد از آن هر جلسه جدید با add اضافه می‌شود.
+    """
+
+    def __init__(self, start, history=()):
+        self.start_ord = start.toordinal()
+        self.weeks = {}  # شماره هفته -> روزهای برنامه انجام شده
+        for entry in history:
+            self.add(entry)
+
+    def week_of(self, ordinal):
+        return (ordinal - self.start_ord) // 7 + 1
+
+    def add(self, entry):
+        ordinal = entry_ordinal(entry)
+        if ordinal is None:
+            return
+        day_name = entry.get('day', entry.get('plan'))
+        if day_name:
+            self.weeks.setdefault(self.week_of(ordinal), []).append(day_name)
+
+    def completed_in_week(self, week):
+        return self.weeks.get(week, [])
@@ -0,0 +1,260 @@
+"""شمارنده‌ها و زمان‌سنجی داخلی (یک رجیستری برای هر پروسه)
+
+    with span("storage.get_user"): ...
+    count("gym_remote_requests_total", op="get")
+    error("rollup", e)   # خطایی که نادیده گرفته می‌شود هم شمرده شود
+
+همه زمان‌ها در هیستوگرام gym_span_seconds با برچسب span ثبت می‌شوند (spanها می‌توانند تو در تو باشند:
+زمان storage داخل زمان render هم هست). خروجی: صفحه «عملکرد» برای مدیرها و اختیاری با فرمت متنی
+Prometheus در فایل GYM_METRICS_FILE یا آدرس http://127.0.0.1:<GYM_METRICS_PORT>/metrics.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+METRICS_FILE = os.environ.get("GYM_METRICS_FILE")
+METRICS_PORT = int(os.environ.get("GYM_METRICS_PORT", 0))
+EXPORT_INTERVAL = 15.0  # حداقل فاصله دو نوشتن فایل (ثانیه)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_ERRORS = 50  # آخرین خطاها با متن، برای صفحه عملکرد
+
+SPAN = "gym_span_seconds"
+RERUN = "gym_rerun_seconds"
+ERRORS = "gym_errors_total"
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf], sum
+        self.errors = deque(maxlen=RECENT_ERRORS)
+        self._exported = 0.0
+
+    def count(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+            hist[0][bisect_left(BUCKETS, seconds)] += 1
+            hist[1] += seconds
+
+    def error(self, where, exc):
+        self.count(ERRORS, where=where)
+        with self._lock:
+            self.errors.append((time.time(), where, f"{type(exc).__name__}: {exc}"))
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.errors.clear()
+
+    def snapshot(self):
+        """کپی مستقل: (counters, histograms, errors)"""
+        with self._lock:
+            return (dict(self.counters),
+                    {key: (list(counts), total) for key, (counts, total) in self.histograms.items()},
+                    list(self.errors))
+
+
+REGISTRY = Registry()
+count = REGISTRY.count
+observe = REGISTRY.observe
+error = REGISTRY.error
+
+
+@contextmanager
+def span(name):
+    """زمان‌سنجی یک بخش؛ اگر خطا بدهد در gym_span_errors_total هم شمرده می‌شود"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        count("gym_span_errors_total", span=name)
+        raise
+    finally:
+        observe(SPAN, time.perf_counter() - start, span=name)
+
+
+def payload_size(value):
+    """تخمین حجم داده منتقل شده (بایت‌های JSON)"""
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class RerunTimer:
+    """زمان‌سنجی یک اجرای اسکریپت استریم‌لیت
+
+    هر phase تا شروع phase بعدی یا finish ادامه دارد، پس کد خطی اسکریپت بدون تورفتگی اضافه
+    زمان‌سنجی می‌شود. started می‌تواند از اجرای قبلی بیاید (st.rerun) تا کل زمان یک کلیک شمرده شود.
+    """
+
+    def __init__(self, started=None):
+        self.started = started or time.perf_counter()
+        self._phase = None
+        self._phase_at = None
+
+    def phase(self, name):
+        now = time.perf_counter()
+        if self._phase:
+            observe(SPAN, now - self._phase_at, span=self._phase)
+        self._phase, self._phase_at = name, now
+
+    def finish(self):
+        self.phase(None)
+        observe(RERUN, time.perf_counter() - self.started)
+        export()
+
+
+# --- SUMMARIES ---
+def quantile(counts, q):
+    """تخمین چندک از شمارش باکت‌ها (درون‌یابی خطی داخل باکت)"""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(counts):
+        if n and seen + n >= rank:
+            if i == len(BUCKETS):
+                return BUCKETS[-1]
+            low = BUCKETS[i - 1] if i else 0.0
+            return low + (BUCKETS[i] - low) * (rank - seen) / n
+        seen += n
+    return BUCKETS[-1]
+
+
+def histogram(name, **labels):
+    """(شمارش هر باکت, جمع ثانیه‌ها) یا None"""
+    return REGISTRY.snapshot()[1].get((name, _labels(labels)))
+
+
+def span_table():
+    """یک ردیف برای هر span: تعداد، خطا، زمان کل و چندک‌ها (میلی‌ثانیه)، پرهزینه‌ترین اول"""
+    counters, histograms, _ = REGISTRY.snapshot()
+    rows = []
+    for (name, labels), (counts, total) in histograms.items():
+        if name != SPAN:
+            continue
+        calls = sum(counts)
+        rows.append({
+            "span": dict(labels)["span"],
+            "calls": calls,
+            "errors": counters.get(("gym_span_errors_total", labels), 0),
+            "total_s": round(total, 3),
+            "avg_ms": round(1000 * total / calls, 1),
+            "p50_ms": round(1000 * quantile(counts, 0.5), 1),
+            "p95_ms": round(1000 * quantile(counts, 0.95), 1),
+        })
+    return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+
+def counter_table():
+    counters, _, _ = REGISTRY.snapshot()
+    return [{"name": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "value": value}
+            for (name, labels), value in sorted(counters.items())]
+
+
+def recent_errors():
+    """آخرین خطاها، جدیدترین اول: (زمان, محل, متن)"""
+    return REGISTRY.snapshot()[2][::-1]
+
+
+# --- PROMETHEUS EXPORT ---
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus():
+    """همه شمارنده‌ها و هیستوگرام‌ها با فرمت متنی Prometheus"""
+    counters, histograms, _ = REGISTRY.snapshot()
+    lines = []
+    typed = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), (counts, total) in sorted(histograms.items()):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path):
+    """نوشتن اتمیک (textfile collector نود اکسپورتر فایل نیمه‌کاره نمی‌بیند)"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+def export(path=METRICS_FILE, now=None):
+    """نوشتن فایل متریک‌ها اگر تنظیم شده و از نوشتن قبلی EXPORT_INTERVAL گذشته باشد"""
+    if not path:
+        return
+    now = time.time() if now is None else now
+    with REGISTRY._lock:
+        if now - REGISTRY._exported < EXPORT_INTERVAL:
+            return
+        REGISTRY._exported = now
+    try:
+        write_file(path)
+    except OSError as e:
+        error("metrics.export", e)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """آدرس /metrics در یک ترد پس‌زمینه (فقط روی همین ماشین)"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from exercises import EXERCISE_LIB, NAME_TO_ID
+from history_index import entry_ordinal
+
+# --- CONFIGURATION ---
+STEP_KG = 1.0  # کوچک‌ترین تغییر وزنه
+WINDOW = 3  # تعداد جلسه‌های اخیر هر حرکت که بررسی می‌شوند
+LIGHT_RPE = 7.0  # تا این مقدار: وزنه زیاد می‌شود
+HEAVY_RPE = 9.0  # از این مقدار: وزنه کم می‌شود (دو بار پشت سر هم: دیلود)
+DELOAD = 0.10  # کاهش وزنه در دیلود
+DETRAIN_DAYS = 14  # فاصله بیشتر از این از آخرین جلسه حرکت: دیلود
+TAIL_SESSIONS = 30  # فقط این تعداد جلسه آخر هر عضو خوانده می‌شود (برای WINDOW جلسه هر حرکت کافی است)
+
+KEYS = ["member", "exercise_id"]
+
+
+def history_frame(members, tail=TAIL_SESSIONS):
+    """جدول بلند جلسه‌ها: یک ردیف برای هر (عضو، حرکت، جلسه)
+
+    members: جفت‌های (نام کاربری، تاریخچه به ترتیب ثبت)؛ از هر تاریخچه فقط tail جلسه آخر. فقط حرکت‌های وزنه‌ای (kind=reps) می‌آیند.
+    جلسه‌های قدیمی RPE ندارند (NaN).
+    """
+    cols = {"member": [], "exercise_id": [], "ord": [], "weight": [], "rpe": []}
+    for member, history in members:
+        for entry in history[-tail:]:
+            ordinal = entry_ordinal(entry)
+            if ordinal is None:
+                continue
+            rpe = entry.get("rpe") or {}
+            for name, kg in (entry.get("details") or {}).items():
+                ex_id = NAME_TO_ID.get(name, name)
+                if EXERCISE_LIB.get(ex_id, {}).get("kind") != "reps":
+                    continue
+                cols["member"].append(member)
+                cols["exercise_id"].append(ex_id)
+                cols["ord"].append(ordinal)
+                cols["weight"].append(kg)
+                cols["rpe"].append(rpe.get(ex_id))
+    frame = pd.DataFrame(cols)
+    frame["weight"] = pd.to_numeric(frame["weight"], errors="coerce")
+    frame["rpe"] = pd.to_numeric(frame["rpe"], errors="coerce")
+    return frame
+
+
+def round_step(weight, step=STEP_KG):
+    return np.round(weight / step) * step
+
+
+def recommend(frame, today_ord, step=STEP_KG):
+    """وزنه بعدی هر (عضو، حرکت) در یک پاس برداری
+
+    قواعد به ترتیب اولویت:
+    دیلود: فاصله طولانی از آخرین جلسه یا دو جلسه سنگین پشت سر هم
+    سبک: +step، سنگین: -step
+    مناسب: اگر WINDOW جلسه با همان وزنه و بدون جلسه سنگین گذشته باشد (روند صاف) +step، وگرنه ثابت
+    بدون RPE (جلسه‌های قدیمی): ثابت
+    خروجی: member, exercise_id, last_weight, weight, reason
+    """
+    columns = KEYS + ["last_weight", "weight", "reason"]
+    frame = frame.dropna(subset=["weight"])
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+    frame = frame.sort_values(KEYS + ["ord"], kind="stable")
+    back = frame.groupby(KEYS, sort=False).cumcount(ascending=False)  # 0 = آخرین جلسه
+    recent = frame.assign(back=back)[back < WINDOW]
+    recent = recent.assign(x=-recent["back"].astype(float))
+    groups = recent.groupby(KEYS, sort=False)
+
+    last = recent[recent["back"] == 0].set_index(KEYS)
+    out = pd.DataFrame({"last_weight": last["weight"], "last_ord": last["ord"], "rpe": last["rpe"]})
+    out["prev_rpe"] = recent[recent["back"] == 1].set_index(KEYS)["rpe"].reindex(out.index)
+    out["sessions"] = groups.size().reindex(out.index)
+    out["max_rpe"] = groups["rpe"].max().reindex(out.index)
+
+    # شیب وزنه نسبت به شماره جلسه (حداقل مربعات، بدون حلقه)
+    recent = recent.assign(xw=recent["x"] * recent["weight"], xx=recent["x"] ** 2)
+    sums = recent.groupby(KEYS, sort=False)[["x", "weight", "xw", "xx"]].mean().reindex(out.index)
+    var = sums["xx"] - sums["x"] ** 2
+    out["trend"] = np.where(var > 0, (sums["xw"] - sums["x"] * sums["weight"]) / var.where(var > 0, 1), 0.0)
+
+    w = out["last_weight"].to_numpy(dtype=float)
+    rpe = out["rpe"].to_numpy(dtype=float)
+    deload_w = np.minimum(round_step(w * (1 - DELOAD), step), w - step)
+    detrained = (today_ord - out["last_ord"].to_numpy()) > DETRAIN_DAYS
+    heavy_twice = (rpe >= HEAVY_RPE) & (out["prev_rpe"].to_numpy(dtype=float) >= HEAVY_RPE)
+    stalled = ((out["sessions"].to_numpy() >= WINDOW) & np.isclose(out["trend"].to_numpy(), 0)
+               & (out["max_rpe"].to_numpy(dtype=float) < HEAVY_RPE))
+    conditions = [
+        detrained | heavy_twice,
+        rpe <= LIGHT_RPE,
+        rpe >= HEAVY_RPE,
+        stalled,
+    ]
+    out["weight"] = np.maximum(np.select(conditions, [deload_w, w + step, w - step, w + step], default=w), 0)
+    out["reason"] = np.select(conditions, ["deload", "increase", "decrease", "increase"], default="hold")
+    return out.reset_index()[columns]
+
+
+def recommended_weights(history, today_ord, current=None):
+    """وزنه‌های پیشنهادی یک عضو {exercise_id: kg} (فقط حرکت‌هایی که تاریخچه دارند)"""
+    recs = recommend(history_frame([("", history)]), today_ord)
+    weights = dict(zip(recs["exercise_id"], recs["weight"].map(clean_weight)))
+    if current is not None:
+        weights = {ex_id: kg for ex_id, kg in weights.items() if current.get(ex_id) != kg}
+    return weights
+
+
+def clean_weight(kg):
+    # 10.0 -> 10 تا با وزنه‌های عدد صحیح رکورد یکسان بماند
+    kg = float(kg)
+    return int(kg) if kg.is_integer() else kg
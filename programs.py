@@ -0,0 +1,111 @@
+import os
+from functools import lru_cache
+
+from exercises import DATA_DIR, EXERCISE_LIB, CatalogError, load_data_file, require
+
+# --- CONFIGURATION ---
+PROGRAMS_PATH = os.path.join(DATA_DIR, "programs.json")
+
+
+def validate_programs(data, catalog=EXERCISE_LIB, where="programs"):
+    for section, fields in (("goals", ("reps", "rest")), ("levels", ("sets",))):
+        options = data.get(section)
+        require(isinstance(options, dict) and options, where, f"{section} must be a non-empty object")
+        for name, params in options.items():
+            for field in fields:
+                require(field in params, f"{where}: {section}.{name}", f"missing {field}")
+    templates = data.get("templates")
+    require(isinstance(templates, dict) and templates, where, "templates must be a non-empty object")
+    require(data.get("default_template") in templates, where, "default_template is not a template")
+    for template_id, template in templates.items():
+        days = template.get("days")
+        require(isinstance(days, dict) and days, f"{where}: {template_id}", "days must be a non-empty object")
+        for day, ex_ids in days.items():
+            unknown = [ex_id for ex_id in ex_ids if ex_id not in catalog]
+            require(not unknown, f"{where}: {template_id}.{day}", f"unknown exercises {unknown}")
+    return data
+
+
+def load_programs(path=PROGRAMS_PATH):
+    return validate_programs(load_data_file(path), where=path)
+
+
+PROGRAMS = load_programs()
+DEFAULT_TEMPLATE = PROGRAMS["default_template"]
+GOALS = list(PROGRAMS["goals"])
+LEVELS = list(PROGRAMS["levels"])
+
+
+def exercise_prescription(ex_id, goal, level):
+    """ست، تکرار و استراحت یک حرکت از روی نوع آن در کاتالوگ"""
+    kind = EXERCISE_LIB[ex_id]["kind"]
+    goal_params = PROGRAMS["goals"][goal]
+    return {
+        "id": ex_id,
+        "sets": PROGRAMS["levels"][level]["sets"],
+        "reps": goal_params["reps"] if kind == "reps" else "Time",
+        "rest": 0 if kind == "warmup" else goal_params["rest"],
+    }
+
+
+def reps_estimate(reps):
+    """تعداد تکرار تقریبی از متن برنامه ("8-10" -> 9، "Time" -> 0)"""
+    try:
+        low, _, high = str(reps).partition("-")
+        return (int(low) + int(high or low)) / 2
+    except ValueError:
+        return 0
+
+
+@lru_cache(maxsize=None)
+def compile_program(template_id, gender, goal, level):
+    """برنامه و وزنه‌های شروع برای یک ترکیب؛ یک بار ساخته و بین همه کاربران مشترک است (تغییر ندهید)"""
+    template = PROGRAMS["templates"].get(template_id)
+    if template is None:
+        raise CatalogError(f"unknown program template {template_id!r}")
+    program = {}
+    weights = {}
+    for day, ex_ids in template["days"].items():
+        program[day] = [exercise_prescription(ex_id, goal, level) for ex_id in ex_ids]
+        for ex_id in ex_ids:
+            start = EXERCISE_LIB[ex_id]["start_weight"]
+            weights.setdefault(ex_id, start.get(gender, start["default"]))
+    return program, weights
+
+
+def new_program_fields(gender, goal, level, template_id=DEFAULT_TEMPLATE):
+    """فیلدهای برنامه در رکورد کاربر جدید: شناسه قالب به جای کپی کامل برنامه"""
+    _, weights = compile_program(template_id, gender, goal, level)
+    return {"template": template_id, "program_overrides": {}}, dict(weights)
+
+
+def user_program(record):
+    """برنامه کاربر: قالب کامپایل شده به اضافه تغییرات اختصاصی او
+
+    program_overrides برای هر روز یا لیست کامل حرکات آن روز است یا None (حذف روز).
+    رکوردهای قدیمی که کپی کامل برنامه (program) را دارند همان را برمی‌گردانند.
+    """
+    if "program" in record:
+        return record["program"]
+    profile = record["profile"]
+    program, _ = compile_program(record.get("template", DEFAULT_TEMPLATE),
+                                 profile["gender"], profile["goal"], profile["level"])
+    overrides = record.get("program_overrides")
+    if not overrides:
+        return program
+    merged = {}
+    for day, exs in program.items():
+        exs = overrides.get(day, exs)
+        if exs is not None:
+            merged[day] = exs
+    for day, exs in overrides.items():
+        if day not in program and exs is not None:
+            merged[day] = exs
+    return merged
+
+
+def program_overrides(program, template_program):
+    """تفاوت یک برنامه کامل با قالب، به شکل program_overrides"""
+    overrides = {day: exs for day, exs in program.items() if template_program.get(day) != exs}
+    overrides.update({day: None for day in template_program if day not in program})
+    return overrides
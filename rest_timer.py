@@ -0,0 +1,15 @@
+import os
+
+import streamlit.components.v1 as components
+
+_component = components.declare_component(
+    "rest_timer", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "rest_timer"))
+
+
+def rest_timer(seconds, key):
+    """تایمر استراحت سمت مرورگر
+
+    تا زمانی که تایمر در جریان است None برمی‌گرداند. در پایان یا با رد کردن
+    یک بار {"status": "done" | "skipped", "elapsed": ثانیه} برمی‌گرداند.
+    """
+    return _component(seconds=seconds, key=key, default=None)
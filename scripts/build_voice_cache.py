@@ -0,0 +1,51 @@
+"""ساخت یک‌باره همه صداهای حرکات در پوشه static/audio و انبار مشترک (GYM_SHARED_STORE)
+
+    python -m scripts.build_voice_cache [--force]
+
+برنامه در زمان اجرا gTTS صدا نمی‌زند؛ این اسکریپت قبل از استقرار (یا بعد از تغییر متن صداها) اجرا
+می‌شود. کلیپ‌ها در انبار مشترک هم نوشته می‌شوند تا همه نسخه‌های برنامه آن‌ها را داشته باشند.
+"""
+import argparse
+import os
+
+from exercises import EXERCISE_LIB
+from shared_store import open_shared_store
+from voice_cache import VOICE_LANG, VoiceCache, synthesize, voice_key
+
+
+def voice_lines():
+    return sorted({ex["voice"] for ex in EXERCISE_LIB.values() if ex.get("voice")})
+
+
+def build(cache, force=False):
+    built, skipped, failed = 0, 0, []
+    for text in voice_lines():
+        key = voice_key(text, VOICE_LANG)
+        if not force and os.path.exists(cache.path_for(key)):
+            with open(cache.path_for(key), "rb") as f:
+                cache.share(key, f.read())
+            skipped += 1
+            continue
+        try:
+            data = synthesize(text, VOICE_LANG)
+        except Exception as e:
+            failed.append((text, e))
+            continue
+        cache.store(key, data)
+        cache.share(key, data)
+        built += 1
+    return built, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="ساخت دوباره فایل‌های موجود")
+    args = parser.parse_args(argv)
+    built, skipped, failed = build(VoiceCache(shared=open_shared_store()), force=args.force)
+    for text, e in failed:
+        print(f"failed: {text!r}: {e}")
+    print(f"built {built} clips, {skipped} already cached, {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
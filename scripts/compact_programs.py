@@ -0,0 +1,60 @@
+"""جایگزینی کپی کامل برنامه در رکورد اعضا با شناسه قالب و تغییرات اختصاصی
+
+    python -m scripts.compact_programs [--template ID] [--dry-run]
+
+برنامه هر عضو با قالب کامپایل شده برای جنسیت، هدف و سطح خودش مقایسه می‌شود؛
+فقط روزهایی که فرق دارند در program_overrides می‌مانند. نوشتن نسخه‌دار است و
+عضوی که همزمان تغییر کرده باشد رد می‌شود (اجرای دوباره آن را تبدیل می‌کند).
+"""
+import argparse
+import json
+
+from programs import DEFAULT_TEMPLATE, compile_program, program_overrides
+from storage import VERSION_KEY, ConflictError, open_storage
+
+
+def compact_record(record, template_id):
+    """رکورد بدون program (یا None اگر پروفایل برای انتخاب قالب کافی نیست)"""
+    profile = record.get("profile", {})
+    try:
+        template_program, _ = compile_program(template_id, profile["gender"], profile["goal"], profile["level"])
+    except KeyError:
+        return None
+    compacted = {k: v for k, v in record.items() if k not in ("program", "history")}
+    compacted["template"] = template_id
+    compacted["program_overrides"] = program_overrides(record["program"], template_program)
+    return compacted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="قالبی که برنامه‌ها با آن مقایسه می‌شوند")
+    parser.add_argument("--dry-run", action="store_true", help="فقط گزارش، بدون نوشتن")
+    args = parser.parse_args(argv)
+
+    storage = open_storage()
+    converted = skipped = conflicts = saved_bytes = 0
+    for username in storage.list_usernames():
+        record = storage.get_user(username)
+        if record is None or "program" not in record:
+            continue
+        compacted = compact_record(record, args.template)
+        if compacted is None:
+            skipped += 1
+            continue
+        before = len(json.dumps(record["program"], ensure_ascii=False))
+        after = len(json.dumps({"template": compacted["template"],
+                                "program_overrides": compacted["program_overrides"]}, ensure_ascii=False))
+        if not args.dry_run:
+            try:
+                storage.put_user(username, compacted, expected_version=record.get(VERSION_KEY))
+            except ConflictError:
+                conflicts += 1
+                continue
+        converted += 1
+        saved_bytes += before - after
+    print(f"converted {converted}, skipped {skipped}, conflicts {conflicts}, saved ~{saved_bytes} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""انتقال رمز متنی اعضای قدیمی (فیلد password رکورد) به ایندکس رمزها به صورت هش
+
+    python -m scripts.hash_legacy_passwords [--dry-run]
+
+authenticate رمز متنی را فقط در اولین ورود موفق هش می‌کند؛ رمز عضوی که هیچ وقت وارد نشده در
+ستون B شیت users می‌ماند. برای هر عضو اول هش در ایندکس نوشته و بعد فیلد password با نوشتن
+نسخه‌دار پاک می‌شود (اگر کار وسط راه قطع شود، ورود با هش ایندکس انجام می‌شود). عضوی که از قبل
+در ایندکس رمز دارد فقط فیلد متنی‌اش پاک می‌شود.
+"""
+import argparse
+
+from credentials import hash_in_pool
+from storage import VERSION_KEY, ConflictError, open_storage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="فقط گزارش، بدون نوشتن")
+    args = parser.parse_args(argv)
+
+    storage = open_storage()
+    legacy = []
+    for username in storage.list_usernames():
+        record = storage.get_user(username)
+        if record is not None and "password" in record:
+            legacy.append((username, record))
+    if args.dry_run:
+        print(f"{len(legacy)} members have a plaintext password (dry run)")
+        return
+
+    # هش‌ها در استخر ترد ساخته می‌شوند (PBKDF2 قفل GIL را آزاد می‌کند)
+    futures = [None if storage.get_credential(u) else hash_in_pool(r["password"]) for u, r in legacy]
+    hashed = cleared = conflicts = 0
+    for (username, record), future in zip(legacy, futures):
+        if future is not None:
+            storage.put_credential(username, future.result())
+            hashed += 1
+        cleaned = {k: v for k, v in record.items() if k not in ("password", "history")}
+        try:
+            storage.put_user(username, cleaned, expected_version=record.get(VERSION_KEY))
+        except ConflictError:
+            # عضو همزمان تغییر کرده است؛ اجرای دوباره فیلد را پاک می‌کند
+            conflicts += 1
+            continue
+        cleared += 1
+    print(f"hashed {hashed}, cleared {cleared}, conflicts {conflicts}")
+
+
+if __name__ == "__main__":
+    main()
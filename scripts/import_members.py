@@ -0,0 +1,167 @@
+"""ثبت نام گروهی اعضا از فایل CSV با برنامه از قالب (مثلا اعضای یک شرکت)
+
+    python -m scripts.import_members members.csv --passwords-out passwords.csv
+    python -m scripts.import_members members.csv --dry-run        # فقط بررسی ردیف‌ها
+
+ستون‌ها: username, gender, goal, level و اختیاری password, weight, height, template.
+مقدار gender/goal/level همان گزینه‌های فرم ثبت نام است. اول همه ردیف‌ها بررسی می‌شوند و اگر
+ردیفی خطا داشته باشد هیچ عضوی ساخته نمی‌شود (مگر با --skip-invalid). ردیف بدون رمز یک رمز
+تصادفی می‌گیرد که در --passwords-out نوشته می‌شود. اعضا دسته‌ای ساخته می‌شوند: هر CHUNK عضو
+با یک درخواست افزودن.
+"""
+import argparse
+import csv
+import os
+import secrets
+import sys
+import time
+
+from credentials import hash_in_pool
+from programs import GOALS, LEVELS, PROGRAMS, new_program_fields
+from storage import open_storage
+
+CHUNK = 500
+GENDERS = ("آقا", "خانم")
+REQUIRED = ("username", "gender", "goal", "level")
+
+
+def number(value, field):
+    if not value:
+        return 0
+    try:
+        result = float(value)
+    except ValueError:
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if result < 0:
+        raise ValueError(f"{field} is negative: {value!r}")
+    return int(result) if result.is_integer() else result
+
+
+def parse_row(row, template):
+    """یک ردیف CSV -> (username, profile, template, password)؛ ValueError با توضیح خطا"""
+    row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+    missing = [field for field in REQUIRED if not row.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    for field, allowed in (("gender", GENDERS), ("goal", GOALS), ("level", LEVELS)):
+        if row[field] not in allowed:
+            raise ValueError(f"unknown {field} {row[field]!r} (expected one of: {', '.join(allowed)})")
+    template = row.get("template") or template
+    if template not in PROGRAMS["templates"]:
+        raise ValueError(f"unknown template {template!r}")
+    profile = {"gender": row["gender"], "goal": row["goal"], "level": row["level"],
+               "weight": number(row.get("weight"), "weight"), "height": number(row.get("height"), "height")}
+    return row["username"], profile, template, row.get("password") or None
+
+
+def validate(rows, existing, template):
+    """همه ردیف‌ها: (اعضای معتبر, خطاها)؛ شماره ردیف همان شماره خط فایل است (سرتیتر خط 1)"""
+    members, errors, seen = [], [], {}
+    for line, row in enumerate(rows, start=2):
+        try:
+            username, profile, row_template, password = parse_row(row, template)
+            if username in seen:
+                raise ValueError(f"duplicate username {username!r} (row {seen[username]})")
+            if username in existing:
+                raise ValueError(f"username {username!r} already exists")
+        except ValueError as e:
+            errors.append((line, str(e)))
+            continue
+        seen[username] = line
+        members.append({"row": line, "username": username, "profile": profile, "template": row_template,
+                        "password": password})
+    return members, errors
+
+
+def build_records(members, joined):
+    """رکورد هر عضو؛ برنامه هر ترکیب قالب/جنسیت/هدف/سطح یک بار ساخته می‌شود (compile_program)"""
+    records = []
+    for m in members:
+        p = m["profile"]
+        program_fields, weights = new_program_fields(p["gender"], p["goal"], p["level"], m["template"])
+        records.append({"profile": dict(p, joined=joined), **program_fields, "weights": weights, "history": []})
+    return records
+
+
+def hash_passwords(members):
+    """هش رمزها در استخر ترد (PBKDF2 قفل GIL را آزاد می‌کند)"""
+    futures = [hash_in_pool(m["password"]) for m in members]
+    return [f.result() for f in futures]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv", help="فایل CSV (UTF-8)")
+    parser.add_argument("--passwords-out", help="CSV نام کاربری و رمز تصادفی ردیف‌های بدون رمز")
+    parser.add_argument("--template", default=PROGRAMS["default_template"], help="قالب برنامه پیش‌فرض")
+    parser.add_argument("--skip-invalid", action="store_true", help="ساخت ردیف‌های معتبر حتی اگر ردیفی خطا دارد")
+    parser.add_argument("--dry-run", action="store_true", help="فقط بررسی، بدون نوشتن")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="عضو در هر درخواست نوشتن")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(args.csv, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    columns = {c.strip().lower() for c in reader.fieldnames or []}
+    missing = [c for c in REQUIRED if c not in columns]
+    if missing:
+        print(f"missing columns: {', '.join(missing)}")
+        return 1
+    if args.passwords_out and os.path.exists(args.passwords_out):
+        # رمزهای یک اجرای قبلی نباید بازنویسی شوند
+        print(f"{args.passwords_out} already exists")
+        return 1
+    storage = open_storage()
+    members, errors = validate(rows, set(storage.list_usernames()), args.template)
+    for line, error in errors:
+        print(f"row {line}: {error}")
+    print(f"{len(rows)} rows: {len(members)} valid, {len(errors)} rejected")
+    for m in members:
+        m["generated"] = m["password"] is None
+        if m["generated"]:
+            m["password"] = secrets.token_urlsafe(12)
+    generated = [m for m in members if m["generated"]]
+    if generated and not args.passwords_out:
+        print(f"{len(generated)} rows have no password; pass --passwords-out to generate them")
+        return 1
+    if (errors and not args.skip_invalid) or args.dry_run or not members:
+        if errors and not args.skip_invalid:
+            print("nothing imported (fix the rows above or use --skip-invalid)")
+        return 1 if errors and not args.skip_invalid else 0
+
+    records = build_records(members, time.strftime("%Y-%m-%d"))
+    hashes = hash_passwords(members)
+    print(f"prepared {len(members)} members in {time.perf_counter() - start:.1f}s")
+    if generated:
+        # قبل از ساخت اعضا تا رمزها در صورت قطع شدن کار گم نشوند
+        with open(args.passwords_out, "x", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["username", "password"])
+            writer.writerows([m["username"], m["password"]] for m in generated)
+
+    created, failed = 0, 0
+    for i in range(0, len(members), args.chunk):
+        chunk = list(zip(members[i:i + args.chunk], records[i:i + args.chunk], hashes[i:i + args.chunk]))
+        try:
+            existing = set(storage.create_users([(m["username"], r, h) for m, r, h in chunk]))
+        except Exception as e:
+            # این دسته نوشته نشد؛ اجرای دوباره با --skip-invalid اعضای ساخته شده را کنار می‌گذارد
+            failed += len(chunk)
+            for m, _, _ in chunk:
+                print(f"row {m['row']}: not written: {e!r}")
+            continue
+        for m, _, _ in chunk:
+            if m["username"] in existing:
+                print(f"row {m['row']}: username {m['username']!r} was created meanwhile; skipped")
+        created += len(chunk) - len(existing)
+        failed += len(existing)
+        print(f"{min(i + args.chunk, len(members))}/{len(members)} written "
+              f"({time.perf_counter() - start:.1f}s)")
+    print(f"imported {created} members, {failed} not written, {len(errors)} rejected "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""انتقال دیتابیس قدیمی (یک JSON در سلول A1) به بک‌اند ردیف‌به‌ازای‌کاربر
+
+    python -m scripts.migrate_a1 --to sqlite --sqlite-path gym.db
+    python -m scripts.migrate_a1 --to sheets
+    python -m scripts.migrate_a1 --from-json backup.json --to sqlite
+
+رمز متنی رکوردهای قدیمی هش و در ایندکس رمزها نوشته می‌شود (مثل ثبت نام در برنامه). با --overwrite
+رکورد کاربر موجود (پروفایل، برنامه، وزنه‌ها) با نسخه قدیمی جایگزین می‌شود ولی تاریخچه او پاک نمی‌شود:
+فقط جلسه‌های قدیمی‌ای اضافه می‌شوند که (با همان تاریخ) در تاریخچه نیستند.
+"""
+import argparse
+import json
+from collections import Counter
+
+from credentials import hash_in_pool
+from history_index import entry_ordinal
+from storage import SHEET_NAME, VERSION_KEY, get_google_sheet_client, open_storage
+
+
+def load_legacy_blob():
+    """دانلود دیتابیس قدیمی از سلول A1 شیت اول"""
+    sheet = get_google_sheet_client().open(SHEET_NAME).sheet1
+    data = sheet.acell('A1').value
+    return json.loads(data) if data else {}
+
+
+def new_sessions(existing, legacy):
+    """جلسه‌های قدیمی که در تاریخچه فعلی نیستند (مقایسه با تاریخ، با تعداد تکرار)"""
+    done = Counter(entry_ordinal(e) for e in existing)
+    new = []
+    for entry in legacy:
+        ordinal = entry_ordinal(entry)
+        if done[ordinal]:
+            done[ordinal] -= 1
+        else:
+            new.append(entry)
+    return new
+
+
+def migrate(db, storage, overwrite=False):
+    """نوشتن هر کاربر به صورت جدا؛ کاربران موجود رد می‌شوند مگر overwrite"""
+    plan, skipped = [], []
+    for username, record in db.items():
+        current = storage.get_user(username)
+        if current is not None and not overwrite:
+            skipped.append(username)
+        else:
+            plan.append((username, record, current))
+    # هش‌ها در استخر ترد ساخته می‌شوند (PBKDF2 قفل GIL را آزاد می‌کند)
+    hashes = {u: hash_in_pool(r["password"]) for u, r, _ in plan if r.get("password")}
+    moved = []
+    for username, record, current in plan:
+        record = {k: v for k, v in record.items() if k != "password"}
+        if current is None:
+            storage.put_user(username, record, expected_version=0)
+        else:
+            storage.put_user(username, {k: v for k, v in record.items() if k != "history"},
+                             expected_version=current.get(VERSION_KEY))
+            entries = new_sessions(current["history"], record.get("history", []))
+            if entries:
+                storage.append_history_many(username, entries)
+        if username in hashes:
+            storage.put_credential(username, hashes[username].result())
+        moved.append(username)
+    return moved, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--to", choices=["sqlite", "sheets"], required=True)
+    parser.add_argument("--sqlite-path", default=None)
+    parser.add_argument("--from-json", default=None, help="فایل JSON به جای سلول A1")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.from_json:
+        with open(args.from_json, encoding="utf-8") as f:
+            db = json.load(f)
+    else:
+        db = load_legacy_blob()
+
+    storage = open_storage(args.to, args.sqlite_path)
+    moved, skipped = migrate(db, storage, overwrite=args.overwrite)
+    print(f"migrated {len(moved)} users, skipped {len(skipped)} existing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""انتقال تاریخچه از ستون C شیت users (یک سلول برای همه جلسه‌ها) به شیت history (یک ردیف برای هر جلسه)
+
+    python -m scripts.migrate_history_rows [--dry-run]
+
+سلول گوگل شیت حداکثر 50,000 کاراکتر است؛ بعد از انتقال، افزودن جلسه فقط یک ردیف اضافه می‌کند.
+برای هر عضو اول ردیف‌ها افزوده و بعد سلول C خالی می‌شود. اگر کار وسط راه قطع شود، اجرای دوباره
+جلسه‌هایی را که قبلا منتقل شده‌اند (با تاریخ یکسان) دوباره اضافه نمی‌کند.
+"""
+import argparse
+import json
+from collections import Counter
+
+import set_log
+from storage import SheetsStorage, open_storage
+
+CHUNK = 200  # عضو در هر دور افزودن و پاک کردن
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="فقط گزارش، بدون نوشتن")
+    args = parser.parse_args(argv)
+
+    storage = open_storage()
+    if not isinstance(storage, SheetsStorage):
+        print("only the sheets backend stores history in column C")
+        return
+    storage.history.refresh()
+    pending = []
+    for number, cells in enumerate(storage.users.call("get_all_values"), start=1):
+        if len(cells) > 2 and cells[0] and cells[2]:
+            pending.append((number, cells[0], set_log.unpack(json.loads(cells[2]))))
+
+    moved_users = moved_sessions = 0
+    for i in range(0, len(pending), CHUNK):
+        rows, cleared = [], []
+        for number, username, entries in pending[i:i + CHUNK]:
+            # جلسه‌هایی که در اجرای قطع شده قبلی افزوده شده‌اند
+            done = Counter(storage.history.ordinals_of(username))
+            new = []
+            for entry in entries:
+                ordinal = set_log.encode_row(entry)[0] or 0
+                if done[ordinal]:
+                    done[ordinal] -= 1
+                else:
+                    new.append(entry)
+            rows += storage.history.rows_for(username, new)
+            cleared.append({"range": f"C{number}", "values": [[""]]})
+            moved_users += 1
+            moved_sessions += len(new)
+        if args.dry_run:
+            continue
+        if rows:
+            storage.history.append(rows)
+        storage.users.call("batch_update", cleared, value_input_option="RAW")
+    print(f"moved {moved_sessions} sessions of {moved_users} members"
+          f"{' (dry run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
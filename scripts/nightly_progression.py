@@ -0,0 +1,52 @@
+"""محاسبه شبانه وزنه‌های پیشنهادی همه اعضا در یک پاس (بعد از آن شروع جلسه فقط یک lookup است)
+
+    python -m scripts.nightly_progression [--date YYYY-MM-DD] [--dry-run]
+
+فقط وزنه‌هایی که تغییر کرده‌اند نوشته می‌شوند؛ نوشتن نسخه‌دار است و با تغییرات همزمان ادغام می‌شود.
+"""
+import argparse
+import copy
+from collections import Counter
+from datetime import date
+
+from concurrency import save_with_retry
+from history_index import date_ordinal
+from overload import clean_weight, history_frame, recommend
+from storage import open_storage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--date", default=str(date.today()), help="تاریخ مبنا برای قاعده فاصله از آخرین جلسه")
+    parser.add_argument("--dry-run", action="store_true", help="فقط گزارش، بدون نوشتن")
+    args = parser.parse_args(argv)
+
+    storage = open_storage()
+    records = {}
+    for username in storage.list_usernames():
+        record = storage.get_user(username)
+        if record is not None:
+            records[username] = record
+
+    recs = recommend(history_frame((u, r.get("history", [])) for u, r in records.items()), date_ordinal(args.date))
+    reasons = Counter(recs["reason"])
+    updated = 0
+    for username, rows in recs.groupby("member", sort=False):
+        record = records[username]
+        weights = record.get("weights", {})
+        changed = {ex_id: clean_weight(kg) for ex_id, kg in zip(rows["exercise_id"], rows["weight"])
+                   if weights.get(ex_id) != clean_weight(kg)}
+        if not changed:
+            continue
+        updated += 1
+        if args.dry_run:
+            continue
+        mine = copy.deepcopy(record)
+        mine.setdefault("weights", {}).update(changed)
+        save_with_retry(storage, username, record, mine)
+    summary = ", ".join(f"{reason} {count}" for reason, count in sorted(reasons.items()))
+    print(f"{len(records)} members, {len(recs)} exercises ({summary}); updated {updated} members")
+
+
+if __name__ == "__main__":
+    main()
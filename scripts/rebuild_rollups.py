@@ -0,0 +1,30 @@
+"""ساخت دوباره خلاصه آماری همه اعضا از تاریخچه کامل (یک بار بعد از استقرار یا در صورت خرابی)
+
+    python -m scripts.rebuild_rollups [--only-missing]
+"""
+import argparse
+
+from analytics import build_rollup
+from storage import open_storage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only-missing", action="store_true", help="فقط اعضایی که خلاصه ندارند")
+    args = parser.parse_args(argv)
+
+    storage = open_storage()
+    existing = set(storage.list_rollups()) if args.only_missing else set()
+    built = 0
+    for username in storage.list_usernames():
+        if username in existing:
+            continue
+        record = storage.get_user(username)
+        if record is not None:
+            storage.put_rollup(username, build_rollup(record))
+            built += 1
+    print(f"rebuilt {built} rollups")
+
+
+if __name__ == "__main__":
+    main()
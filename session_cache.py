@@ -0,0 +1,131 @@
+import copy
+import hashlib
+import json
+import os
+import time
+
+from concurrency import save_with_retry
+from history_index import HistoryIndex
+
+# --- CONFIGURATION ---
+# حداکثر زمان نگه داشتن تغییرات در حافظه قبل از ارسال به دیتابیس (ثانیه)
+FLUSH_INTERVAL = float(os.environ.get("GYM_FLUSH_INTERVAL", 120))
+JOURNAL_DIR = os.environ.get("GYM_JOURNAL_DIR", ".gym_journal")
+
+
+def apply_op(record, op):
+    """اعمال یک تغییر ژورنال/صف روی رکورد؛ تکرار آن بی‌اثر است"""
+    if op["op"] == "weight":
+        record.setdefault("weights", {})[op["id"]] = op["value"]
+    elif op["op"] == "profile":
+        record.setdefault("profile", {}).update(op["value"])
+
+
+class Journal:
+    """ژورنال محلی (JSONL) برای تغییراتی که هنوز به دیتابیس نرسیده‌اند"""
+
+    def __init__(self, username, directory=JOURNAL_DIR):
+        key = hashlib.sha256(username.encode("utf-8")).hexdigest()[:20]
+        self.path = os.path.join(directory, f"{key}.jsonl")
+        self.directory = directory
+
+    def append(self, op):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(op) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self):
+        if not os.path.exists(self.path):
+            return []
+        ops = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ops.append(json.loads(line))
+                except ValueError:
+                    # خط ناقص آخر (قطع برق وسط نوشتن) نادیده گرفته می‌شود
+                    break
+        return ops
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class UserCache:
+    """کش سشن برای رکورد یک کاربر: خواندن از حافظه، نوشتن دسته‌ای"""
+
+    def __init__(self, storage, username, flush_interval=FLUSH_INTERVAL, journal_dir=JOURNAL_DIR):
+        self.storage = storage
+        self.username = username
+        self.flush_interval = flush_interval
+        self.journal = Journal(username, journal_dir)
+        self.record = None
+        self.base = None  # آخرین نسخه‌ای که از دیتابیس دیده شده (برای ادغام)
+        self.dirty = set()
+        self.last_flush = time.time()
+        self._history_index = None
+
+    def load(self):
+        """رکورد کاربر؛ فقط بار اول از دیتابیس خوانده می‌شود"""
+        if self.record is None:
+            record = self.storage.get_user(self.username)
+            if record is None:
+                return None
+            self.record = record
+            self.base = copy.deepcopy(record)
+            # تغییرات ذخیره نشده از اجرای قبلی
+            for op in self.journal.replay():
+                self._apply(op)
+        return self.record
+
+    def _apply(self, op):
+        apply_op(self.record, op)
+        self.dirty.add(("weights", op["id"]) if op["op"] == "weight" else (op["op"],))
+
+    def _change(self, op):
+        self.journal.append(op)
+        self._apply(op)
+
+    def set_weight(self, ex_id, value):
+        self._change({"op": "weight", "id": ex_id, "value": value})
+
+    def update_profile(self, **fields):
+        self._change({"op": "profile", "value": fields})
+
+    def flush(self):
+        """ارسال تغییرات به دیتابیس در یک درخواست (نسخه‌دار، با ادغام در صورت تداخل)"""
+        if self.dirty:
+            saved = save_with_retry(self.storage, self.username, self.base, self.record)
+            if saved is not self.record:
+                # رکورد در جا به‌روز می‌شود تا ارجاع‌های موجود (udata) معتبر بمانند
+                self.record.clear()
+                self.record.update(saved)
+            self.base = copy.deepcopy(self.record)
+            self.dirty.clear()
+            self.journal.clear()
+        self.last_flush = time.time()
+
+    def maybe_flush(self):
+        if self.dirty and time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def append_history(self, entry):
+        self.flush()
+        self.storage.append_history(self.username, entry)
+        self.record["history"].append(entry)
+        self.base["history"].append(copy.deepcopy(entry))
+        if self._history_index is not None:
+            self._history_index.add(entry)
+
+    def history_index(self, start):
+        """ایندکس هفتگی تاریخچه؛ فقط بار اول (یا با تغییر تاریخ شروع) کل تاریخچه خوانده می‌شود"""
+        index = self._history_index
+        if index is None or index.start_ord != start.toordinal():
+            index = HistoryIndex(start, self.load()["history"])
+            self._history_index = index
+        return index
@@ -0,0 +1,137 @@
+"""فرمت فشرده تاریخچه: هر جلسه یک آرایه JSON با ست‌ها و شناسه عددی حرکت
+
+ردیف جلسه: [day, duration_min, user_weight, sets, key?]  (key: شناسه یکتای جلسه برای ارسال دوباره بی‌خطر)
+هر ست:     [num, set, reps, weight, rpe, rest]  (num از کاتالوگ، reps برای حرکت زمانی null،
+           nullهای انتهای ست نوشته نمی‌شوند)
+در لیست بسته‌بندی شده (pack) اول هر ردیف اختلاف روز با جلسه قبلی می‌آید؛ جلسه‌های قدیمی
+(دیکشنری کامل) همان‌طور باقی می‌مانند و فقط تاریخشان مبنای اختلاف بعدی می‌شود.
+"""
+import json
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from exercises import EXERCISE_LIB, NUM_TO_ID
+from history_index import entry_ordinal
+
+SET_FIELDS = ("exercise_id", "set", "reps", "weight", "rpe", "rest")
+# گزینه‌های «فشار حرکت» -> RPE
+RPE_SCALE = {"سبک": 6.0, "مناسب": 8.0, "سنگین": 9.5}
+
+
+def dumps(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _number(value):
+    # 10.0 -> 10 تا JSON کوتاه‌تر بماند
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def session_entry(day_date, day, duration_min, user_weight, sets, key=None):
+    """جلسه کامل (همان شکلی که از تاریخچه خوانده می‌شود)
+
+    sets: دیکشنری‌هایی با کلیدهای SET_FIELDS. details (وزنه سنگین‌ترین ست هر حرکت با نام نمایشی)
+    و rpe (RPE آخرین ست هر حرکت) برای کدهای گزارش و پیشنهاد وزنه از روی ست‌ها ساخته می‌شوند.
+    """
+    sets = [{field: _number(s.get(field)) for field in SET_FIELDS} for s in sets]
+    details, rpe = {}, {}
+    for s in sets:
+        ex_id = s["exercise_id"]
+        name = EXERCISE_LIB.get(ex_id, {}).get("name", ex_id)
+        if s["weight"] is not None:
+            details[name] = max(details.get(name, s["weight"]), s["weight"])
+        if s["rpe"] is not None:
+            rpe[ex_id] = s["rpe"]
+    entry = {
+        "date": str(day_date),
+        "date_ord": day_date.toordinal(),
+        "day": day,
+        "duration_min": duration_min,
+        "user_weight": user_weight,
+        "sets": sets,
+        "details": details,
+        "rpe": rpe,
+    }
+    if key:
+        entry["key"] = key
+    return entry
+
+
+def encode_session(entry):
+    """(ordinal, ردیف فشرده)؛ جلسه قدیمی بدون ست: (ordinal, None)"""
+    ordinal = entry_ordinal(entry)
+    if "sets" not in entry or ordinal is None:
+        return ordinal, None
+    sets = []
+    for s in entry["sets"]:
+        ex_id = s["exercise_id"]
+        fields = [EXERCISE_LIB[ex_id]["num"] if ex_id in EXERCISE_LIB else ex_id,
+                  s["set"], s["reps"], s["weight"], s["rpe"], s["rest"]]
+        while fields[-1] is None:
+            fields.pop()
+        sets.append(fields)
+    row = [entry["day"], entry["duration_min"], entry["user_weight"], sets]
+    if entry.get("key"):
+        row.append(entry["key"])
+    return ordinal, row
+
+
+def decode_session(ordinal, row):
+    day, duration_min, user_weight, sets, *key = row
+    return session_entry(date.fromordinal(ordinal), day, duration_min, user_weight, [
+        {"exercise_id": NUM_TO_ID.get(s[0], s[0]), **dict(zip(SET_FIELDS[1:], s[1:]))} for s in sets],
+        key=key[0] if key else None)
+
+
+def encode_row(entry):
+    """(ordinal, متن) برای ذخیره یک جلسه در یک ردیف جدا (SQLite)؛ تاریخ در ستون جدا می‌ماند"""
+    ordinal, row = encode_session(entry)
+    return ordinal, dumps(row if row is not None else entry)
+
+
+def decode_row(ordinal, text):
+    row = json.loads(text)
+    return decode_session(ordinal, row) if isinstance(row, list) else row
+
+
+def pack(entries):
+    """لیست جلسه‌ها -> لیست ذخیره‌سازی با تاریخ‌های تفاضلی"""
+    rows, prev = [], 0
+    for entry in entries:
+        prev = append_packed(rows, entry, prev)
+    return rows
+
+
+def append_packed(rows, entry, prev):
+    """افزودن یک جلسه به انتهای لیست بسته‌بندی شده؛ ordinal آخر را برمی‌گرداند"""
+    ordinal, row = encode_session(entry)
+    if row is None:
+        rows.append(entry)
+        return ordinal if ordinal is not None else prev
+    rows.append([ordinal - prev, *row])
+    return ordinal
+
+
+def unpack(rows):
+    entries, prev = [], 0
+    for row in rows:
+        if isinstance(row, list):
+            prev += row[0]
+            entries.append(decode_session(prev, row[1:]))
+        else:
+            entries.append(row)
+            prev = entry_ordinal(row) or prev
+    return entries
+
+
+def scan(entries, start_ord=None, end_ord=None):
+    """جلسه‌های بازه [start_ord, end_ord] از تاریخچه مرتب با جستجوی دودویی"""
+    lo = 0 if start_ord is None else bisect_left(entries, start_ord, key=_ordinal)
+    hi = len(entries) if end_ord is None else bisect_right(entries, end_ord, key=_ordinal)
+    return entries[lo:hi]
+
+
+def _ordinal(entry):
+    return entry_ordinal(entry) or 0
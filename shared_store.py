@@ -0,0 +1,209 @@
+"""انبار کلید-مقدار مشترک بین نسخه‌های برنامه (replica) پشت load balancer
+
+سشن ورود، جلسه تمرین در حال اجرا، آخرین رکورد هر عضو و کلیپ‌های صوتی اینجا نگه داشته می‌شوند تا
+اتصال دوباره عضو به هر نسخه‌ای برسد کارش ادامه پیدا کند.
+
+    GYM_SHARED_STORE=redis://host:6379/0   Redis یا سرویس سازگار (پکیج redis لازم است)
+    GYM_SHARED_STORE=/path/shared.db       SQLite (چند پروسه روی یک ماشین، یا تست)
+
+پیش‌فرض فایل SQLite کنار برنامه است که برای یک نسخه همان رفتار قبلی را دارد.
+"""
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import metrics
+
+# --- CONFIGURATION ---
+SHARED_STORE = os.environ.get("GYM_SHARED_STORE", ".gym_shared.db")
+PREFIX = "gym:"
+# توکن سشن در آدرس صفحه است (تاریخچه مرورگر، لاگ‌ها)؛ عمر کوتاه و یک بار مصرف (ثانیه)
+SESSION_TTL = float(os.environ.get("GYM_SESSION_TTL", 2 * 3600))
+WORKOUT_TTL = 24 * 3600  # جلسه تمرین نیمه‌کاره بعد از یک روز کنار گذاشته می‌شود
+PURGE_EVERY = 500  # هر چند نوشتن، کلیدهای منقضی از SQLite پاک می‌شوند
+LOCK_TTL = 30.0  # قفلی که پروسه صاحبش مرده بعد از این مدت آزاد می‌شود (ثانیه)
+LOCK_WAIT = 30.0
+
+
+class LockTimeout(Exception):
+    """قفل در مدت LOCK_WAIT آزاد نشد"""
+
+
+def store_key(kind, name):
+    return f"{PREFIX}{kind}:{name}"
+
+
+class SharedStore(ABC):
+    """مقدارها بایت هستند؛ ttl بر حسب ثانیه (None: بدون انقضا)"""
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+    @abstractmethod
+    def add(self, key, value, ttl=None):
+        """نوشتن فقط اگر کلید وجود نداشته باشد (SET NX)؛ True اگر نوشته شد"""
+
+    @abstractmethod
+    def release(self, key, value):
+        """پاک کردن کلید فقط اگر مقدارش همان value باشد"""
+
+    @abstractmethod
+    def take(self, key):
+        """خواندن و پاک کردن در یک قدم؛ از چند درخواست همزمان فقط یکی مقدار را می‌گیرد"""
+
+    @contextmanager
+    def lock(self, name, ttl=LOCK_TTL, wait=LOCK_WAIT):
+        """قفل بین همه پروسه‌ها و نسخه‌هایی که این انبار را می‌بینند"""
+        key, token = store_key("lock", name), uuid.uuid4().hex.encode("ascii")
+        deadline = time.time() + wait
+        with metrics.span("shared.lock"):
+            while not self.add(key, token, ttl):
+                if time.time() > deadline:
+                    raise LockTimeout(name)
+                time.sleep(random.uniform(0.005, 0.05))
+        try:
+            yield
+        finally:
+            self.release(key, token)
+
+    def get_json(self, key):
+        with metrics.span("shared.get"):
+            raw = self.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set_json(self, key, value, ttl=None):
+        with metrics.span("shared.set"):
+            self.set(key, json.dumps(value, separators=(",", ":")).encode("utf-8"), ttl)
+
+    def take_json(self, key):
+        with metrics.span("shared.take"):
+            raw = self.take(key)
+        return None if raw is None else json.loads(raw)
+
+
+class SQLiteSharedStore(SharedStore):
+    def __init__(self, path=SHARED_STORE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS kv (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires REAL
+            )""")
+        self.conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return bytes(row[0])
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                              (key, value, expires))
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self.conn.execute("DELETE FROM kv WHERE expires <= ?", (time.time(),))
+
+    def delete(self, key):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def add(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM kv WHERE key = ? AND expires <= ?", (key, time.time()))
+            cur = self.conn.execute("INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                                    (key, value, expires))
+            return cur.rowcount == 1
+
+    def release(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM kv WHERE key = ? AND value = ?", (key, value))
+
+    def take(self, key):
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return bytes(row[0])
+
+
+class RedisSharedStore(SharedStore):
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=math.ceil(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, nx=True, px=math.ceil(ttl * 1000) if ttl else None))
+
+    def release(self, key, value):
+        import redis
+
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) == value:
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+            except redis.WatchError:
+                # کلید در همین فاصله منقضی و دوباره گرفته شده است؛ مال ما نیست
+                pass
+
+    def take(self, key):
+        import redis
+
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                value = pipe.get(key)
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+            except redis.WatchError:
+                # درخواست دیگری همین حالا آن را گرفته است
+                return None
+        return value
+
+
+def open_shared_store(spec=None):
+    spec = spec or SHARED_STORE
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedStore(spec)
+    return SQLiteSharedStore(spec)
@@ -0,0 +1,690 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import ExitStack, contextmanager
+
+import streamlit as st
+
+import metrics
+import set_log
+from history_index import entry_ordinal
+
+# --- CONFIGURATION ---
+SHEET_NAME = "gym_database"
+USERS_WORKSHEET = "users"
+ROLLUPS_WORKSHEET = "rollups"
+CREDENTIALS_WORKSHEET = "credentials"
+HISTORY_WORKSHEET = "history"
+SQLITE_PATH = "gym.db"
+# کلیدی که در ستون A نبود (ورود با نام ناشناس) تا این مدت دوباره کل ستون را دانلود نمی‌کند (ثانیه)
+MISS_TTL = 30.0
+MISS_CACHE = 1000  # حداکثر کلیدهای پیدا نشده در حافظه
+
+# ستون‌های شیت کاربران: هر کاربر یک ردیف
+# A: نام کاربری | B: رکورد (پسورد، پروفایل، برنامه، وزنه‌ها) | C: تاریخچه قدیمی (فشرده، set_log) | D: نسخه
+# ستون C فقط خوانده می‌شود تا scripts.migrate_history_rows آن را به شیت history منتقل کند
+# ستون‌های شیت history: هر جلسه یک ردیف
+# A: نام کاربری | B: ordinal تاریخ | C: key جلسه | D: جلسه (set_log.encode_row)
+VERSION_KEY = "_version"
+
+
+class ConflictError(Exception):
+    """رکورد از زمان خواندن توسط سشن دیگری تغییر کرده است"""
+
+    def __init__(self, username, expected, actual):
+        super().__init__(f"{username}: expected version {expected}, found {actual}")
+        self.username = username
+        self.expected = expected
+        self.actual = actual
+
+
+def split_record(record):
+    """جدا کردن تاریخچه و نسخه از بقیه رکورد کاربر"""
+    body = {k: v for k, v in record.items() if k not in ("history", VERSION_KEY)}
+    return body, list(record.get("history", []))
+
+
+class Storage(ABC):
+    """رابط ذخیره‌سازی: هر عملیات فقط روی یک کاربر کار می‌کند
+
+    هر رکورد یک شماره نسخه (_version) دارد که با هر نوشتن یکی زیاد می‌شود.
+    """
+
+    @abstractmethod
+    def get_user(self, username):
+        """رکورد کامل یک کاربر (با تاریخچه و نسخه) یا None"""
+
+    @abstractmethod
+    def put_user(self, username, record, expected_version=None):
+        """ذخیره رکورد کاربر و برگرداندن نسخه جدید
+
+        اگر expected_version داده شود و نسخه فعلی متفاوت باشد ConflictError می‌دهد.
+        تاریخچه فقط هنگام ساخت کاربر نوشته می‌شود.
+        """
+
+    def create_users(self, users):
+        """ساخت چند کاربر تازه: [(username, record, password_hash)]
+
+        نام‌هایی که از قبل وجود دارند دست نمی‌خورند و برگردانده می‌شوند.
+        """
+        existing = []
+        for username, record, password_hash in users:
+            try:
+                self.put_user(username, record, expected_version=0)
+            except ConflictError:
+                existing.append(username)
+                continue
+            self.put_credential(username, password_hash)
+        return existing
+
+    def append_history(self, username, entry):
+        """افزودن یک جلسه به انتهای تاریخچه کاربر (بدون تداخل با نوشتن‌های دیگر)
+
+        جلسه‌ای که key دارد فقط یک بار اضافه می‌شود (ارسال دوباره بعد از قطعی شبکه بی‌خطر است).
+        """
+        self.append_history_many(username, [entry])
+
+    @abstractmethod
+    def append_history_many(self, username, entries):
+        """افزودن چند جلسه در یک درخواست"""
+
+    def history_range(self, username, start_ord=None, end_ord=None):
+        """جلسه‌های کاربر در بازه تاریخ (ordinal، دو سر بسته)"""
+        record = self.get_user(username)
+        return set_log.scan(record["history"], start_ord, end_ord) if record else []
+
+    @abstractmethod
+    def list_usernames(self):
+        """نام همه کاربران (بدون خواندن رکوردها)"""
+
+    @abstractmethod
+    def get_credential(self, username):
+        """هش رمز کاربر از ایندکس جدا (بدون خواندن رکورد) یا None"""
+
+    @abstractmethod
+    def put_credential(self, username, password_hash):
+        ...
+
+    @abstractmethod
+    def get_rollup(self, username):
+        """خلاصه آماری کاربر برای داشبورد مربی یا None"""
+
+    @abstractmethod
+    def put_rollup(self, username, rollup):
+        ...
+
+    @abstractmethod
+    def list_rollups(self):
+        """خلاصه همه اعضا: username -> rollup"""
+
+
+# --- GOOGLE SHEETS CONNECTION (ONE PER PROCESS) ---
+SCOPES = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+
+def _count(name):
+    # شمارنده برای اطمینان از این که احراز هویت و باز کردن شیت یک بار در هر پروسه است
+    metrics.count("gym_sheets_connections_total", event=name)
+
+
+def get_google_sheet_client():
+    # اتصال با استفاده از سکرت‌های استریم‌لیت
+    # google-auth توکن را خودکار تمدید می‌کند و سشن HTTP را نگه می‌دارد
+    import gspread
+
+    _count("auth")
+    return gspread.service_account_from_dict(dict(st.secrets["service_account"]), scopes=SCOPES)
+
+
+def open_worksheet(spreadsheet, title, cols=3):
+    """ورک‌شیت با نام داده شده؛ اگر نبود ساخته می‌شود"""
+    import gspread
+
+    try:
+        return spreadsheet.worksheet(title)
+    except gspread.exceptions.WorksheetNotFound:
+        return spreadsheet.add_worksheet(title=title, rows=100, cols=cols)
+
+
+def _is_auth_error(e):
+    import gspread
+
+    return isinstance(e, gspread.exceptions.APIError) and e.code == 401
+
+
+class SheetConnection:
+    """کلاینت، اسپردشیت و ورک‌شیت‌ها یک بار ساخته و بین همه سشن‌ها استفاده می‌شوند"""
+
+    def __init__(self, sheet_name=SHEET_NAME, client_factory=get_google_sheet_client):
+        self.sheet_name = sheet_name
+        self.client_factory = client_factory
+        self._lock = threading.Lock()
+        self._spreadsheet = None
+        self._worksheets = {}
+
+    def _connect(self):
+        client = self.client_factory()
+        _count("open")
+        self._spreadsheet = client.open(self.sheet_name)
+        self._worksheets = {}
+
+    def worksheet(self, title, cols=3):
+        with self._lock:
+            if self._spreadsheet is None:
+                self._connect()
+            if title not in self._worksheets:
+                self._worksheets[title] = open_worksheet(self._spreadsheet, title, cols)
+            return self._worksheets[title]
+
+    def reconnect(self):
+        """ساخت دوباره اتصال (مثلا وقتی توکن باطل شده)"""
+        _count("reconnect")
+        with self._lock:
+            self._spreadsheet = None
+            self._worksheets = {}
+
+    def call(self, fn):
+        """اجرای یک درخواست؛ در صورت خطای 401 یک بار با اتصال تازه تکرار می‌شود"""
+        try:
+            return fn()
+        except Exception as e:
+            if not _is_auth_error(e):
+                raise
+            self.reconnect()
+            return fn()
+
+
+@st.cache_resource
+def get_sheet_connection():
+    return SheetConnection()
+
+
+# --- GOOGLE SHEETS BACKEND (ROW PER USER) ---
+class SheetTable:
+    """ورک‌شیتی که ستون A آن کلید است؛ ایندکس کلید -> شماره ردیف در حافظه نگه داشته می‌شود"""
+
+    def __init__(self, conn, title, cols):
+        self.conn = conn
+        self.title = title
+        self.cols = cols
+        self._rows = None
+        self._misses = {}  # کلید پیدا نشده -> زمان آخرین خواندن ستون A
+        self._lock = threading.Lock()
+
+    @property
+    def ws(self):
+        return self.conn.worksheet(self.title, self.cols)
+
+    def call(self, method, *args, **kwargs):
+        # هر بار ورک‌شیت از اتصال گرفته می‌شود تا بعد از reconnect دستگیره تازه باشد
+        metrics.count("gym_remote_requests_total", backend="sheets", op=method)
+        metrics.count("gym_remote_bytes_total", metrics.payload_size([args, kwargs]), direction="sent")
+        with metrics.span(f"sheets.{method}"):
+            result = self.conn.call(lambda: getattr(self.ws, method)(*args, **kwargs))
+        metrics.count("gym_remote_bytes_total", metrics.payload_size(result), direction="received")
+        return result
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+            self._misses.clear()
+
+    def _load_index(self):
+        names = self.call("col_values", 1)
+        self._rows = {name: i + 1 for i, name in enumerate(names) if name}
+
+    def row_of(self, key, fresh=False):
+        """شماره ردیف کلید یا None
+
+        نبود کلید تا MISS_TTL از حافظه جواب داده می‌شود؛ fresh (قبل از ساختن ردیف) همیشه ستون A را
+        دوباره می‌خواند تا ردیفی که پروسه دیگری ساخته دوباره ساخته نشود.
+        """
+        with self._lock:
+            loaded = self._rows is None
+            if loaded:
+                self._load_index()
+            row = self._rows.get(key)
+            now = time.monotonic()
+            missed = self._misses.get(key)
+            if row is None and not loaded and (fresh or missed is None or now - missed >= MISS_TTL):
+                # شاید ردیف در پروسه دیگری ساخته شده باشد
+                self._load_index()
+                loaded = True
+                row = self._rows.get(key)
+            if row is None and loaded:
+                if len(self._misses) >= MISS_CACHE:
+                    self._misses.clear()
+                self._misses[key] = now
+            return row
+
+    def get_row(self, key):
+        """خانه‌های ردیف کلید (به طول cols) یا None"""
+        row = self.row_of(key)
+        if row is None:
+            return None
+        last = chr(ord("A") + self.cols - 1)
+        values = self.call("get", f"A{row}:{last}{row}")
+        if not values or not values[0] or values[0][0] != key:
+            # ایندکس کهنه شده است
+            self.invalidate()
+            return None
+        return values[0] + [""] * (self.cols - len(values[0]))
+
+    def append(self, rows):
+        self.call("append_rows", rows, value_input_option="RAW")
+        self.invalidate()
+
+    def keys(self):
+        with self._lock:
+            self._load_index()
+            return list(self._rows)
+
+    def all_rows(self):
+        return [r for r in self.call("get_all_values") if r and r[0]]
+
+
+class HistorySheet(SheetTable):
+    """شیت history: هر جلسه یک ردیف، مثل جدول history در SQLite؛ افزودن جلسه O(1) است
+
+    ردیف‌ها فقط اضافه می‌شوند، پس ایندکس username -> [(ordinal, key, row)] با خواندن فقط ردیف‌های
+    تازه (بعد از آخرین ردیف دیده شده) به‌روز می‌شود.
+    """
+
+    def __init__(self, conn, title=HISTORY_WORKSHEET):
+        super().__init__(conn, title, 4)
+        self._index = {}
+        self._seen = 0
+
+    def refresh(self):
+        with self._lock:
+            rows = self.call("get", f"A{self._seen + 1}:C")
+            for i, row in enumerate(rows, start=self._seen + 1):
+                if row and row[0]:
+                    row = row + [""] * (3 - len(row))
+                    self._index.setdefault(row[0], []).append((int(row[1] or 0), row[2], i))
+            self._seen += len(rows)
+
+    def keys_of(self, username):
+        with self._lock:
+            return {key for _, key, _ in self._index.get(username, ()) if key}
+
+    def ordinals_of(self, username):
+        with self._lock:
+            return [ordinal for ordinal, _, _ in self._index.get(username, ())]
+
+    def entries(self, username, start_ord=None, end_ord=None):
+        """جلسه‌های کاربر در بازه، به ترتیب تاریخ؛ ردیف‌های پشت سر هم با یک محدوده خوانده می‌شوند"""
+        self.refresh()
+        lo = start_ord if start_ord is not None else 0
+        hi = end_ord if end_ord is not None else 1 << 31
+        with self._lock:
+            rows = sorted(row for ordinal, _, row in self._index.get(username, ()) if lo <= ordinal <= hi)
+        if not rows:
+            return []
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        out = []
+        for values in self.call("batch_get", [f"A{a}:D{b}" for a, b in ranges]):
+            for cells in values:
+                if cells and cells[0] == username and len(cells) > 3:
+                    out.append((int(cells[1] or 0), cells[3]))
+        out.sort(key=lambda item: item[0])
+        return [set_log.decode_row(ordinal, text) for ordinal, text in out]
+
+    @staticmethod
+    def rows_for(username, entries):
+        rows = []
+        for entry in entries:
+            ordinal, text = set_log.encode_row(entry)
+            rows.append([username, ordinal if ordinal is not None else "", entry.get("key") or "", text])
+        return rows
+
+
+class SheetsStorage(Storage):
+    """هر کاربر یک ردیف در شیت users؛ فقط ستون نام‌ها برای ایندکس خوانده می‌شود
+
+    شیت compare-and-set ندارد؛ بررسی نسخه و نوشتن برای هر کاربر زیر یک قفل انجام می‌شود:
+    قفل داخل پروسه و اگر locks (انبار مشترک) داده شود قفل بین همه پروسه‌ها و نسخه‌های برنامه.
+    """
+
+    def __init__(self, conn, locks=None):
+        self.conn = conn
+        self.locks = locks
+        self.users = SheetTable(conn, USERS_WORKSHEET, 4)
+        self.rollups = SheetTable(conn, ROLLUPS_WORKSHEET, 2)
+        self.credentials = SheetTable(conn, CREDENTIALS_WORKSHEET, 2)
+        self.history = HistorySheet(conn)
+        self._lock = threading.Lock()
+        self._user_locks = {}
+
+    @contextmanager
+    def _user_lock(self, username):
+        with self._lock:
+            local = self._user_locks.setdefault(username, threading.Lock())
+        with local:
+            if self.locks is None:
+                yield
+                return
+            with self.locks.lock(f"user:{username}"):
+                yield
+
+    def get_user(self, username):
+        cells = self.users.get_row(username)
+        if cells is None:
+            return None
+        record = json.loads(cells[1]) if cells[1] else {}
+        legacy = set_log.unpack(json.loads(cells[2])) if cells[2] else []
+        record["history"] = legacy + self.history.entries(username)
+        record[VERSION_KEY] = int(cells[3] or 0)
+        return record
+
+    def history_range(self, username, start_ord=None, end_ord=None):
+        if self.users.row_of(username) is None:
+            return []
+        return self.history.entries(username, start_ord, end_ord)
+
+    def put_user(self, username, record, expected_version=None):
+        body, history = split_record(record)
+        with self._user_lock(username):
+            row = self.users.row_of(username, fresh=True)
+            if row is None:
+                if expected_version:
+                    raise ConflictError(username, expected_version, None)
+                self.users.append([[username, json.dumps(body), "", 1]])
+                if history:
+                    self.history.append(self.history.rows_for(username, history))
+                return 1
+            current = int(self.users.call("acell", f"D{row}").value or 0)
+            if expected_version is not None and current != expected_version:
+                raise ConflictError(username, expected_version, current)
+            self.users.call("batch_update", [
+                {"range": f"B{row}", "values": [[json.dumps(body)]]},
+                {"range": f"D{row}", "values": [[current + 1]]},
+            ], value_input_option="RAW")
+            return current + 1
+
+    def create_users(self, users):
+        # یک افزودن برای همه ردیف‌های کاربران و یک افزودن برای رمزها؛ قفل همه نام‌ها (به ترتیب، تا دو
+        # ثبت گروهی همزمان در بن‌بست نیفتند) تا ثبت نام همزمان با put_user ردیف تکراری نسازد
+        with ExitStack() as stack:
+            for username in sorted({u for u, _, _ in users}):
+                stack.enter_context(self._user_lock(username))
+            return self._create_users(users)
+
+    def _create_users(self, users):
+        existing = set(self.users.keys())
+        new = [(u, r, h) for u, r, h in users if u not in existing]
+        if new:
+            rows, history_rows = [], []
+            for username, record, _ in new:
+                body, history = split_record(record)
+                rows.append([username, json.dumps(body), "", 1])
+                history_rows += self.history.rows_for(username, history)
+            self.users.append(rows)
+            if history_rows:
+                self.history.append(history_rows)
+            credentials = set(self.credentials.keys())
+            self.credentials.append([[u, h] for u, _, h in new if u not in credentials])
+            for username, _, password_hash in new:
+                if username in credentials:
+                    self._put_credential(username, password_hash)
+        return [u for u, _, _ in users if u in existing]
+
+    def append_history_many(self, username, entries):
+        with self._user_lock(username):
+            row = self.users.row_of(username, fresh=True)
+            if row is None:
+                raise KeyError(username)
+            # هر جلسه یک ردیف تازه؛ نسخه رکورد (که مربوط به ستون B است) عوض نمی‌شود
+            self.history.refresh()
+            keys = self.history.keys_of(username)
+            new = []
+            for entry in entries:
+                if entry.get("key") and entry["key"] in keys:
+                    continue
+                keys.add(entry.get("key"))
+                new.append(entry)
+            if new:
+                self.history.append(self.history.rows_for(username, new))
+
+    def list_usernames(self):
+        return self.users.keys()
+
+    def get_credential(self, username):
+        cells = self.credentials.get_row(username)
+        return (cells[1] or None) if cells else None
+
+    def put_credential(self, username, password_hash):
+        # زیر همان قفل put_user تا هش دوباره هنگام ورود با نوشتن همزمان رکورد کاربر تداخل نکند
+        with self._user_lock(username):
+            self._put_credential(username, password_hash)
+
+    def _put_credential(self, username, password_hash):
+        row = self.credentials.row_of(username, fresh=True)
+        if row is None:
+            self.credentials.append([[username, password_hash]])
+        else:
+            self.credentials.call("update", [[password_hash]], f"B{row}", value_input_option="RAW")
+
+    def get_rollup(self, username):
+        cells = self.rollups.get_row(username)
+        return json.loads(cells[1]) if cells and cells[1] else None
+
+    def put_rollup(self, username, rollup):
+        row = self.rollups.row_of(username, fresh=True)
+        if row is None:
+            self.rollups.append([[username, json.dumps(rollup)]])
+        else:
+            self.rollups.call("update", [[json.dumps(rollup)]], f"B{row}", value_input_option="RAW")
+
+    def list_rollups(self):
+        # یک درخواست برای همه اعضا؛ هر ردیف فقط خلاصه یک عضو است نه تاریخچه کامل
+        return {r[0]: json.loads(r[1]) for r in self.rollups.all_rows() if len(r) > 1 and r[1]}
+
+
+# --- SQLITE BACKEND (LOCAL) ---
+class SQLiteStorage(Storage):
+    """بک‌اند محلی؛ تاریخچه در جدول جدا و فقط append می‌شود"""
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL,
+                ord INTEGER,
+                key TEXT,
+                entry TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS history_user ON history (username, id);
+            CREATE TABLE IF NOT EXISTS credentials (
+                username TEXT PRIMARY KEY,
+                password_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rollups (
+                username TEXT PRIMARY KEY,
+                rollup TEXT NOT NULL
+            );
+        """)
+        columns = [c[1] for c in self.conn.execute("PRAGMA table_info(users)")]
+        if "version" not in columns:
+            # دیتابیس‌های ساخته شده قبل از نسخه‌دار شدن رکوردها
+            self.conn.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        columns = [c[1] for c in self.conn.execute("PRAGMA table_info(history)")]
+        if "ord" not in columns:
+            # جلسه‌های قبلی تاریخ خود را در JSON دارند
+            self.conn.execute("ALTER TABLE history ADD COLUMN ord INTEGER")
+            for row_id, entry in self.conn.execute("SELECT id, entry FROM history").fetchall():
+                self.conn.execute("UPDATE history SET ord = ? WHERE id = ?",
+                                  (entry_ordinal(json.loads(entry)), row_id))
+        if "key" not in columns:
+            self.conn.execute("ALTER TABLE history ADD COLUMN key TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS history_user_ord ON history (username, ord)")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS history_key ON history (username, key)")
+        self.conn.commit()
+
+    def get_user(self, username):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT record, version FROM users WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return None
+            entries = self.conn.execute(
+                "SELECT ord, entry FROM history WHERE username = ? ORDER BY id", (username,)).fetchall()
+        record = json.loads(row[0])
+        record["history"] = [set_log.decode_row(ordinal, entry) for ordinal, entry in entries]
+        record[VERSION_KEY] = row[1]
+        return record
+
+    def put_user(self, username, record, expected_version=None):
+        body, history = split_record(record)
+        with self._lock, self.conn:
+            if expected_version is None:
+                cur = self.conn.execute(
+                    "UPDATE users SET record = ?, version = version + 1 WHERE username = ?",
+                    (json.dumps(body), username))
+            else:
+                cur = self.conn.execute(
+                    "UPDATE users SET record = ?, version = version + 1 WHERE username = ? AND version = ?",
+                    (json.dumps(body), username, expected_version))
+            if cur.rowcount:
+                return self.conn.execute(
+                    "SELECT version FROM users WHERE username = ?", (username,)).fetchone()[0]
+            current = self.conn.execute(
+                "SELECT version FROM users WHERE username = ?", (username,)).fetchone()
+            if current is not None or expected_version:
+                raise ConflictError(username, expected_version, current and current[0])
+            self.conn.execute(
+                "INSERT INTO users (username, record, version) VALUES (?, ?, 1)", (username, json.dumps(body)))
+            self._insert_history(username, history)
+            return 1
+
+    def create_users(self, users):
+        with self._lock, self.conn:
+            existing = {r[0] for r in self.conn.execute(
+                f"SELECT username FROM users WHERE username IN ({','.join('?' * len(users))})",
+                [u for u, _, _ in users])} if users else set()
+            new = [(u, r, h) for u, r, h in users if u not in existing]
+            self.conn.executemany("INSERT INTO users (username, record, version) VALUES (?, ?, 1)",
+                                  [(u, json.dumps(split_record(r)[0])) for u, r, _ in new])
+            self.conn.executemany("INSERT OR REPLACE INTO credentials (username, password_hash) VALUES (?, ?)",
+                                  [(u, h) for u, _, h in new])
+            for username, record, _ in new:
+                self._insert_history(username, record.get("history", []))
+        return [u for u, _, _ in users if u in existing]
+
+    def _insert_history(self, username, entries):
+        # key تکراری (جلسه‌ای که قبلا رسیده) نادیده گرفته می‌شود
+        rows = []
+        for entry in entries:
+            ordinal, text = set_log.encode_row(entry)
+            rows.append((username, ordinal, entry.get("key"), text))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO history (username, ord, key, entry) VALUES (?, ?, ?, ?)", rows)
+
+    def append_history_many(self, username, entries):
+        with self._lock, self.conn:
+            self._insert_history(username, entries)
+
+    def history_range(self, username, start_ord=None, end_ord=None):
+        with self._lock:
+            entries = self.conn.execute(
+                "SELECT ord, entry FROM history WHERE username = ? AND ord BETWEEN ? AND ? ORDER BY ord, id",
+                (username, start_ord if start_ord is not None else 0,
+                 end_ord if end_ord is not None else 1 << 31)).fetchall()
+        return [set_log.decode_row(ordinal, entry) for ordinal, entry in entries]
+
+    def list_usernames(self):
+        with self._lock:
+            return [r[0] for r in self.conn.execute("SELECT username FROM users ORDER BY username")]
+
+    def get_credential(self, username):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT password_hash FROM credentials WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def put_credential(self, username, password_hash):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO credentials (username, password_hash) VALUES (?, ?)",
+                (username, password_hash))
+
+    def get_rollup(self, username):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT rollup FROM rollups WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_rollup(self, username, rollup):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rollups (username, rollup) VALUES (?, ?)", (username, json.dumps(rollup)))
+
+    def list_rollups(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT username, rollup FROM rollups").fetchall()
+        return {name: json.loads(rollup) for name, rollup in rows}
+
+
+# --- FACTORY ---
+def storage_kind():
+    """نوع بک‌اند: متغیر محیطی GYM_STORAGE یا سکرت storage (پیش‌فرض: sheets)"""
+    kind = os.environ.get("GYM_STORAGE")
+    if not kind:
+        try:
+            kind = st.secrets.get("storage", "sheets")
+        except Exception:
+            kind = "sheets"
+    return kind
+
+
+def open_storage(kind=None, path=None):
+    kind = kind or storage_kind()
+    if kind == "sqlite":
+        return SQLiteStorage(path or os.environ.get("GYM_SQLITE_PATH", SQLITE_PATH))
+    if kind == "sheets":
+        # بدون انبار مشترک دو نسخه برنامه می‌توانند همزمان یک نسخه رکورد را بازنویسی کنند
+        from shared_store import open_shared_store
+
+        return SheetsStorage(get_sheet_connection(), locks=open_shared_store())
+    raise ValueError(f"unknown storage backend: {kind}")
+
+
+class MeteredStorage:
+    """بک‌اند با زمان‌سنجی هر عملیات (span storage.<method>)؛ بقیه چیزها همان بک‌اند داخلی است"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with metrics.span(f"storage.{name}"):
+                return attr(*args, **kwargs)
+        return call
+
+
+@st.cache_resource
+def get_storage():
+    """یک نمونه مشترک از بک‌اند برای کل پروسه"""
+    return MeteredStorage(open_storage())
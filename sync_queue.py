@@ -0,0 +1,516 @@
+import copy
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+import metrics
+import set_log
+from analytics import build_rollup, update_rollup
+from concurrency import MAX_RETRIES, backoff_delay
+from session_cache import UserCache, apply_op
+from shared_store import WORKOUT_TTL, SQLiteSharedStore, store_key
+from storage import VERSION_KEY, ConflictError
+
+# --- CONFIGURATION ---
+# صف نوشتن کنار بقیه وضعیت مشترک است (همان فایل SQLite یا همان Redis) تا نسخه‌های برنامه stateless
+# بمانند و بسته شدن یک نسخه تغییرات ارسال نشده را از بین نبرد؛ GYM_QUEUE_PATH یک فایل SQLite جدا
+QUEUE_PATH = os.environ.get("GYM_QUEUE_PATH")
+LOCAL_QUEUE_PATH = ".gym_queue.db"  # صف محلی نسخه‌های قبلی؛ در اولین اجرا به صف مشترک منتقل می‌شود
+BATCH_SIZE = 200  # حداکثر عملیات در هر دور ارسال
+BATCH_DELAY = 0.5  # صبر بعد از اولین تغییر تا تغییرات پشت سر هم در یک دور بروند (ثانیه)
+SYNC_INTERVAL = 30.0  # بدون تغییر جدید هم صف هر چند ثانیه بررسی می‌شود
+# عملیاتی که یک ترد ارسال برداشته تا این مدت برای بقیه رزرو است؛ اگر آن نسخه وسط کار بسته شود
+# بعد از آن دوباره ارسال می‌شوند (ثانیه)
+CLAIM_SECONDS = float(os.environ.get("GYM_SYNC_CLAIM", 120))
+RETRY_BASE = 1.0  # ثانیه
+RETRY_MAX = 300.0
+# رکورد عضو در انبار مشترک تا این مدت بدون خواندن دوباره از دیتابیس استفاده می‌شود (ثانیه)
+RECORD_TTL = float(os.environ.get("GYM_RECORD_TTL", 60))
+SNAPSHOT_TTL = 30 * 24 * 3600  # نسخه آفلاین رکورد بعد از این مدت از انبار مشترک پاک می‌شود
+
+
+def retry_delay(attempts):
+    """تاخیر نمایی با jitter تا تلاش دوباره ارسال بعد از خطای شبکه"""
+    return random.uniform(0.5, 1.0) * min(RETRY_MAX, RETRY_BASE * (2 ** attempts))
+
+
+class Outbox(ABC):
+    """رابط صف نوشتن؛ تغییرات اول اینجا ثبت و بعد در پس‌زمینه (SyncWorker) ارسال می‌شوند
+
+    هر عملیات یک key یکتا دارد، پس ثبت دوباره همان عملیات (مثلا بعد از reload) اثری ندارد.
+    آخرین رکورد دیده شده هر عضو در انبار مشترک (shared) نگه داشته می‌شود.
+    """
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.wakeup = threading.Event()
+
+    @abstractmethod
+    def enqueue(self, username, kind, payload, key=None):
+        ...
+
+    @abstractmethod
+    def pending(self, username):
+        """عملیات ارسال نشده کاربر به ترتیب ثبت: (kind, payload)"""
+
+    @abstractmethod
+    def due(self, limit=BATCH_SIZE, now=None):
+        """عملیات آماده ارسال: (id, username, kind, payload)
+
+        کاربری که عملیات در انتظار تلاش دوباره یا در حال ارسال دارد کلا کنار می‌ماند تا ترتیب
+        تغییراتش حفظ شود. عملیات برگردانده شده تا CLAIM_SECONDS برای بقیه رزرو می‌شوند.
+        """
+
+    @abstractmethod
+    def done(self, ids):
+        ...
+
+    @abstractmethod
+    def failed(self, ids, error, now=None):
+        ...
+
+    @abstractmethod
+    def next_due(self):
+        """زمانی که due اولین عملیات را برمی‌گرداند (همان قاعده due) یا None اگر صف خالی است"""
+
+    @abstractmethod
+    def stats(self, username=None):
+        """تعداد عملیات در صف، تعداد عملیات ناموفق و آخرین خطا"""
+
+    def _put_snapshot(self, username, snapshot, saved_at):
+        self.shared.set_json(store_key("record", username), {"saved_at": saved_at, "record": snapshot},
+                             ttl=SNAPSHOT_TTL)
+
+    def save_snapshot(self, username, record):
+        snapshot = dict(record, history=set_log.pack(record.get("history", [])))
+        self._put_snapshot(username, snapshot, saved_at=time.time())
+
+    def load_snapshot(self, username, max_age=None):
+        """آخرین رکورد ذخیره شده؛ با max_age فقط اگر از آن تازه‌تر باشد"""
+        saved = self.shared.get_json(store_key("record", username))
+        if saved is None or (max_age is not None and time.time() - saved["saved_at"] > max_age):
+            return None
+        record = saved["record"]
+        record["history"] = set_log.unpack(record["history"])
+        return record
+
+
+class WriteQueue(Outbox):
+    """صف نوشتن در SQLite؛ چند پروسه می‌توانند همزمان از یک فایل ارسال کنند"""
+
+    def __init__(self, path=LOCAL_QUEUE_PATH, shared=None):
+        super().__init__(shared or SQLiteSharedStore(path))
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                username TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS outbox_user ON outbox (username, id);
+        """)
+        self.conn.commit()
+        self._migrate()
+
+    def _migrate(self):
+        """جدول‌های snapshots و workouts نسخه قبل به انبار مشترک منتقل می‌شوند"""
+        tables = {r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "snapshots" in tables:
+            for username, record in self.conn.execute("SELECT username, record FROM snapshots").fetchall():
+                # زمان ذخیره نامعلوم است؛ فقط برای حالت آفلاین به کار می‌رود
+                self._put_snapshot(username, json.loads(record), saved_at=0)
+            self.conn.execute("DROP TABLE snapshots")
+        if "workouts" in tables:
+            for username, state in self.conn.execute("SELECT username, state FROM workouts").fetchall():
+                self.shared.set_json(store_key("workout", username), json.loads(state), ttl=WORKOUT_TTL)
+            self.conn.execute("DROP TABLE workouts")
+        self.conn.commit()
+
+    def enqueue(self, username, kind, payload, key=None):
+        key = key or uuid.uuid4().hex
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, username, kind, payload) VALUES (?, ?, ?, ?)",
+                (key, username, kind, json.dumps(payload)))
+        self.wakeup.set()
+        return key
+
+    def pending(self, username):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT kind, payload FROM outbox WHERE username = ? ORDER BY id", (username,)).fetchall()
+        return [(kind, json.loads(payload)) for kind, payload in rows]
+
+    def due(self, limit=BATCH_SIZE, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self.conn:
+            # BEGIN IMMEDIATE: پروسه دیگری بین خواندن و رزرو همین ردیف‌ها را برنمی‌دارد
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute("""
+                SELECT id, username, kind, payload FROM outbox
+                WHERE username NOT IN (SELECT username FROM outbox WHERE next_at > ?)
+                ORDER BY id LIMIT ?""", (now, limit)).fetchall()
+            self.conn.executemany("UPDATE outbox SET next_at = ? WHERE id = ?",
+                                  [(now + CLAIM_SECONDS, row[0]) for row in rows])
+        return [(row_id, username, kind, json.loads(payload)) for row_id, username, kind, payload in rows]
+
+    def done(self, ids):
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def failed(self, ids, error, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self.conn:
+            attempts = max(r[0] for r in self.conn.execute(
+                f"SELECT attempts FROM outbox WHERE id IN ({','.join('?' * len(ids))})", ids))
+            self.conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_at = ?, last_error = ? WHERE id = ?",
+                [(now + retry_delay(attempts), error, i) for i in ids])
+
+    def next_due(self):
+        # کاربر تا آماده شدن همه عملیاتش کنار می‌ماند (due)، پس زمان او بیشینه next_at اوست
+        with self._lock:
+            return self.conn.execute(
+                "SELECT MIN(ready) FROM (SELECT MAX(next_at) AS ready FROM outbox GROUP BY username)").fetchone()[0]
+
+    def stats(self, username=None):
+        where, args = ("WHERE username = ?", (username,)) if username else ("", ())
+        with self._lock:
+            pending, failing = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(attempts > 0), 0) FROM outbox {where}", args).fetchone()
+            error = self.conn.execute(
+                f"SELECT last_error FROM outbox {where} {'AND' if where else 'WHERE'} last_error IS NOT NULL "
+                "ORDER BY id DESC LIMIT 1", args).fetchone()
+        return {"pending": pending, "failing": failing, "last_error": error[0] if error else None}
+
+
+class RedisWriteQueue(Outbox):
+    """صف نوشتن در Redis (همان انبار مشترک)؛ همه نسخه‌های برنامه روی چند ماشین یک صف دارند
+
+    gym:outbox:ops:<user> لیست عملیات به ترتیب ثبت، gym:outbox:keys:<user> کلیدهای ثبت شده،
+    gym:outbox:due زمان آماده شدن هر کاربر (0: همین حالا) و gym:outbox:claim:<user> رزرو ارسال.
+    """
+
+    PREFIX = "gym:outbox:"
+
+    def __init__(self, shared):
+        super().__init__(shared)
+        self.client = shared.client
+
+    def _key(self, kind, username=""):
+        return f"{self.PREFIX}{kind}:{username}" if username else f"{self.PREFIX}{kind}"
+
+    def _users(self, users):
+        return [u.decode("utf-8") if isinstance(u, bytes) else u for u in users]
+
+    def _transaction(self, watch, fn):
+        """fn(pipe) با WATCH روی کلیدها؛ اگر در همین فاصله تغییر کنند دوباره اجرا می‌شود"""
+        import redis
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(*watch)
+                    return fn(pipe)
+                except redis.WatchError:
+                    continue
+
+    def enqueue(self, username, kind, payload, key=None):
+        key = key or uuid.uuid4().hex
+        op_id = self.client.incr(self._key("seq"))
+        keys_key = self._key("keys", username)
+
+        def add(pipe):
+            if pipe.sismember(keys_key, key):
+                return
+            pipe.multi()
+            pipe.sadd(keys_key, key)
+            pipe.rpush(self._key("ops", username), json.dumps([op_id, key, kind, payload]))
+            pipe.zadd(self._key("due"), {username: 0}, nx=True)
+            pipe.execute()
+
+        self._transaction([keys_key], add)
+        self.wakeup.set()
+        return key
+
+    def _ops(self, username, count=-1):
+        end = -1 if count < 0 else count - 1
+        return [json.loads(op) for op in self.client.lrange(self._key("ops", username), 0, end)]
+
+    def pending(self, username):
+        return [(kind, payload) for _, _, kind, payload in self._ops(username)]
+
+    def due(self, limit=BATCH_SIZE, now=None):
+        now = time.time() if now is None else now
+        rows = []
+        for username in self._users(self.client.zrangebyscore(self._key("due"), "-inf", now)):
+            if len(rows) >= limit:
+                break
+            if not self.client.set(self._key("claim", username), 1, nx=True, px=int(CLAIM_SECONDS * 1000)):
+                continue
+            # تا پایان رزرو در due هم عقب می‌رود تا ترد ارسال منتظر همین کاربر دور نزند
+            self.client.zadd(self._key("due"), {username: now + CLAIM_SECONDS}, xx=True)
+            rows += [((username, op_id), username, kind, payload)
+                     for op_id, _, kind, payload in self._ops(username, limit - len(rows))]
+        return rows
+
+    def _by_user(self, ids):
+        by_user = {}
+        for username, op_id in ids:
+            by_user.setdefault(username, set()).add(op_id)
+        return by_user
+
+    def done(self, ids):
+        for username, op_ids in self._by_user(ids).items():
+            ops_key, keys_key = self._key("ops", username), self._key("keys", username)
+
+            def trim(pipe):
+                ops = [json.loads(op) for op in pipe.lrange(ops_key, 0, len(op_ids) - 1)]
+                sent = [op for op in ops if op[0] in op_ids]
+                left = pipe.llen(ops_key) - len(sent)
+                pipe.multi()
+                pipe.ltrim(ops_key, len(sent), -1)
+                if sent:
+                    pipe.srem(keys_key, *[op[1] for op in sent])
+                pipe.hdel(self._key("attempts"), username)
+                pipe.hdel(self._key("errors"), username)
+                if left:
+                    pipe.zadd(self._key("due"), {username: 0})
+                else:
+                    pipe.zrem(self._key("due"), username)
+                pipe.execute()
+
+            self._transaction([ops_key], trim)
+            self.client.delete(self._key("claim", username))
+
+    def failed(self, ids, error, now=None):
+        now = time.time() if now is None else now
+        for username in self._by_user(ids):
+            attempts = self.client.hincrby(self._key("attempts"), username, 1) - 1
+            self.client.hset(self._key("errors"), username, error)
+            self.client.zadd(self._key("due"), {username: now + retry_delay(attempts)})
+            self.client.delete(self._key("claim", username))
+
+    def next_due(self):
+        # کاربری که رزرو نسخه دیگری است تا پایان رزرو آماده نیست (due او را رد می‌کند)
+        now, first = time.time(), None
+        for username, ready in self.client.zrange(self._key("due"), 0, BATCH_SIZE - 1, withscores=True):
+            if first is not None and ready >= first:
+                break
+            claim = self.client.pttl(self._key("claim", self._users([username])[0]))
+            if claim > 0:
+                ready = max(ready, now + claim / 1000)
+            first = ready if first is None else min(first, ready)
+        return first
+
+    def stats(self, username=None):
+        users = [username] if username else self._users(self.client.zrange(self._key("due"), 0, -1))
+        pending = failing = 0
+        error = None
+        for user in users:
+            count = self.client.llen(self._key("ops", user))
+            pending += count
+            if self.client.hget(self._key("attempts"), user):
+                failing += count
+                error = error or self.client.hget(self._key("errors"), user)
+        if isinstance(error, bytes):
+            error = error.decode("utf-8")
+        return {"pending": pending, "failing": failing, "last_error": error}
+
+
+def open_write_queue(shared):
+    """صف نوشتن کنار انبار مشترک؛ صف محلی نسخه‌های قبلی (اگر مانده باشد) به آن منتقل می‌شود"""
+    from shared_store import RedisSharedStore
+
+    if QUEUE_PATH:
+        queue = WriteQueue(QUEUE_PATH, shared=shared)
+    elif isinstance(shared, RedisSharedStore):
+        queue = RedisWriteQueue(shared)
+    else:
+        queue = WriteQueue(shared.path, shared=shared)
+    import_local_queue(LOCAL_QUEUE_PATH, queue)
+    return queue
+
+
+def import_local_queue(path, queue):
+    """عملیات ارسال نشده یک فایل صف محلی به queue (با همان keyها) و پاک کردن آن فایل"""
+    if not os.path.exists(path) or os.path.abspath(path) == os.path.abspath(getattr(queue, "path", "") or ""):
+        return 0
+    local = WriteQueue(path, shared=queue.shared)  # snapshots و workouts قدیمی هم منتقل می‌شوند
+    rows = local.conn.execute("SELECT key, username, kind, payload FROM outbox ORDER BY id").fetchall()
+    for key, username, kind, payload in rows:
+        queue.enqueue(username, kind, json.loads(payload), key=key)
+    local.conn.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return len(rows)
+
+
+def apply_user(storage, username, ops):
+    """ارسال همه عملیات یک کاربر: یک نوشتن رکورد، یک افزودن تاریخچه و به‌روزرسانی خلاصه مربی"""
+    record_ops = [payload for kind, payload in ops if kind != "history"]
+    entries = [payload for kind, payload in ops if kind == "history"]
+    record = None
+    if record_ops:
+        for attempt in range(MAX_RETRIES + 1):
+            theirs = storage.get_user(username)
+            if theirs is None:
+                raise KeyError(username)
+            record = copy.deepcopy(theirs)
+            for op in record_ops:
+                apply_op(record, op)
+            try:
+                storage.put_user(username, record, expected_version=theirs.get(VERSION_KEY))
+                break
+            except ConflictError:
+                if attempt == MAX_RETRIES:
+                    raise
+                time.sleep(backoff_delay(attempt))
+    if entries:
+        storage.append_history_many(username, entries)
+        try:
+            update_member_rollup(storage, username, entries, record)
+        except Exception as e:
+            # خلاصه مربی حیاتی نیست و با scripts.rebuild_rollups قابل بازسازی است
+            metrics.error("rollup", e)
+
+
+def update_member_rollup(storage, username, entries, record=None):
+    """افزودن جلسه‌های تازه به خلاصه مربی؛ key جلسه‌ها در خلاصه ثبت است، پس ارسال دوباره بی‌اثر است"""
+    record = record or storage.get_user(username)
+    rollup = storage.get_rollup(username)
+    if rollup is None:
+        # اولین بار: از کل تاریخچه (جلسه‌هایی که همین حالا افزوده شده‌اند با key کنار گذاشته می‌شوند)
+        rollup = build_rollup(record)
+    for entry in entries:
+        rollup = update_rollup(rollup, entry, record)
+    storage.put_rollup(username, rollup)
+
+
+class SyncWorker:
+    """ترد پس‌زمینه که صف را دسته‌ای به دیتابیس اصلی می‌فرستد"""
+
+    def __init__(self, queue, storage, batch_delay=BATCH_DELAY, interval=SYNC_INTERVAL):
+        self.queue = queue
+        self.storage = storage
+        self.batch_delay = batch_delay
+        self.interval = interval
+        self.sent = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="gym-sync", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self.queue.wakeup.set()
+        self._thread.join(timeout)
+
+    def _timeout(self):
+        next_at = self.queue.next_due()
+        if next_at is None:
+            return self.interval
+        return min(self.interval, max(0.0, next_at - time.time()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.queue.wakeup.wait(self._timeout()):
+                self.queue.wakeup.clear()
+                # تغییرات پشت سر هم (چند ست، وزنه‌ها، جلسه) با هم ارسال شوند
+                self._stop.wait(self.batch_delay)
+            self.drain()
+
+    def drain(self, now=None):
+        """یک دور ارسال؛ تعداد عملیات موفق را برمی‌گرداند"""
+        by_user = {}
+        for row_id, username, kind, payload in self.queue.due(now=now):
+            by_user.setdefault(username, []).append((row_id, kind, payload))
+        sent = 0
+        for username, rows in by_user.items():
+            ids = [row_id for row_id, _, _ in rows]
+            try:
+                with metrics.span("sync.user"):
+                    apply_user(self.storage, username, [(kind, payload) for _, kind, payload in rows])
+            except Exception as e:
+                metrics.error("sync", e)
+                self.failures += 1
+                self.queue.failed(ids, repr(e), now=now)
+            else:
+                self.queue.done(ids)
+                sent += len(ids)
+        self.sent += sent
+        metrics.count("gym_sync_ops_total", sent, result="sent")
+        return sent
+
+
+class OfflineUserCache(UserCache):
+    """کش سشن که همه نوشتن‌ها را به صف نوشتن می‌سپارد؛ UI منتظر شبکه نمی‌ماند"""
+
+    def __init__(self, storage, username, queue):
+        super().__init__(storage, username)
+        self.queue = queue
+
+    def load(self):
+        """رکورد دیتابیس (یا آخرین نسخه محلی اگر در دسترس نباشد) به اضافه تغییرات ارسال نشده"""
+        if self.record is None:
+            # عضوی که تازه روی نسخه دیگری بوده (یا دوباره وصل شده) از انبار مشترک خوانده می‌شود
+            record = self.queue.load_snapshot(self.username, max_age=RECORD_TTL)
+            metrics.count("gym_shared_cache_total", kind="record", result="miss" if record is None else "hit")
+            try:
+                if record is None:
+                    record = self.storage.get_user(self.username)
+            except Exception as e:
+                metrics.error("sync.load", e)
+                record = self.queue.load_snapshot(self.username)
+                if record is None:
+                    raise
+            if record is None:
+                return None
+            keys = {e.get("key") for e in record["history"] if e.get("key")}
+            for kind, payload in self.queue.pending(self.username):
+                if kind != "history":
+                    apply_op(record, payload)
+                elif payload.get("key") not in keys:
+                    record["history"].append(payload)
+            self.record = record
+            self.base = copy.deepcopy(record)
+            self.queue.save_snapshot(self.username, record)
+        return self.record
+
+    def _change(self, op):
+        self.queue.enqueue(self.username, op["op"], op)
+        apply_op(self.record, op)
+
+    def flush(self):
+        # ارسال با SyncWorker انجام می‌شود؛ اینجا فقط نسخه محلی برای حالت آفلاین به‌روز می‌شود
+        self.queue.save_snapshot(self.username, self.record)
+        self.last_flush = time.time()
+
+    def append_history(self, entry):
+        entry.setdefault("key", uuid.uuid4().hex[:12])
+        self.queue.enqueue(self.username, "history", entry, key=f"history:{self.username}:{entry['key']}")
+        self.record["history"].append(entry)
+        self.queue.save_snapshot(self.username, self.record)
+        if self._history_index is not None:
+            self._history_index.add(entry)
+
+    def pending(self):
+        return self.queue.stats(self.username)
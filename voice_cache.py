@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+from shared_store import store_key
+
+# --- CONFIGURATION ---
+# داخل پوشه static تا مرورگر کلیپ‌ها را با آدرس بگیرد (app/static/audio/<key>.mp3)
+VOICE_DIR = os.environ.get(
+    "GYM_VOICE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "audio"))
+VOICE_LANG = "fa"
+MEMORY_ITEMS = 64  # تعداد کلیپ‌هایی که در حافظه نگه داشته می‌شوند
+
+
+def voice_key(text, lang=VOICE_LANG):
+    """کلید محتوایی: هش متن و زبان"""
+    return hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+
+
+def synthesize(text, lang=VOICE_LANG):
+    """ساخت صدا با gTTS مستقیم در حافظه (بدون فایل موقت)"""
+    from gtts import gTTS
+
+    buf = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(buf)
+    return buf.getvalue()
+
+
+class VoiceCache:
+    """کش صدا: حافظه (LRU) ← دیسک ← انبار مشترک بین نسخه‌ها (اختیاری)
+
+    کلیپ‌ها را scripts.build_voice_cache از قبل می‌سازد؛ برنامه در زمان اجرا به gTTS وصل نمی‌شود و
+    کلیپ ساخته نشده پخش نمی‌شود. live_fallback: ساخت آنلاین کلیپ پیدا نشده (فقط برای توسعه).
+    """
+
+    def __init__(self, directory=VOICE_DIR, max_items=MEMORY_ITEMS, live_fallback=False, synth=synthesize,
+                 shared=None):
+        self.directory = directory
+        self.shared = shared
+        self.max_items = max_items
+        self.live_fallback = live_fallback
+        self.synth = synth
+        self._mem = OrderedDict()
+        self._failed = set()  # متن‌هایی که ساختشان شکست خورده؛ دوباره تلاش نمی‌شود
+        self._on_disk = set()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "shared_hits": 0, "synthesized": 0,
+                      "failures": 0}
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._mem[key] = data
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_items:
+                self._mem.popitem(last=False)
+
+    def store(self, key, data):
+        """نوشتن اتمیک روی دیسک تا سشن‌های همزمان فایل نیمه‌کاره نبینند"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.path_for(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path_for(key))
+
+    def share(self, key, data):
+        """کلیپ در انبار مشترک تا نسخه‌های دیگر برنامه هم آن را داشته باشند"""
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(store_key("voice", key), data)
+        except Exception as e:
+            metrics.error("voice.shared", e)
+
+    def _load_or_synth(self, key, text, lang):
+        """بایت‌ها از دیسک یا ساخت آنلاین؛ None اگر ممکن نباشد"""
+        try:
+            with open(self.path_for(key), "rb") as f:
+                data = f.read()
+            self.stats["disk_hits"] += 1
+            return data
+        except FileNotFoundError:
+            pass
+        if self.shared is not None:
+            # کلیپی که نسخه دیگری از برنامه ساخته؛ gTTS دوباره صدا زده نمی‌شود
+            try:
+                data = self.shared.get(store_key("voice", key))
+            except Exception as e:
+                metrics.error("voice.shared", e)
+                data = None
+            if data is not None:
+                self.stats["shared_hits"] += 1
+                self.store(key, data)
+                return data
+        if not self.live_fallback:
+            # کلیپ از قبل ساخته نشده است (scripts.build_voice_cache)؛ حرکت بدون صدا ادامه پیدا می‌کند
+            metrics.count("gym_voice_missing_total")
+            return None
+        if key in self._failed:
+            return None
+        try:
+            with metrics.span("tts.synthesize"):
+                data = self.synth(text, lang)
+        except Exception as e:
+            # بدون اینترنت: تمرین بدون صدا ادامه پیدا می‌کند
+            metrics.error("tts", e)
+            self.stats["failures"] += 1
+            self._failed.add(key)
+            return None
+        self.stats["synthesized"] += 1
+        self.store(key, data)
+        self.share(key, data)
+        return data
+
+    def get(self, text, lang=VOICE_LANG):
+        """بایت‌های mp3 یا None اگر صدا در دسترس نباشد"""
+        key = voice_key(text, lang)
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.stats["hits"] += 1
+                return data
+            self.stats["misses"] += 1
+        data = self._load_or_synth(key, text, lang)
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    def ensure(self, text, lang=VOICE_LANG):
+        """نام فایل کلیپ روی دیسک (برای سرو با آدرس) یا None؛ بایت‌ها در حافظه نمی‌مانند"""
+        key = voice_key(text, lang)
+        if key in self._on_disk:
+            self.stats["hits"] += 1
+            return f"{key}.mp3"
+        self.stats["misses"] += 1
+        if os.path.exists(self.path_for(key)):
+            self.stats["disk_hits"] += 1
+        elif self._load_or_synth(key, text, lang) is None:
+            return None
+        self._on_disk.add(key)
+        return f"{key}.mp3"